@@ -28,20 +28,29 @@ var imagePuzzle = {
                 image = images[0]
             } 
         }
+        // pre-sliced pieces of the level, the pieces are then cut from the full image otherwise
+        var level = image.levels ? image.levels[gridSize] : null;
         helper.doc('actualImage').setAttribute('src', image.src);
         helper.doc('sortable').innerHTML = '';
         for (var i = 0; i < gridSize * gridSize; i++) {
-            var xpos = (percentage * (i % gridSize)) + '%';
-            var ypos = (percentage * Math.floor(i / gridSize)) + '%';
-
             let li = document.createElement('li');
             li.id = i;
             li.setAttribute('data-value', i);
-            li.style.backgroundImage = 'url(' + image.src + ')';
-            li.style.backgroundSize = (gridSize * 100) + '%';
-            li.style.backgroundPosition = xpos + ' ' + ypos;
-            li.style.width = 400 / gridSize + 'px';
-            li.style.height = 400 / gridSize + 'px';
+            if (level) {
+                var piece = level.pieces[i];
+                li.style.backgroundImage = 'url(' + level.sprite + ')';
+                li.style.backgroundPosition = -piece.x + 'px ' + -piece.y + 'px';
+                li.style.width = level.piece_size + 'px';
+                li.style.height = level.piece_size + 'px';
+            } else {
+                var xpos = (percentage * (i % gridSize)) + '%';
+                var ypos = (percentage * Math.floor(i / gridSize)) + '%';
+                li.style.backgroundImage = 'url(' + image.src + ')';
+                li.style.backgroundSize = (gridSize * 100) + '%';
+                li.style.backgroundPosition = xpos + ' ' + ypos;
+                li.style.width = 400 / gridSize + 'px';
+                li.style.height = 400 / gridSize + 'px';
+            }
 
             li.setAttribute('draggable', 'true');
             li.ondragstart = (event) => event.dataTransfer.setData('data', event.target.id);
@@ -0,0 +1,642 @@
+'''
+Contains all the tests for the course processing pipeline of Edunet.
+'''
+import os
+import glob
+import json
+import pickle
+import tempfile
+import threading
+
+from unittest import mock
+
+import networkx as nx
+from django.test import TestCase
+
+from ..utils import text_pipeline, stage_cache, lemma_cache, html_extractor, noun_lexicon
+from ..utils import course_processor, ranking, word_graph, vocabulary, paragraph_memo
+from ..utils import puzzle_engine, puzzle_renderer, image_cache, tree_artifact, persistent_store
+
+class TextPipelineTests(TestCase):
+    '''Class to test the natural language processing steps of the course processor.'''
+
+    def test_tokenize_paragraph(self):
+        '''Test tokenize_paragraph to only keep alphabetic tokens.'''
+        tokens = text_pipeline.tokenize_paragraph('Frederick Douglass spoke in 1852 to friends.')
+        self.assertEqual(tokens, ['Frederick', 'Douglass', 'spoke', 'in', 'to', 'friends'])
+
+    def test_fast_tokenize_paragraph(self):
+        '''Test fast_tokenize_paragraph to keep alphabetic tokens and mark the end of sentences.'''
+        tokens = text_pipeline.fast_tokenize_paragraph(
+            'Mr. Douglass spoke in 1852--to "friends" who didn\'t come. Why? Well-known U.S. history.'
+        )
+        self.assertEqual(tokens, ['Douglass', 'spoke', 'in', 'to', 'friends', 'who', 'did', 'come',
+                                  '.', 'Why', '.', 'history', '.'])
+
+    def test_tokenize_paragraph_unknown(self):
+        '''Test tokenize_paragraph to refuse an unknown tokenizer.'''
+        with self.assertRaises(ValueError):
+            text_pipeline.tokenize_paragraph('Douglass spoke.', tokenizer='split')
+
+    def test_tag_paragraphs(self):
+        '''Test tag_paragraphs to return the same tags when batched and when not batched.'''
+        paragraph_tokens = [
+            ['Frederick', 'Douglass', 'spoke', 'to', 'friends'],
+            [],
+            ['The', 'course', 'is', 'about', 'history'],
+        ]
+        batched = text_pipeline.tag_paragraphs(paragraph_tokens, batched=True)
+        not_batched = text_pipeline.tag_paragraphs(paragraph_tokens, batched=False)
+        self.assertEqual(batched, not_batched)
+        self.assertEqual(len(batched), len(paragraph_tokens))
+
+    def test_shared_tagger(self):
+        '''Test the perceptron tagger to be loaded once per process and reused by every batch.'''
+        tagger = mock.Mock()
+        tagger.tag.side_effect = lambda tokens: [(token, 'NN') for token in tokens]
+        with mock.patch.dict(persistent_store._SHARED_INSTANCES, clear=True): # pylint: disable=protected-access
+            with mock.patch.object(text_pipeline.nl.tag, 'PerceptronTagger', return_value=tagger) as perceptron_tagger: # pylint: disable=line-too-long
+                text_pipeline.tag_paragraphs([['Douglass', 'spoke']])
+                self.assertEqual(text_pipeline.tag_paragraphs([['history']]), [[('history', 'NN')]])
+                self.assertIs(text_pipeline.shared_tagger(), tagger)
+        self.assertEqual(perceptron_tagger.call_count, 1)
+
+    def test_init_worker(self):
+        '''Test the worker initializer to load the tagger shared by every lecture of the worker.'''
+        tagger = mock.Mock()
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.dict(persistent_store._SHARED_INSTANCES, clear=True): # pylint: disable=line-too-long,protected-access
+            settings = course_processor.ProcessorSettings(10, 10, 6, cache_dir, tokenizer='fast', use_cache=False) # pylint: disable=line-too-long
+            with mock.patch.object(text_pipeline.nl.tag, 'PerceptronTagger', return_value=tagger):
+                with mock.patch.object(course_processor, 'shared_lemma_cache'):  # no WordNet data needed
+                    course_processor.init_worker(settings)
+                self.assertIs(text_pipeline.shared_tagger(), tagger)
+        tagger.tag.assert_called_once()
+
+    def test_filter_nouns(self):
+        '''Test filter_nouns to keep nouns and sentence separators.'''
+        tagged = [('Douglass', 'NNP'), ('spoke', 'VBD'), ('.', '.'), ('friends', 'NNS')]
+        self.assertEqual(text_pipeline.filter_nouns(tagged), ['Douglass', '.', 'friends'])
+
+
+class StageCacheTests(TestCase):
+    '''Class to test the on-disk cache of the course processing stages.'''
+
+    def test_stage_key(self):
+        '''Test stage_key to change with the parent key and the stage configuration.'''
+        key = stage_cache.stage_key('transcript', 'tokens', {'tokenizer': 'word_tokenize'})
+        self.assertEqual(key, stage_cache.stage_key('transcript', 'tokens', {'tokenizer': 'word_tokenize'})) # pylint: disable=line-too-long
+        self.assertNotEqual(key, stage_cache.stage_key('transcript', 'tokens', {'tokenizer': 'fast'})) # pylint: disable=line-too-long
+        self.assertNotEqual(key, stage_cache.stage_key('other', 'tokens', {'tokenizer': 'word_tokenize'})) # pylint: disable=line-too-long
+
+    def test_cached(self):
+        '''Test cached to only compute an artifact the first time it is requested.'''
+        calls = []
+        def compute():
+            calls.append(1)
+            return [['history', 'course'], []]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = stage_cache.StageCache(cache_dir)
+            self.assertEqual(cache.cached('nouns', 'key', compute), [['history', 'course'], []])
+            # a new cache on the same directory reads the artifact back from disk
+            cache = stage_cache.StageCache(cache_dir)
+            self.assertEqual(cache.cached('nouns', 'key', compute), [['history', 'course'], []])
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(cache.hits, {'nouns': 1})
+
+    def test_stale_artifact(self):
+        '''Test an artifact that can not be loaded to be removed and counted as a miss.'''
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = stage_cache.StageCache(cache_dir)
+            cache.put('nouns', 'key', stage_cache.StageCache)
+            path = cache.path('nouns', 'key')
+            with open(path, 'wb') as file:
+                # a class that no longer exists, like an artifact pickled by older code
+                file.write(pickle.dumps(stage_cache.StageCache, protocol=2).replace(b'StageCache', b'StaleCache')) # pylint: disable=line-too-long
+            self.assertEqual(cache.cached('nouns', 'key', lambda: ['history']), ['history'])
+            self.assertEqual((cache.hits, cache.misses), ({}, {'nouns': 1}))
+            self.assertEqual(cache.get('nouns', 'key'), ['history'])
+
+    def test_disabled(self):
+        '''Test a disabled cache to always compute the artifacts.'''
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = stage_cache.StageCache(cache_dir, enabled=False)
+            cache.put('graph', 'key', {'history': 1})
+            self.assertIsNone(cache.get('graph', 'key'))
+
+
+class FakeLemmatizer:
+    '''Lemmatizer that strips a trailing s and counts its calls.'''
+    def __init__(self):
+        self.calls = 0
+
+    def lemmatize(self, word):
+        '''Returns the word without its trailing s.'''
+        self.calls += 1
+        return word[:-1] if word.endswith('s') else word
+
+
+class LemmaCacheTests(TestCase):
+    '''Class to test the memoized lemmatizer.'''
+
+    def test_lemmatize(self):
+        '''Test lemmatize to only call the lemmatizer once per word and count the hits.'''
+        lemmatizer = FakeLemmatizer()
+        cache = lemma_cache.LemmaCache(lemmatizer=lemmatizer)
+        lemmas = [cache.lemmatize(word) for word in ['courses', 'history', 'courses', 'courses']]
+        self.assertEqual(lemmas, ['course', 'history', 'course', 'course'])
+        self.assertEqual(lemmatizer.calls, 2)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self.assertEqual(cache.hit_rate(), 0.5)
+
+    def test_eviction(self):
+        '''Test the cache to evict the least recently used lemma when full.'''
+        cache = lemma_cache.LemmaCache(max_size=2, lemmatizer=FakeLemmatizer())
+        for word in ['courses', 'history', 'courses', 'years']:
+            cache.lemmatize(word)
+        self.assertEqual(list(cache.lemmas), ['courses', 'years'])
+
+    def test_take_new_entries(self):
+        '''Test the lemmas learned by a worker cache to be merged into another cache.'''
+        worker_cache = lemma_cache.LemmaCache(lemmatizer=FakeLemmatizer())
+        worker_cache.lemmatize('courses')
+        worker_cache.lemmatize('courses')
+        new_lemmas = worker_cache.take_new_entries()
+        self.assertEqual(new_lemmas, {'lemmas': {'courses': 'course'}})
+        self.assertEqual(worker_cache.take_new_entries(), {'lemmas': {}})
+        lemmatizer = FakeLemmatizer()
+        cache = lemma_cache.LemmaCache(lemmatizer=lemmatizer)
+        cache.update(new_lemmas)
+        self.assertEqual(cache.lemmatize('courses'), 'course')
+        self.assertEqual(lemmatizer.calls, 0)
+
+    def test_save_and_load(self):
+        '''Test lemmas saved by one cache to be loaded by another.'''
+        cache = lemma_cache.LemmaCache(lemmatizer=FakeLemmatizer())
+        cache.lemmatize('courses')
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'lemmas.json')
+            cache.save(path)
+            lemmatizer = FakeLemmatizer()
+            new_cache = lemma_cache.LemmaCache(lemmatizer=lemmatizer)
+            self.assertTrue(new_cache.load(path))
+            self.assertEqual(new_cache.lemmatize('courses'), 'course')
+            self.assertEqual(lemmatizer.calls, 0)
+
+
+class PersistentStoreTests(TestCase):
+    '''Class to test the helpers shared by the caches and artifacts kept on disk.'''
+
+    def test_atomic_write(self):
+        '''Test atomic_write to replace a file once written and to leave it untouched on failure.'''
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'artifact.json')
+            with persistent_store.atomic_write(path) as file:
+                file.write('new')
+            with self.assertRaises(ValueError):
+                with persistent_store.atomic_write(path) as file:
+                    file.write('half')
+                    raise ValueError('interrupted')
+            with open(path, 'r', encoding='utf-8') as file:
+                self.assertEqual(file.read(), 'new')
+            self.assertEqual(os.listdir(cache_dir), ['artifact.json'])
+
+    def test_shared_instance(self):
+        '''Test shared_instance to create one instance per class.'''
+        with mock.patch.dict(persistent_store._SHARED_INSTANCES, clear=True): # pylint: disable=protected-access
+            memo = paragraph_memo.shared_paragraph_memo()
+            self.assertIs(paragraph_memo.shared_paragraph_memo(), memo)
+            self.assertIsNot(noun_lexicon.shared_noun_lexicon(), memo)
+
+    def test_load_older_format(self):
+        '''Test a store to refuse a file saved in another format.'''
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'lemmas.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump([['courses', 'course']], file)
+            cache = lemma_cache.LemmaCache(lemmatizer=FakeLemmatizer())
+            self.assertFalse(cache.load(path))
+            self.assertEqual(len(cache.lemmas), 0)
+
+
+class NounLexiconTests(TestCase):
+    '''Class to test the noun lexicon used instead of the tagger.'''
+
+    def test_filter_nouns(self):
+        '''Test filter_nouns to follow the tags seen before and take unknown capitalized tokens as nouns.''' # pylint: disable=line-too-long
+        lexicon = noun_lexicon.NounLexicon(use_wordnet=False)
+        lexicon.learn([[('history', 'NN'), ('spoke', 'VBD'), ('.', '.')]])
+        self.assertEqual(lexicon.filter_nouns(['Douglass', 'spoke', 'history', 'about', '.']),
+                         ['Douglass', 'history', '.'])
+        lexicon.learn([[('spoke', 'NN')], [('spoke', 'NN')]])
+        self.assertTrue(lexicon.is_noun('spoke'))
+
+    def test_save_and_load(self):
+        '''Test the tag counts learned by a worker lexicon to be merged, saved and loaded.'''
+        worker_lexicon = noun_lexicon.NounLexicon(use_wordnet=False)
+        worker_lexicon.learn([[('history', 'NN'), ('history', 'NN')]])
+        lexicon = noun_lexicon.NounLexicon(use_wordnet=False)
+        lexicon.update(worker_lexicon.take_new_entries())
+        self.assertEqual(worker_lexicon.take_new_entries(), {'tag_counts': {}})
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'noun_lexicon.json')
+            lexicon.save(path)
+            new_lexicon = noun_lexicon.NounLexicon(use_wordnet=False)
+            self.assertTrue(new_lexicon.load(path))
+            self.assertEqual(new_lexicon.tag_counts, {'history': [2, 0]})
+
+    def test_state_hash(self):
+        '''Test the hash of the lexicon to change when it learns and to key the nouns it picks.'''
+        lexicon = noun_lexicon.NounLexicon(use_wordnet=False)
+        state_hash = lexicon.state_hash()
+        lexicon.learn([[('history', 'NN')]])
+        self.assertNotEqual(lexicon.state_hash(), state_hash)
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.dict(persistent_store._SHARED_INSTANCES, {noun_lexicon.NounLexicon: lexicon}): # pylint: disable=line-too-long,protected-access
+            settings = course_processor.ProcessorSettings(10, 10, 6, cache_dir, noun_extractor='lexicon') # pylint: disable=line-too-long
+            shared_lexicon = noun_lexicon.shared_noun_lexicon()
+            keys = course_processor.lecture_stage_keys('transcript', settings)
+            shared_lexicon.update({'tag_counts': {'history': [1, 0]}})
+            new_keys = course_processor.lecture_stage_keys('transcript', settings)
+        self.assertEqual(keys['tokens'], new_keys['tokens'])
+        self.assertNotEqual(keys['nouns'], new_keys['nouns'])
+
+
+class HtmlExtractorTests(TestCase):
+    '''Class to test the engines that pull the paragraphs and title out of transcripts.'''
+
+    def test_stream_extract(self):
+        '''Test stream_extract to collect nested paragraph text and the first h3.'''
+        html = (
+            '<h3>Lecture 1 - Dawn of Freedom [January 11, 2010]</h3><h3>Other</h3>'
+            '<p><strong>Chapter 1.</strong> Douglass &amp; friends<br/>spoke</p>'
+            '<blockquote><p>Fellow citizens</blockquote><p>   \n  </p>'
+        )
+        paragraphs, raw_title = html_extractor.stream_extract(html)
+        self.assertEqual(paragraphs, ['Chapter 1. Douglass & friendsspoke', 'Fellow citizens', '\n'])
+        self.assertEqual(html_extractor.clean_lecture_title(raw_title), 'Dawn of Freedom')
+
+    def test_transcript_stream(self):
+        '''Test TranscriptStream to read a transcript in chunks and drop the last three paragraphs.'''
+        html = (
+            '<h3>Lecture 1 - Dawn of Freedom [January 11, 2010]</h3>'
+            '<p>Douglass &amp; friends</p><p>spoke <em>in</em> 1852</p>'
+            '<p></p><p>[end of transcript]</p><p>Back to Top</p>'
+        )
+        with tempfile.TemporaryDirectory() as transcript_dir:
+            path = os.path.join(transcript_dir, 'transcript01.html')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(html)
+            transcript = html_extractor.TranscriptStream(path, chunk_size=7)
+            self.assertEqual(list(transcript), ['Douglass & friends', 'spoke in 1852'])
+            self.assertEqual(transcript.title, 'Dawn of Freedom')
+            self.assertEqual((list(transcript), transcript.title), html_extractor.extract_paragraphs(html)) # pylint: disable=line-too-long
+
+    def test_extract_paragraphs_parity(self):
+        '''Test the stream engine to return the same paragraphs and title as BeautifulSoup for every transcript.''' # pylint: disable=line-too-long
+        transcripts = glob.glob('edunet/utils/in/**/transcripts/*.html', recursive=True)
+        self.assertTrue(transcripts)
+        for transcript in transcripts:
+            with open(transcript, encoding='utf-8') as file:
+                html = file.read()
+            self.assertEqual(
+                html_extractor.extract_paragraphs(html, engine='stream'),
+                html_extractor.extract_paragraphs(html, engine='soup'),
+                transcript,
+            )
+
+
+class CourseProcessorTests(TestCase):
+    '''Class to test the scheduling of the course processor.'''
+
+    def test_schedule_lectures(self):
+        '''Test schedule_lectures to put the largest transcripts first.'''
+        with tempfile.TemporaryDirectory() as transcript_dir:
+            lectures = []
+            for name, size in [('short', 10), ('long', 300), ('medium', 100)]:
+                path = os.path.join(transcript_dir, name + '.html')
+                with open(path, 'w') as file:
+                    file.write('x' * size)
+                lectures.append((path, name))
+            scheduled = course_processor.schedule_lectures(lectures)
+            self.assertEqual([name for _, name in scheduled], ['long', 'medium', 'short'])
+
+
+class RankingTests(TestCase):
+    '''Class to test the ranking engines.'''
+
+    def test_numpy_pagerank(self):
+        '''Test numpy_pagerank to give the same ranks as networkx with self loops, weights and dangling words.''' # pylint: disable=line-too-long
+        graph = nx.DiGraph()
+        course_processor.words_to_graph(graph, ['history', 'course', 'history', 'history', 'freedom', 'douglass']) # pylint: disable=line-too-long
+        graph.add_edge('course', 'freedom', weight=3)
+        expected = nx.pagerank(graph)
+        ranks = ranking.numpy_pagerank(graph)
+        self.assertEqual(list(ranks), list(expected))
+        for word, rank in expected.items():
+            self.assertAlmostEqual(ranks[word], rank, places=6)
+        self.assertEqual(ranking.rank_words(graph, 'numpy'), ranking.rank_words(graph, 'pagerank'))
+        self.assertEqual(ranking.numpy_pagerank(nx.DiGraph()), {})
+
+    def test_batch_pagerank(self):
+        '''Test batch_pagerank to give every graph the ranks it gets when ranked alone.'''
+        paragraphs = [['history', 'course', 'history'], [], ['freedom', '.', 'douglass', 'freedom', 'speech']] # pylint: disable=line-too-long
+        graphs = [course_processor.paragraph_graph(paragraph) for paragraph in paragraphs]
+        self.assertEqual(ranking.batch_pagerank(graphs), [ranking.numpy_pagerank(graph) for graph in graphs]) # pylint: disable=line-too-long
+        self.assertEqual(course_processor.rank_paragraph_batch(paragraphs, 'numpy'),
+                         course_processor.rank_paragraph_batch(paragraphs, 'pagerank'))
+
+    def test_lecture_paragraph_batch(self):
+        '''Test a lecture to rank all its paragraphs in one system with the ranks of every paragraph ranked alone.''' # pylint: disable=line-too-long
+        paragraphs = [['history', 'course', 'history'], ['freedom', '.', 'douglass', 'freedom', 'speech'], ['speech', 'history']] # pylint: disable=line-too-long
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'transcript01.html')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('<p>History</p>')
+            settings = course_processor.ProcessorSettings(10, 10, 6, cache_dir, paragraph_memo=False) # pylint: disable=line-too-long
+            lecture = course_processor.LectureAnalysis(path, 'transcript01', settings, stage_cache.StageCache(cache_dir, enabled=False)) # pylint: disable=line-too-long
+            lecture.paragraph_nouns.extend(paragraphs)
+            with mock.patch.object(ranking, 'block_pagerank', wraps=ranking.block_pagerank) as block_pagerank: # pylint: disable=line-too-long
+                rankings = lecture.rank_paragraphs()
+        self.assertEqual(block_pagerank.call_count, 1)
+        for ranks, paragraph in zip(rankings, paragraphs):
+            expected = ranking.pagerank(course_processor.paragraph_graph(paragraph), 'pagerank')
+            self.assertEqual(ranking.top_words(ranks), ranking.top_words(expected))
+            for word, rank in expected.items():
+                self.assertAlmostEqual(ranks[word], rank, places=6)
+
+    def test_warm_start(self):
+        '''Test the pagerank started from the lecture ranks to match the uniform start and count its iterations.''' # pylint: disable=line-too-long
+        lecture_graph = course_processor.paragraph_graph(['history', 'course', 'history', 'freedom', '.', 'douglass', 'freedom']) # pylint: disable=line-too-long
+        graphs = [course_processor.paragraph_graph(['history', 'course', 'freedom']), course_processor.paragraph_graph(['speech', 'douglass'])] # pylint: disable=line-too-long
+        iterations = []
+        lecture_scores = ranking.pagerank(lecture_graph, 'numpy', iterations=iterations)
+        warm = ranking.pagerank_batch(graphs, 'numpy', nstarts=[lecture_scores] * 2, iterations=iterations) # pylint: disable=line-too-long
+        self.assertEqual(len(iterations), 3)
+        for ranks, expected in zip(warm, ranking.pagerank_batch(graphs, 'pagerank', nstarts=[lecture_scores] * 2)): # pylint: disable=line-too-long
+            for word, rank in expected.items():
+                self.assertAlmostEqual(ranks[word], rank, places=5)
+        for ranks, graph in zip(warm, graphs):
+            self.assertEqual(ranking.top_words(ranks), ranking.rank_words(graph, 'pagerank'))
+
+    def test_approximate_rankers(self):
+        '''Test the degree and power rankers to rank every word and pick the top keyword of pagerank.''' # pylint: disable=line-too-long
+        graph = course_processor.paragraph_graph(['history', 'course', 'history', 'freedom', 'history', 'douglass']) # pylint: disable=line-too-long
+        expected = ranking.rank_words(graph, 'pagerank')
+        iterations = []
+        power = ranking.pagerank(graph, 'power', iterations=iterations)
+        self.assertEqual(iterations, [ranking.POWER_ITERATIONS])
+        self.assertAlmostEqual(sum(power.values()), 1.0)
+        degree = ranking.pagerank(graph, 'degree')
+        self.assertEqual(degree['history'], 0.4)
+        for ranker in ranking.APPROXIMATE_RANKERS:
+            ranked_words = ranking.rank_words(graph, ranker)
+            self.assertEqual(sorted(ranked_words), sorted(expected))
+            self.assertEqual(ranked_words[0], expected[0])
+        self.assertEqual(ranking.pagerank_batch([nx.DiGraph(), graph], 'degree')[1], degree)
+
+    def test_top_words(self):
+        '''Test top_words to pick the same words as a full sort, ties in the order of the words.'''
+        ranked_words = {'history': 0.1, 'course': 0.3, 'freedom': 0.1, 'douglass': 0.5, 'speech': 0.1} # pylint: disable=line-too-long
+        expected = sorted(ranked_words, key=ranked_words.get, reverse=True)
+        for k in range(len(ranked_words) + 2):
+            self.assertEqual(ranking.top_words(ranked_words, k), expected[:k])
+        self.assertEqual(ranking.top_words(ranked_words), expected)
+
+    def test_unknown_ranker(self):
+        '''Test pagerank to refuse an unknown ranker.'''
+        with self.assertRaises(ValueError):
+            ranking.pagerank(nx.DiGraph(), ranker='hits')
+
+
+class WordGraphTests(TestCase):
+    '''Class to test the weighted co-occurrence graph builder.'''
+
+    def test_build_word_graph(self):
+        '''Test build_word_graph to link the same words as the networkx graph and count repeated pairs.''' # pylint: disable=line-too-long
+        words = ['history', 'course', 'history', 'course', '.', 'freedom', 'douglass', '.']
+        graph = word_graph.build_word_graph(words).to_networkx()
+        expected = course_processor.paragraph_graph(words)
+        self.assertEqual(sorted(graph.nodes()), sorted(expected.nodes()))
+        self.assertEqual(sorted(graph.edges()), sorted(expected.edges()))
+        self.assertEqual(graph['history']['course']['weight'], 2)
+        self.assertEqual(ranking.numpy_pagerank(word_graph.build_word_graph(words)), ranking.numpy_pagerank(graph)) # pylint: disable=line-too-long
+
+    def test_cooccurrence_window(self):
+        '''Test build_word_graph to link the words within the window without crossing a separator.''' # pylint: disable=line-too-long
+        graph = word_graph.build_word_graph(['history', 'course', 'freedom', '.', 'douglass'], window=3).to_networkx() # pylint: disable=line-too-long
+        self.assertEqual(sorted(graph.edges()), [('course', 'freedom'), ('history', 'course'), ('history', 'freedom')]) # pylint: disable=line-too-long
+        self.assertIn('douglass', graph)
+        with self.assertRaises(ValueError):
+            course_processor.cooccurrence_graph(['history'], graph_builder='igraph')
+
+    def test_build_id_graph(self):
+        '''Test build_id_graph on the ids of a paragraph to give the graph of its words.'''
+        paragraphs = vocabulary.EncodedParagraphs()
+        paragraphs.extend([['history', 'course', '.'], ['freedom', 'history', '.', 'douglass', 'freedom']]) # pylint: disable=line-too-long
+        words = paragraphs.vocabulary.words
+        graph = word_graph.build_id_graph(paragraphs.paragraph_ids(1), words, separator_id=paragraphs.vocabulary.get('.')) # pylint: disable=line-too-long
+        expected = word_graph.build_word_graph(paragraphs.paragraph(1))
+        self.assertEqual(graph.nodes, ['freedom', 'history', 'douglass'])
+        self.assertEqual(sorted(graph.to_networkx().edges()), sorted(expected.to_networkx().edges()))
+
+
+class VocabularyTests(TestCase):
+    '''Class to test the interned vocabulary.'''
+
+    def test_encoded_paragraphs(self):
+        '''Test EncodedParagraphs to hold the words of every paragraph as int32 ids and decode them back.''' # pylint: disable=line-too-long
+        paragraphs = vocabulary.EncodedParagraphs()
+        paragraphs.extend([['history', 'course', 'history'], [], ['freedom', 'history']])
+        self.assertEqual(list(paragraphs), [['history', 'course', 'history'], [], ['freedom', 'history']]) # pylint: disable=line-too-long
+        self.assertEqual(paragraphs.word_ids().dtype, 'int32')
+        self.assertEqual(paragraphs.word_ids().tolist(), [0, 1, 0, 2, 0])
+        self.assertEqual(paragraphs.word_counts().tolist(), [3, 1, 1])
+
+    def test_vocabulary_update(self):
+        '''Test update to merge the words of a lecture into a course with their counts.'''
+        course = vocabulary.Vocabulary(['course', 'history'])
+        course.update(vocabulary.Vocabulary(['history']), [2])
+        remap = course.update(vocabulary.Vocabulary(['freedom', 'history']), [1, 3])
+        self.assertEqual(remap.tolist(), [2, 1])
+        self.assertEqual(course.words, ['course', 'history', 'freedom'])
+        self.assertEqual(course.counts.tolist(), [0, 5, 1])
+
+
+class ParagraphMemoTests(TestCase):
+    '''Class to test the paragraph memo.'''
+
+    def test_paragraph_memo(self):
+        '''Test ParagraphMemo to count its hits and misses and hand its new entries to another memo.''' # pylint: disable=line-too-long
+        memo = paragraph_memo.ParagraphMemo()
+        key = memo.nouns_key('Student: Yes.', {'tokenizer': 'fast'})
+        self.assertNotEqual(key, memo.nouns_key('Student: Yes.', {'tokenizer': 'word_tokenize'}))
+        self.assertIsNone(memo.get('nouns', key))
+        memo.put('nouns', key, ['student'])
+        self.assertEqual(memo.get('nouns', key), ['student'])
+        main_memo = paragraph_memo.ParagraphMemo()
+        main_memo.update(memo.take_new_entries(), *memo.take_counts())
+        self.assertEqual(main_memo.get('nouns', key), ['student'])
+        self.assertEqual((main_memo.hits['nouns'], main_memo.misses['nouns']), (2, 1))
+        self.assertEqual(memo.take_new_entries(), {'nouns': {}, 'scores': {}})
+
+    def test_boilerplate_paragraphs(self):
+        '''Test boilerplate_paragraphs to find the paragraphs of several lectures, copies counted once.''' # pylint: disable=line-too-long
+        lectures = ['<p>Student: Yes.</p><p>Douglass</p>', '<p>Student: Yes.</p><p>Lincoln</p>', '<p>Student: Yes.</p><p>Lincoln</p>'] # pylint: disable=line-too-long
+        with tempfile.TemporaryDirectory() as transcript_dir:
+            paths = []
+            for number, html in enumerate(lectures):
+                paths.append(os.path.join(transcript_dir, 'transcript0{}.html'.format(number)))
+                with open(paths[-1], 'w', encoding='utf-8') as file:
+                    file.write(html + '<p></p><p>[end of transcript]</p><p>Back to Top</p>')
+            boilerplate = paragraph_memo.boilerplate_paragraphs(paths, min_lectures=2)
+        self.assertEqual(boilerplate, {paragraph_memo.text_hash('Student: Yes.')})
+
+
+class PuzzleEngineTests(TestCase):
+    '''Class to test the puzzle engine.'''
+
+    def test_adjacency_index(self):
+        '''Test adjacency_index to link the words in both directions like the undirected graph.'''
+        graph = nx.DiGraph([('history', 'course'), ('douglass', 'history'), ('history', 'history')])
+        self.assertEqual(puzzle_engine.adjacency_index(graph), {k: set(v) for k, v in graph.to_undirected().adj.items()}) # pylint: disable=line-too-long
+
+    def test_fill(self):
+        '''Test fill to place the best ranked keyword linked to every piece around, a keyword only once.''' # pylint: disable=line-too-long
+        graph = nx.DiGraph([('history', 'course'), ('course', 'freedom'), ('freedom', 'history'), ('douglass', 'history'), ('b', 'course'), ('history', 'b')]) # pylint: disable=line-too-long
+        engine = puzzle_engine.PuzzleEngine(graph, ['history', 'course', 'b', 'freedom', 'douglass'])
+        self.assertEqual(puzzle_engine.snail_road(3), ((1, 1), (2, 1), (2, 2), (1, 2), (0, 2), (0, 1), (0, 0))) # pylint: disable=line-too-long
+        self.assertEqual(engine.fill(3), [['douglass', '*', 'freedom'], ['*', 'history', '*'], ['*', 'course', 'b']]) # pylint: disable=line-too-long
+        self.assertEqual(puzzle_engine.PuzzleEngine(graph, []).fill(2), [['*', '*'], ['*', '*']])
+
+    def test_puzzle_dimensions(self):
+        '''Test puzzle_dimensions to take dimensions, levels and ranges and refuse an unknown level.''' # pylint: disable=line-too-long
+        self.assertEqual(puzzle_engine.puzzle_dimensions(6), (6,))
+        self.assertEqual(puzzle_engine.puzzle_dimensions(['easy', 4, 'hard', '3']), (3, 4, 5))
+        self.assertEqual(puzzle_engine.puzzle_dimensions(range(3, 11)), tuple(range(3, 11)))
+        with self.assertRaises(ValueError):
+            puzzle_engine.puzzle_dimensions('expert')
+
+    def test_tabs(self):
+        '''Test tabs to give the first of two linked pieces the tab and a tab towards every empty piece.''' # pylint: disable=line-too-long
+        graph = nx.DiGraph([('history', 'course'), ('course', 'history'), ('history', 'freedom')])
+        engine = puzzle_engine.PuzzleEngine(graph, ['history', 'course', 'freedom'])
+        self.assertEqual(engine.tabs([['history', 'course'], ['freedom', '*']]),
+                         [[[0, 1, 1, 0], [-1, 1, 0, 0]], [[0, 0, 1, -1], [-1, 0, 0, -1]]])
+
+    def test_puzzle_artifact(self):
+        '''Test a puzzle artifact to be loaded back and refused when written by another version.'''
+        with tempfile.TemporaryDirectory() as out_dir:
+            path = os.path.join(out_dir, 'Puzzle#transcript01.json')
+            puzzle_engine.write_puzzle_artifact(path, 'Dawn of Freedom', [([['history']], [[[0, 0, 0, 0]]])]) # pylint: disable=line-too-long
+            artifact = puzzle_engine.load_puzzle_artifact(path)
+            self.assertEqual(artifact['puzzles'], [{'dimension': 1, 'words': [['history']], 'tabs': [[[0, 0, 0, 0]]]}]) # pylint: disable=line-too-long
+            artifact['version'] = 0
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(artifact, file)
+            self.assertIsNone(puzzle_engine.load_puzzle_artifact(path))
+
+
+class PuzzleRendererTests(TestCase):
+    '''Class to test the batch renderer of the Puzzle of Knowledge images.'''
+
+    def test_fit_text(self):
+        '''Test fit_text to shrink and wrap the rows so every line fits in the width.'''
+        settings = puzzle_renderer.RenderSettings()
+        rows = ['reconstruction emancipation abolitionist'] * 5 + ['antidisestablishmentarianism' * 3] # pylint: disable=line-too-long
+        scale, lines, _ = puzzle_renderer.fit_text(rows, 380, 380, settings)
+        self.assertLess(scale, settings.max_scale)
+        for row_lines in lines:
+            for line in row_lines:
+                self.assertLessEqual(puzzle_renderer.text_width(line, scale, settings.thickness), 380)
+        self.assertEqual(''.join(lines[-1]), 'antidisestablishmentarianism' * 3)
+
+    def test_render_courses(self):
+        '''Test render_courses to render every lecture once and skip the lectures that did not change.''' # pylint: disable=line-too-long
+        with tempfile.TemporaryDirectory() as out_dir:
+            os.makedirs(os.path.join(out_dir, 'out', 'afam162'))
+            for number in ('01', '02'):
+                path = os.path.join(out_dir, 'out', 'afam162', 'Puzzle#transcript' + number + '.json')
+                puzzle_engine.write_puzzle_artifact(path, 'Dawn of Freedom', [([['history', '*'], ['course', 'freedom']], None)]) # pylint: disable=line-too-long
+            settings = puzzle_renderer.RenderSettings(os.path.join(out_dir, 'out'), os.path.join(out_dir, 'images')) # pylint: disable=line-too-long
+            self.assertEqual(puzzle_renderer.render_courses(['afam162'], settings, workers=1), {'rendered': 2, 'skipped': 0, 'missing': 0}) # pylint: disable=line-too-long
+            self.assertTrue(os.path.isfile(os.path.join(out_dir, 'images', 'puzzle_afam162', 'Puzzle#transcript01.jpg'))) # pylint: disable=line-too-long
+            self.assertEqual(puzzle_renderer.render_courses(['afam162'], settings, workers=1), {'rendered': 0, 'skipped': 2, 'missing': 0}) # pylint: disable=line-too-long
+            settings.quality = 70
+            self.assertEqual(puzzle_renderer.render_courses(['afam162'], settings, workers=2)['rendered'], 2) # pylint: disable=line-too-long
+
+    def test_sprite_sheet(self):
+        '''Test sprite_sheet to lay the pieces where the piece manifest says they are.'''
+        settings = puzzle_renderer.RenderSettings(size=10)
+        image = puzzle_renderer.np.arange(300, dtype='uint8').reshape(10, 10, 3)
+        sheet = puzzle_renderer.sprite_sheet(image, 3)
+        manifest = puzzle_renderer.piece_manifest(3, settings)
+        self.assertEqual(sheet.shape, (manifest['height'], manifest['width'], 3))
+        piece = manifest['pieces'][5]
+        self.assertEqual((piece['row'], piece['column'], manifest['piece_size']), (1, 2, 3))
+        self.assertEqual(sheet[0, piece['x']].tolist(), puzzle_renderer.cv2.resize(image, (9, 9), interpolation=puzzle_renderer.cv2.INTER_AREA)[3, 6].tolist()) # pylint: disable=line-too-long
+
+
+class ImageCacheTests(TestCase):
+    '''Class to test the on-disk cache of the puzzle images rendered on demand.'''
+
+    def test_evict(self):
+        '''Test the cache to evict the least recently used image once it is over its size.'''
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = image_cache.ImageCache(cache_dir, max_bytes=30)
+            for i, key in enumerate(('a', 'b', 'c')):
+                os.utime(cache.get(key, lambda: b'0123456789'), (i, i))
+            self.assertIsNotNone(cache.lookup('a'))  # a is now the most recently used
+            cache.get('d', lambda: b'0123456789')
+            self.assertEqual(sorted(os.listdir(cache_dir)), ['a.jpg', 'c.jpg', 'd.jpg'])
+            self.assertIsNone(cache.get('e', lambda: None))
+
+    def test_coalesce(self):
+        '''Test the cache to render an image once for requests that arrive at the same time.'''
+        renders = []
+        started = threading.Event()
+        def render():
+            renders.append(1)
+            started.wait(1)
+            return b'image'
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = image_cache.ImageCache(cache_dir)
+            paths = []
+            threads = [threading.Thread(target=lambda: paths.append(cache.get('a', render))) for i in range(4)] # pylint: disable=line-too-long
+            for thread in threads:
+                thread.start()
+            started.set()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(renders), 1)
+            self.assertEqual(paths, [cache.path('a')] * 4)
+            self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+
+class TreeArtifactTests(TestCase):
+    '''Class to test the structured artifact of the Tree of Knowledge.'''
+
+    def test_tree_artifact(self):
+        '''Test a tree artifact to be cleaned of stop words when saved and loaded back as the tree shown.''' # pylint: disable=line-too-long
+        artifact = tree_artifact.tree_artifact(
+            'Dawn of Freedom', [('history', 0.3), ('the', 0.2), ('course', 0.1)],
+            [[('douglass', 0.5), ('[', 0.2), ('s', 0.1)], []], {'the'}
+        )
+        with tempfile.TemporaryDirectory() as out_dir:
+            path = os.path.join(out_dir, 'Tree#transcript01.json')
+            tree_artifact.write_tree_artifact(path, artifact)
+            self.assertEqual(tree_artifact.tree_dict(tree_artifact.load_tree_artifact(path)), {
+                'Lecture Title': 'Dawn of Freedom', 'Lecture Keywords': ['history', 'course'],
+                'Paragraphs': {'Paragraph 1 Keywords': ['douglass'], 'Paragraph 2 Keywords': []},
+            })
+            self.assertEqual(tree_artifact.load_tree_artifact(path)['lecture'][1], ['course', 0.1])
+            self.assertFalse(tree_artifact.load_tree_artifact(path)['provisional'])
+            self.assertIsNone(tree_artifact.load_tree_artifact(os.path.join(out_dir, 'Tree#transcript02.json'))) # pylint: disable=line-too-long
+        preview = tree_artifact.tree_artifact('Dawn of Freedom', [('history', 0.3)], [], {'the'}, 'degree', True) # pylint: disable=line-too-long
+        self.assertEqual((preview['ranker'], preview['provisional']), ('degree', True))
+
+    def test_parse_tree_lines(self):
+        '''Test parse_tree_lines to read the legacy files with and without a title.'''
+        lines = ['\n', 'transcript01-Dawn of Freedom:\n', "--------Lecture: b'history' b'job' \n",
+                 "--------1 paragraph: b'douglass' b'\\xc5\\x9di' \n", '--------2 paragraph: ']
+        self.assertEqual(tree_artifact.parse_tree_lines(lines), ('Dawn of Freedom', ['history', 'job'], [['douglass', 'ŝi'], []])) # pylint: disable=line-too-long
+        lines = ['\n', 'transcript01:rate bond \n', '--------1 paragraph: energy ']
+        self.assertEqual(tree_artifact.parse_tree_lines(lines), ('', ['rate', 'bond'], [['energy']]))
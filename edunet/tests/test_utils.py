@@ -1,11 +1,18 @@
 '''
 Contains all the tests for the utils of Edunet.
 '''
+import os
+import tempfile
+
+from unittest import mock
+
 import cv2
 
 from django.test import TestCase
 
 from ..utils import utils
+from ..utils.puzzle_engine import write_puzzle_artifact
+from ..utils.tree_artifact import tree_artifact, write_tree_artifact
 from ..models import Course, TreeOfKnowledge, PuzzleOfKnowledge
 
 class UtilTests(TestCase):
@@ -125,3 +132,33 @@ class UtilTests(TestCase):
         pok = PuzzleOfKnowledge.objects.get(transcript_num=1).puzzle_of_knowledge
         title = utils.get_puzzle_title(Course.objects.get(course_number='AFAM 162'), 1)
         self.assertIn(title, pok)
+
+    def test_process_course_batch(self):
+        '''Test process_course_batch to save the lectures of the courses that were processed.'''
+        course = Course.objects.get(course_number='AFAM 162')
+
+        def batch_course_processor(links, *args, **kwargs):
+            self.assertEqual(links, [utils.get_course_link(course)])
+            os.makedirs('edunet/utils/out/afam162')
+            artifact = tree_artifact('Freedom', [('freedom', 0.6)], [[('douglass', 0.4)]], set())
+            write_tree_artifact('edunet/utils/out/afam162/Tree#transcript01.json', artifact)
+            write_puzzle_artifact('edunet/utils/out/afam162/Puzzle#transcript01.json', 'Freedom', [([['freedom']], [[[0, 0, 0, 0]]])]) # pylint: disable=line-too-long
+            return ['afam162']
+
+        trees = TreeOfKnowledge.objects.count()
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.object(utils, 'get_transcript_num', return_value=1): # pylint: disable=line-too-long
+            os.chdir(tmp_dir)
+            try:
+                with mock.patch('edunet.utils.course_processor.batch_course_processor', side_effect=batch_course_processor): # pylint: disable=line-too-long
+                    utils.process_course_batch([course], workers=1)
+                # a course that was not processed is not saved
+                with mock.patch('edunet.utils.course_processor.batch_course_processor', return_value=[]): # pylint: disable=line-too-long
+                    utils.process_course_batch([course], workers=1)
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(TreeOfKnowledge.objects.count(), trees + 1)
+        tok = TreeOfKnowledge.objects.order_by('-id')[0].tree_of_knowledge
+        self.assertIn("'Lecture Keywords': ['freedom']", tok)
+        pok = PuzzleOfKnowledge.objects.order_by('-id')[0].puzzle_of_knowledge
+        self.assertIn("'freedom ': 1", pok)
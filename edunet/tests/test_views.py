@@ -173,6 +173,41 @@ class EdunetViewsTestCase(TestCase):
         self.assertEqual(response.context['department'].department_name, 'African American Studies')
         self.assertEqual(response.context['course'].course_number, 'AFAM 162')
 
+    def test_pz_image(self):
+        '''Test pz_image to render the puzzle image and answer a revalidation with 304.'''
+        url = '/edunet/african-american-studies/african-american-history-emancipation-present/1-puzzle.jpg' # pylint: disable=line-too-long
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        user = Client()
+        self.assertTrue(user.login(username='rianl', password='rianl'))
+        response = user.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\xff\xd8'))
+        response = user.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = user.get('/edunet/african-american-studies/african-american-history-emancipation-present/99-puzzle.jpg') # pylint: disable=line-too-long
+        self.assertEqual(response.status_code, 404)
+        response = user.get('/edunet/african-american-studies/african-american-history-emancipation-present/1-puzzle-2.jpg') # pylint: disable=line-too-long
+        self.assertEqual(response.status_code, 404)
+
+    def test_pz_sprite(self):
+        '''Test pz_sprite to serve the pieces of a level for a year and redirect an old version.'''
+        user = Client()
+        self.assertTrue(user.login(username='rianl', password='rianl'))
+        response = user.get('/edunet/african-american-studies/african-american-history-emancipation-present/1-puzzle/') # pylint: disable=line-too-long
+        levels = response.context['levels']
+        self.assertEqual(sorted(levels), [3, 4, 5])
+        self.assertEqual(len(levels[4]['pieces']), 16)
+        response = user.get(levels[4]['sprite'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        response = user.get(levels[4]['sprite'].replace('-4-', '-6-'))
+        self.assertEqual(response.status_code, 404)
+        response = user.get('/edunet/african-american-studies/african-american-history-emancipation-present/1-puzzle-pieces-4-old.jpg') # pylint: disable=line-too-long
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], levels[4]['sprite'])
+
     def test_course_processor(self):
         '''Test course_processor.'''
         response = self.client.get('/edunet/african-american-studies/african-american-history-emancipation-present/course-processor/') # pylint: disable=line-too-long
@@ -31,4 +31,7 @@ urlpatterns = [
     path('<slug:department_slug>/<slug:course_slug>/tree-form/', views.tk_form, name='tk_form'),
     path('<slug:department_slug>/<slug:course_slug>/<int:transcript_num>-tree/', views.tk_view, name='tk_view'), # pylint: disable=line-too-long
     path('<slug:department_slug>/<slug:course_slug>/<int:transcript_num>-puzzle/', views.pz_view, name='pz_view'), # pylint: disable=line-too-long
+    path('<slug:department_slug>/<slug:course_slug>/<int:transcript_num>-puzzle.jpg', views.pz_image, name='pz_image'), # pylint: disable=line-too-long
+    path('<slug:department_slug>/<slug:course_slug>/<int:transcript_num>-puzzle-<int:dimension>.jpg', views.pz_image, name='pz_image_dimension'), # pylint: disable=line-too-long
+    path('<slug:department_slug>/<slug:course_slug>/<int:transcript_num>-puzzle-pieces-<int:grid>-<slug:version>.jpg', views.pz_sprite, name='pz_sprite'), # pylint: disable=line-too-long
 ]
@@ -12,6 +12,11 @@ import zipfile
 import shutil
 import glob
 
+try:
+    from .ranking import RANKERS, APPROXIMATE_RANKERS, pagerank
+except ImportError:  # run as a script from edunet/utils
+    from ranking import RANKERS, APPROXIMATE_RANKERS, pagerank
+
 # set 'if __name__ == '__main__' to run independently
 if __name__ == '__main__':
 
@@ -104,12 +109,12 @@ if __name__ == '__main__':
                     paragraph_counter += 1
                     lecture_words.extend(w)
                     self.text_to_graph(w)
-                    ranked_words = nx.pagerank(self.graph)
+                    ranked_words = pagerank(self.graph, args.ranker)
                     self.graph = nx.DiGraph()
                     paragraph_keywords = sorted(ranked_words, key=ranked_words.get, reverse=True)[:self.paragraph_dimension]
                     self.add_lecture_keywords_per_paragraph(paragraph_counter, paragraph_keywords)
                 self.text_to_graph(lecture_words)
-                ranked_words = nx.pagerank(self.graph)
+                ranked_words = pagerank(self.graph, args.ranker)
                 lecture_keywords = sorted(ranked_words, key=ranked_words.get, reverse=True)[:self.lecture_dimension]
                 self.add_lecture_keywords(lecture_keywords)
 
@@ -229,7 +234,7 @@ if __name__ == '__main__':
                     list_of_words.extend(i)
                 self.text_to_graph(list_of_words)  # the graph of words
                 road = self.snail_road()  # the snail road inside the matrix
-                page = nx.pagerank(self.graph)
+                page = pagerank(self.graph, args.ranker)
                 keywords = sorted(page, key=page.get, reverse=True)
                 added_keywords = []  # keywords already added in the puzzle
                 for location in road:
@@ -468,7 +473,11 @@ if __name__ == '__main__':
                     except:
                         log("Can not create lecture output directory {}".format(course_output_path), log_file)
                         return False
-                tree_name = "Tree#" + transcript_name + ".txt"
+                if args.ranker in APPROXIMATE_RANKERS:
+                    # previews never overwrite the Tree of an exact run
+                    tree_name = "TreePreview#" + transcript_name + ".txt"
+                else:
+                    tree_name = "Tree#" + transcript_name + ".txt"
                 lecture_output_path = os.path.join(course_output_path, tree_name)
                 lz.write_to_file(lecture_output_path)
                 lz.print_tree()
@@ -494,6 +503,8 @@ if __name__ == '__main__':
     parser.add_argument("-np", "--nb_keywords_per_paragraph", required = True, type=int, help="nb_keywords_per_paragraph")
     parser.add_argument("-nl", "--nb_keywords_per_lecture", required = True, type=int, help="nb_keywords_per_lecture")
     parser.add_argument("-t", "--transcript", required = False, type=int, help="Transcript number")
+    parser.add_argument("-r", "--ranker", required = False, type=str, default='pagerank', choices=RANKERS + APPROXIMATE_RANKERS,
+                        help="Ranker of the keywords, the approximate degree and power rankers write provisional TreePreview files")
     args = parser.parse_args()
 
     variables = vars(args) # create dictionary out of parsed arguments
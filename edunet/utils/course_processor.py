@@ -1,351 +1,755 @@
 '''
-File used to process courses and create text files that contain the Tree and Puzzle of knowledge.
+File used to process courses and create the files that contain the Tree and Puzzle of knowledge.
 '''
 __author__ = 'becheru'
 __author__ = 'boutin'
 
 import os
+import json
 import shutil
 import zipfile
 import glob
 
 from datetime import datetime
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 
-from bs4 import BeautifulSoup
-import nltk as nl
 import networkx as nx
 
 import wget
 
-def course_processor(link, keywords_paragraph, keywords_lecture, puzz_dim, transcript=None):
+from .text_pipeline import tokenize_paragraph, tag_paragraphs, shared_tagger, filter_nouns
+from .stage_cache import StageCache, file_hash, stage_key
+from .lemma_cache import shared_lemma_cache
+from .noun_lexicon import NOUN_EXTRACTORS, shared_noun_lexicon
+from .html_extractor import extract_paragraphs, TranscriptStream
+from .ranking import APPROXIMATE_RANKERS, IterationProfile, pagerank, pagerank_batch, top_words
+from .word_graph import GRAPH_BUILDERS, SEPARATOR, build_id_graph, build_word_graph
+from .vocabulary import Vocabulary, EncodedParagraphs
+from .paragraph_memo import text_hash, boilerplate_paragraphs, shared_paragraph_memo
+from .puzzle_engine import PuzzleEngine, puzzle_dimensions, write_puzzle_artifact
+from .tree_artifact import english_stop_words, tree_artifact, write_tree_artifact
+
+STAGE_FORMAT_VERSION = 1  # changes the key of every stage when the layout of the artifacts changes
+
+
+class ProcessorSettings:
+    '''
+    Class used to hold the options of a course_processor run, shared with worker processes.
+
+    Options:
+        batch_tagging
+            POS tags every paragraph of a lecture in one call instead of one call per paragraph
+        use_cache
+            keeps the artifact of every stage, the lemmas and the paragraph memo in cache_dir so
+            a rerun only recomputes the stages whose transcript or configuration changed
+        html_extractor
+            engine pulling the paragraphs out of the transcripts: 'stream' (no DOM) or 'soup'
+            (BeautifulSoup)
+        tokenizer
+            how the paragraphs are split into words: 'word_tokenize' (NLTK) or 'fast' (a single
+            pass with precompiled patterns that also marks the end of every sentence)
+        noun_extractor
+            how the nouns are found: 'tagger' (POS tagging) or 'lexicon' (an approximate lookup
+            in the noun lexicon and WordNet, for previews, that logs its keyword overlap with
+            the tagger)
+        learn_lexicon
+            a tagger run teaches the noun lexicon the tags of its lectures and saves it
+        streaming
+            the paragraphs of a lecture are read, tagged and ranked one at a time instead of
+            stage by stage, the tokens and tags stages are not cached
+        ranker
+            how the words are ranked: 'numpy' (vectorized power iteration) or 'pagerank'
+            (networkx), both exact, or the approximate 'degree' (weight of the links to a word)
+            or 'power' (a few power iterations) for provisional Trees, which log their keyword
+            overlap with pagerank
+        paragraph_batch_size
+            paragraphs ranked together in one block diagonal system, with streaming a batch is
+            handed out once its last paragraph is read
+        graph_builder
+            how the co-occurrence graphs are built: 'networkx' (every noun linked to the next
+            one) or 'weighted' (nouns as integer ids and edge weights counted in bulk)
+        cooccurrence_window
+            nouns following a noun that the weighted builder links to it
+        paragraph_memo
+            the nouns and ranking of every paragraph are memoized by the hash of its text, so a
+            paragraph seen before is neither tagged nor ranked again
+        skip_boilerplate
+            the paragraphs found in at least boilerplate_lectures lectures of the run are left
+            out of the Trees and Puzzles
+        boilerplate_lectures
+            lectures a paragraph has to be found in to be boilerplate
+        warm_start
+            the pagerank of a paragraph starts from the ranks of its nouns in the lecture
+            instead of a uniform vector
+        pagerank_tol
+            convergence tolerance of every pagerank
+        pagerank_max_iter
+            maximum number of iterations of every pagerank
+    '''
+    def __init__(self, keywords_paragraph, keywords_lecture, puzz_dim, cache_dir,
+                 batch_tagging=True, use_cache=True, html_extractor='stream',
+                 tokenizer='word_tokenize', noun_extractor='tagger', streaming=True,
+                 ranker='numpy', paragraph_batch_size=256, graph_builder='networkx',
+                 cooccurrence_window=2, paragraph_memo=True, skip_boilerplate=False,
+                 boilerplate_lectures=5, warm_start=False, pagerank_tol=1.0e-6,
+                 pagerank_max_iter=100, learn_lexicon=False):
+        self.keywords_paragraph = keywords_paragraph
+        self.keywords_lecture = keywords_lecture
+        self.puzz_dim = puzz_dim
+        self.puzzle_dimensions = puzzle_dimensions(puzz_dim)
+        self.cache_dir = cache_dir
+        self.batch_tagging = batch_tagging
+        self.use_cache = use_cache
+        self.html_extractor = html_extractor
+        self.tokenizer = tokenizer
+        self.noun_extractor = noun_extractor
+        self.learn_lexicon = learn_lexicon
+        self.streaming = streaming
+        self.ranker = ranker
+        self.paragraph_batch_size = max(paragraph_batch_size, 1)
+        self.graph_builder = graph_builder
+        self.cooccurrence_window = cooccurrence_window
+        self.paragraph_memo = paragraph_memo
+        self.skip_boilerplate = skip_boilerplate
+        self.boilerplate_lectures = boilerplate_lectures
+        self.warm_start = warm_start
+        self.pagerank_tol = pagerank_tol
+        self.pagerank_max_iter = pagerank_max_iter
+        self.boilerplate = frozenset()  # hashes of the boilerplate paragraphs, see boilerplate_paragraphs # pylint: disable=line-too-long
+        self.paragraph_memo_file = os.path.join(cache_dir, "paragraph_memo.json")
+        self.lemma_cache_file = os.path.join(cache_dir, "lemmas.json")
+        self.noun_lexicon_file = os.path.join(cache_dir, "noun_lexicon.json")
+
+
+def words_to_graph(graph, list_of_words, previous_word=None):
     '''
-    Function used that processes courses to create text files that contains the Tree and
-    Puzzle of Knowledge. Duplicate Trees are replaced while puzzles are continously added
-    to the existing files even if the dimensions are the same.
+    Function adds a list of words to a co-occurrence graph, linking every word to the next one
+    and the first word to previous_word if given, and returns the last word of the list.
     '''
+    for word in list_of_words:
+        graph.add_node(word)
+        if previous_word is not None:
+            graph.add_edge(previous_word, word, weight=1)
+        previous_word = word
+    return previous_word
 
-    wnl = nl.WordNetLemmatizer()
 
-    class Lecture:
-        '''Class used to parse the course lectures.'''
-        def __init__(self, path, name):
-            self.name = name
-            self.path = path
-            self.graph = nx.DiGraph()
+def paragraph_graph(paragraph_nouns):
+    '''Function takes the nouns of a paragraph and returns their co-occurrence graph.'''
+    graph = nx.DiGraph()
+    words_to_graph(graph, paragraph_nouns)
+    if graph.has_node("."):
+        graph.remove_node(".")
+    return graph
 
-        def nlp_pipeline(self):
-            """Passes document through html parsing and nlp pipeline and returns a list of nouns."""
-            file_in = open(self.path, encoding='utf-8')
-            soup = BeautifulSoup(file_in, "html.parser")  # parse html
-            soup_paragraphs = soup.find_all('p')  # retrieve all paragraphs
-            try:
-                # not all transcripts have titles
-                soup_lecture_title = soup.find('h3').getText() # assuming first and only h3 tag is the title
-                # clean up the title
-                lecture_title_list = soup_lecture_title.split('-', 1)
-                lecture_title = lecture_title_list[1].split('[')[0]
-                lecture_title = lecture_title.strip()
-            except AttributeError:
-                lecture_title = ''
-            list_of_nouns = []  # the resulting list of nouns
-
-            # each paragraph is parsed through nlp pipeline
-            for paragraph in soup_paragraphs[:-3]:  # the last three vector are null respective [end,of,transcript] pylint: disable=line-too-long
-                text = paragraph.getText()
-
-                # Tokenization
-                tokens = nl.word_tokenize(text, language="english")
-                for token in tokens:
-                    if token.isalpha() == 0:
-                        tokens.remove(token)
-
-                # POS tagginng filtering for NOUNS
-                text_pos = nl.pos_tag(tokens)
-                tokens_pos = []
-                for token_pos in text_pos:
-                    if token_pos[1][0:2] == "NN" or token_pos[0] == ".":
-                        try:
-                            tokens_pos.append(token_pos[0])
-                        except:
-                            tokens_pos(token_pos[0])
-
-                # lemmatization
-                lemmas = []
-                for s in tokens_pos:
-                    try:
-                        lemmas.append(wnl.lemmatize(s))
-                    except:
-                        lemmas.append(s)
-
-                # lower casing
-                paragraph_nouns = [word.lower() for word in lemmas]  # list of nouns per paragraph
-                list_of_nouns.append(paragraph_nouns)
-
-            return list_of_nouns, lecture_title  # return the list of nouns per document and the title of the document
-
-        def text_to_graph(self, list_of_words):
-            '''Function used to add text to a graph in order to determine relevancy.'''
-            if list_of_words != []:
-                self.graph.add_node(list_of_words[0])
-                for i in range(1, len(list_of_words)):
-                    self.graph.add_node(list_of_words[i])
-                    self.graph.add_edge(list_of_words[i - 1], list_of_words[i], weight=1)
-                if self.graph.has_node("."):
-                    self.graph.remove_node(".")
-
-
-    class TreeOfKnowledge(Lecture):
-        '''Class used to create the Tree of Knowledge.'''
-        def __init__(self, paragraph_dimension, lecture_dimension, name, path, title=None):
-            self.name = name
-            self.path = path
-            self.lecture_title = title
-            self.paragraph_dimension = paragraph_dimension
-            self.lecture_dimension = lecture_dimension
-            self.lecture_keywords = []
-            self.lecture_keywords_per_paragraph = {}
-            self.graph = nx.DiGraph()
-
-        def add_lecture_keywords(self, keywords):
-            '''Function to add lecture keywords to Tree of Knowledge.'''
-            self.lecture_keywords.extend(keywords)
-
-        def add_lecture_keywords_per_paragraph(self, paragraph, keywords):
-            '''Function to add paragraph keywords to Tree of Knowledge.'''
-            self.lecture_keywords_per_paragraph[paragraph] = keywords
-
-        def analysis(self):
-            '''Function used to analyze text and then create the Tree of Knowledge.'''
-            lecture_words = []
-            words, self.lecture_title = self.nlp_pipeline()
-            paragraph_counter = 0
-            for word in words:
-                paragraph_counter += 1
-                lecture_words.extend(word)
-                self.text_to_graph(word)
-                ranked_words = nx.pagerank(self.graph)
-                self.graph = nx.DiGraph()
-                paragraph_keywords = sorted(ranked_words, key=ranked_words.get, reverse=True)[:self.paragraph_dimension] # pylint: disable=line-too-long
-                self.add_lecture_keywords_per_paragraph(paragraph_counter, paragraph_keywords)
-            self.text_to_graph(lecture_words)
-            ranked_words = nx.pagerank(self.graph)
-            lecture_keywords = sorted(ranked_words, key=ranked_words.get, reverse=True)[:self.lecture_dimension] # pylint: disable=line-too-long
-            self.add_lecture_keywords(lecture_keywords)
-
-        def write_to_file(self, file_path):
-            '''Function writes Tree of Knowledge to file.'''
-            file = open(file_path, "w")
-            file.write("\n" + self.name + '-' + self.lecture_title + ":")
-            file.write("\n--------Lecture: ")
-            for k in self.lecture_keywords:
-                file.write(str(k.encode('utf-8', errors='ignore')) + " ")
-            for paragraph in self.lecture_keywords_per_paragraph.keys():
-                file.write("\n--------" + str(paragraph) + " paragraph: ")
-                for k in self.lecture_keywords_per_paragraph[paragraph]:
-                    file.write(str(k.encode('utf-8', errors='ignore')) + " ")
-            file.close()
-
-
-    class PuzzleOfKnowledge(Lecture):
-        '''Class used to create the Puzzle of Knowledge.'''
-        def __init__(self, name, path, puzzle_dimension, title=None):
-            self.name = name
-            self.path = path
-            self.lecture_title = title
-            self.puzzle_dimension = puzzle_dimension
-            self.graph = nx.DiGraph()
-
-        def snail_road(self):
-            '''
-            Creates snail path of matrix that is used to create Puzzle of Knowledge
-            because path is in order of word relevancy.
-            '''
-            # Input nr of lines in a lines x linex matrix
-            # Output an ordered vector with the snail path of the matrix
-            # each element of the vector is a dictionary where key is repsents
-            # the line and value represents the column
-
-            lines = self.puzzle_dimension
-            stop = lines / 2
-            snail = []
-            tmp = 0
-            while lines > stop:
-                x = range(tmp, lines - 1)
-                for i in x:
-                    snail.append({tmp: i})
-                for i in x:
-                    snail.append({i: lines - 1})
-                x = reversed(range(tmp + 1, lines))
-                for i in x:
-                    snail.append({lines - 1: i})
-                for i in x:
-                    snail.append({i: tmp})
-                lines -= 1
-                tmp = tmp + 1
-            if self.puzzle_dimension % 2 == 1:
-                snail.append({stop: stop})
-            snail.reverse()
-            return snail
-
-        def check(self, k, a, l, c):
-            '''Function to check neighbors of the current puzzle piece.'''
-            # check the puzzle table for pieces around the current piece of puzzle
-            # and determines the piece that fits best
-
-            # check the pieces of puzzle around the current piece
-            neigbors = []
-            contor = 0
-            # Allow for odd puzzles by converted all floats to integers
-            c = int(c)
-            l = int(l)
-            # east
-            graph = self.graph.to_undirected()
-            if c < self.puzzle_dimension - 1 and self.puzzle[l][c + 1] != "*":
-                neigbors.extend(graph.adjacency_list()[graph.nodes().index(self.puzzle[l][c + 1])])
-                contor += 1
-            # west
-            if c > 0 and self.puzzle[l][c - 1] != "*":
-                neigbors.extend(graph.adjacency_list()[graph.nodes().index(self.puzzle[l][c - 1])])
-                contor += 1
-            # north
-            if l > 0 and self.puzzle[l - 1][c] != "*":
-                neigbors.extend(graph.adjacency_list()[graph.nodes().index(self.puzzle[l - 1][c])])
-                contor += 1
-            # south
-            if l < self.puzzle_dimension - 1 and self.puzzle[l + 1][c] != "*":
-                neigbors.extend(graph.adjacency_list()[graph.nodes().index(self.puzzle[l + 1][c])])
-                contor += 1
-
-            possible_nodes = []
-            if contor == 0:
-                # there are no pieces of puzzle around
-                return k[0]
-            elif contor == 1:
-                # there is nust one piece of puzzle around
-                possible_nodes.extend(neigbors)
-            else:
-                # there are multiple pieces of puzzle around
-                set_of_neighbors = set(neigbors)
-                for node in set_of_neighbors:
-                    if neigbors.count(node) == contor:
-                        possible_nodes.append(node)
-
-            # remove from the possible pieces of puzzle the ones already present in the puzzle
-            for node in a:
-                if node in possible_nodes:
-                    possible_nodes.remove(node)
-
-            if possible_nodes == []:
-                # no solution could be found
-                return "*"
+
+def cooccurrence_graph(words, graph_builder='networkx', window=2):
+    '''
+    Function takes a list of words and returns their co-occurrence graph built with the given
+    graph builder, the window is only used by the weighted builder.
+    '''
+    if graph_builder == 'networkx':
+        return paragraph_graph(words)
+    if graph_builder == 'weighted':
+        return build_word_graph(words, window)
+    raise ValueError('Unknown graph builder {}, use one of {}'.format(graph_builder, GRAPH_BUILDERS))
+
+
+def score_paragraph_batch(paragraphs_nouns, ranker='pagerank', graph_builder='networkx', window=2,
+                          **pagerank_options):
+    '''
+    Function takes the nouns of several paragraphs and a ranker and returns the pagerank of
+    every noun of every paragraph, the numpy ranker ranks them all in one block diagonal system.
+    The other options (nstarts, tol, max_iter, iterations) are the ones of pagerank_batch.
+    '''
+    graphs = [cooccurrence_graph(paragraph_nouns, graph_builder, window) for paragraph_nouns in paragraphs_nouns] # pylint: disable=line-too-long
+    return pagerank_batch(graphs, ranker, **pagerank_options)
+
+
+def rank_paragraph_batch(paragraphs_nouns, ranker='pagerank', graph_builder='networkx', window=2):
+    '''
+    Function takes the nouns of several paragraphs and a ranker and returns every paragraph
+    ranked by pagerank, the numpy ranker ranks them all in one block diagonal system.
+    '''
+    return [top_words(ranked_words) for ranked_words in score_paragraph_batch(paragraphs_nouns, ranker, graph_builder, window)] # pylint: disable=line-too-long
+
+
+def lecture_stage_keys(transcript_hash, settings, noun_extractor=None, ranker=None):
+    '''
+    Returns the cache key of every stage of the lecture with the given transcript hash, for the
+    noun extractor and ranker of the settings unless others are given.
+    '''
+    noun_extractor = noun_extractor or settings.noun_extractor
+    ranker = ranker or settings.ranker
+    keys = {}
+    keys['paragraphs'] = stage_key(transcript_hash, 'paragraphs', {'extractor': settings.html_extractor, 'format': STAGE_FORMAT_VERSION}) # pylint: disable=line-too-long
+    keys['tokens'] = stage_key(keys['paragraphs'], 'tokens', {'tokenizer': settings.tokenizer})
+    keys['tags'] = stage_key(keys['tokens'], 'tags', {'tagger': 'perceptron'})
+    if noun_extractor == 'lexicon':
+        # the tags are never computed, the nouns only depend on the tokens and the lexicon
+        keys['nouns'] = stage_key(keys['tokens'], 'nouns', {'lemmatizer': 'wordnet', 'extractor': 'lexicon', 'lexicon': shared_noun_lexicon().state_hash(), 'encoding': 'int32'}) # pylint: disable=line-too-long
+    else:
+        keys['nouns'] = stage_key(keys['tags'], 'nouns', {'lemmatizer': 'wordnet', 'encoding': 'int32'}) # pylint: disable=line-too-long
+    if settings.skip_boilerplate:
+        # the nouns of the boilerplate paragraphs are left out
+        keys['nouns'] = stage_key(keys['nouns'], 'boilerplate', {'hashes': tuple(sorted(settings.boilerplate))}) # pylint: disable=line-too-long
+    graph_config = {}
+    if settings.graph_builder != 'networkx':
+        # the networkx graphs keep the keys they were cached under before the weighted builder
+        graph_config = {'builder': settings.graph_builder, 'window': settings.cooccurrence_window}
+    rank_config = {'ranker': ranker}
+    if (settings.pagerank_tol, settings.pagerank_max_iter) != (1.0e-6, 100):
+        rank_config.update(tol=settings.pagerank_tol, max_iter=settings.pagerank_max_iter)
+    paragraph_rank_config = dict(graph_config, **rank_config)
+    if settings.warm_start:
+        paragraph_rank_config.update(warm_start=True)
+    keys['graph'] = stage_key(keys['nouns'], 'graph', graph_config)
+    keys['ranks'] = stage_key(keys['graph'], 'ranks', rank_config)
+    keys['paragraph_scores'] = stage_key(keys['nouns'], 'paragraph_scores', paragraph_rank_config)
+    return keys
+
+class Lecture:
+    '''Class used to parse the course lectures.'''
+    def __init__(self, path, name, settings):
+        self.name = name
+        self.path = path
+        self.settings = settings
+        self.graph = nx.DiGraph()
+
+    def extract_paragraphs(self):
+        """Parses the html document and returns the text of its paragraphs and its title."""
+        with open(self.path, encoding='utf-8') as file_in:
+            html = file_in.read()
+        return extract_paragraphs(html, engine=self.settings.html_extractor)
+
+    def tokenize(self, paragraphs):
+        """Tokenizes every paragraph up front so they can be tagged together."""
+        return [tokenize_paragraph(text, self.settings.tokenizer) for text in paragraphs]
+
+    def tag(self, paragraph_tokens):
+        """POS tags the tokens of every paragraph."""
+        return tag_paragraphs(paragraph_tokens, batched=self.settings.batch_tagging)
+
+    def select_nouns(self, tokens, tags):
+        """
+        Returns the nouns and separators of every paragraph, tokens and tags are functions
+        returning the tokens and tags of every paragraph so only the ones needed are computed.
+        """
+        noun_lexicon = shared_noun_lexicon()  # shared by every lecture of every course in the process
+        if self.settings.noun_extractor == 'lexicon':
+            return [noun_lexicon.filter_nouns(paragraph_tokens) for paragraph_tokens in tokens()]
+        if self.settings.noun_extractor == 'tagger':
+            paragraph_tags = tags()
+            if self.settings.learn_lexicon:
+                noun_lexicon.learn(paragraph_tags)
+            # POS tagginng filtering for NOUNS
+            return [filter_nouns(text_pos) for text_pos in paragraph_tags]
+        raise ValueError('Unknown noun extractor {}, use one of {}'.format(self.settings.noun_extractor, NOUN_EXTRACTORS)) # pylint: disable=line-too-long
+
+    def lemmatize(self, paragraph_nouns):
+        """Returns the lemmas of the nouns of every paragraph."""
+        lemma_cache = shared_lemma_cache()  # shared by every lecture of every course in the process
+        list_of_nouns = []  # the resulting list of nouns
+        for tokens_pos in paragraph_nouns:
+            # lemmatization
+            lemmas = [lemma_cache.lemmatize(s) for s in tokens_pos]
+
+            # lower casing
+            paragraph_nouns = [word.lower() for word in lemmas]  # list of nouns per paragraph
+            list_of_nouns.append(paragraph_nouns)
+        return list_of_nouns
+
+    def nlp_pipeline(self):
+        """Passes document through html parsing and nlp pipeline and returns a list of nouns."""
+        paragraphs, lecture_title = self.extract_paragraphs()
+        paragraph_tokens = self.tokenize(paragraphs)
+        paragraph_nouns = self.select_nouns(lambda: paragraph_tokens, lambda: self.tag(paragraph_tokens)) # pylint: disable=line-too-long
+        list_of_nouns = self.lemmatize(paragraph_nouns)
+        return list_of_nouns, lecture_title  # return the list of nouns per document and the title of the document
+
+    def text_to_graph(self, list_of_words):
+        '''Function used to add text to a graph in order to determine relevancy.'''
+        if list_of_words != []:
+            words_to_graph(self.graph, list_of_words)
+            if self.graph.has_node("."):
+                self.graph.remove_node(".")
+
+
+class LectureAnalysis(Lecture):
+    '''
+    Class used to parse a lecture once and share the nouns, title, co-occurrence graph and
+    ranking of the lecture between the Tree and Puzzle of Knowledge. The lecture is analysed
+    while its paragraph rankings are consumed, with streaming the paragraphs are read, tagged
+    and ranked one at a time so the first ranking comes before the later paragraphs are read.
+    The rankings keep the pagerank of every word so any number of keywords can be picked.
+    The nouns are held as ids in the vocabulary of the lecture and only decoded for the graphs.
+    With warm_start the paragraphs are ranked starting from the lecture ranks, so they are only
+    ranked once the whole lecture is read and ranked.
+    '''
+    def __init__(self, path, name, settings, stage_cache):
+        super().__init__(path, name, settings)
+        self.stage_cache = stage_cache
+        self.transcript_hash = file_hash(path)
+        self.stage_keys = lecture_stage_keys(self.transcript_hash, settings)
+        self.paragraph_nouns = EncodedParagraphs()
+        self.lecture_title = ''
+        self.lecture_scores = {}
+        self.lecture_keywords = []
+        self.keyword_overlap = None
+        self.ranking_overlap = None
+        self.iterations = {'paragraph': [], 'lecture': []}  # of every graph the numpy ranker ranked
+
+    def tagger_keyword_overlap(self):
+        '''
+        Returns how many of the top lecture keywords found with the noun lexicon the tagger
+        found too and how many were compared, None if no full run of the lecture is cached.
+        '''
+        tagger_keys = lecture_stage_keys(self.transcript_hash, self.settings, noun_extractor='tagger') # pylint: disable=line-too-long
+        ranked_words = self.stage_cache.get('ranks', tagger_keys['ranks'])
+        if ranked_words is None:
+            return None
+        count = self.settings.keywords_lecture
+        tagger_keywords = top_words(ranked_words, count)
+        return len(set(tagger_keywords) & set(self.lecture_keywords[:count])), len(tagger_keywords) # pylint: disable=line-too-long
+
+    def exact_ranking_overlap(self):
+        '''
+        Returns how many of the top lecture keywords found with an approximate ranker are in
+        the top keywords of the exact pagerank and how many were compared. The exact ranks of
+        the lecture graph are cached for the exact run, the paragraphs are not ranked exactly.
+        '''
+        exact_keys = lecture_stage_keys(self.transcript_hash, self.settings, ranker='numpy')
+        ranked_words = self.stage_cache.cached('ranks', exact_keys['ranks'], lambda: pagerank(self.graph, 'numpy', tol=self.settings.pagerank_tol, max_iter=self.settings.pagerank_max_iter)) # pylint: disable=line-too-long
+        count = self.settings.keywords_lecture
+        exact_keywords = top_words(ranked_words, count)
+        return len(set(exact_keywords) & set(self.lecture_keywords[:count])), len(exact_keywords) # pylint: disable=line-too-long
+
+    def cached(self, stage, compute):
+        '''Returns the cached artifact of a stage of this lecture, computing it if needed.'''
+        return self.stage_cache.cached(stage, self.stage_keys[stage], compute)
+
+    def paragraph_rankings(self):
+        """
+        Generator yielding the pagerank of every word of every paragraph of the lecture. Once
+        every ranking is yielded the nouns, title, graph and keywords of the lecture are set.
+        """
+        nouns = self.stage_cache.lookup('nouns', self.stage_keys['nouns'])
+        if nouns is None and self.settings.streaming:
+            yield from self.stream_rankings()
+            return
+        if nouns is None:
+            list_of_nouns, lecture_title = self.nlp_pipeline()
+            self.paragraph_nouns.extend(list_of_nouns)
+            nouns = (self.paragraph_nouns, lecture_title)
+            self.stage_cache.put('nouns', self.stage_keys['nouns'], nouns)
+        self.paragraph_nouns, self.lecture_title = nouns
+        self.graph = self.cached('graph', self.build_graph)  # the graph of words
+        self.rank_lecture()
+        yield from self.cached('paragraph_scores', self.rank_paragraphs)
+
+    def nlp_pipeline(self):
+        """
+        Runs the nlp pipeline through the stage cache, stages are only computed when
+        their artifact is not cached.
+        """
+        paragraphs, lecture_title = self.cached('paragraphs', self.extract_paragraphs)
+
+        def tokens():
+            return self.cached('tokens', lambda: self.tokenize(paragraphs))
+
+        def tags():
+            return self.cached('tags', lambda: self.tag(tokens()))
+
+        list_of_nouns = self.lemmatize(self.select_nouns(tokens, tags))
+        if self.settings.skip_boilerplate:
+            list_of_nouns = [nouns for text, nouns in zip(paragraphs, list_of_nouns) if text_hash(text) not in self.settings.boilerplate] # pylint: disable=line-too-long
+        return list_of_nouns, lecture_title
+
+    def stream_nouns(self, texts):
+        """
+        Generator yielding the lemmas of the nouns of every paragraph as its text comes, with
+        the paragraph memo a paragraph already seen is neither tokenized nor tagged again.
+        """
+        memo = shared_paragraph_memo() if self.settings.paragraph_memo else None
+        memo_config = {'tokenizer': self.settings.tokenizer, 'extractor': self.settings.noun_extractor, 'lemmatizer': 'wordnet'} # pylint: disable=line-too-long
+        if self.settings.noun_extractor == 'lexicon':
+            memo_config['lexicon'] = shared_noun_lexicon().state_hash()
+
+        def tags(tokens):
+            return [shared_tagger().tag(tokens)]
+
+        for text in texts:
+            if memo is not None:
+                key = memo.nouns_key(text, memo_config)
+                nouns = memo.get('nouns', key)
+                if nouns is not None:
+                    yield nouns
+                    continue
+            tokens = tokenize_paragraph(text, self.settings.tokenizer)
+            nouns = self.lemmatize(self.select_nouns(lambda: [tokens], lambda: tags(tokens)))[0] # pylint: disable=line-too-long
+            if memo is not None:
+                memo.put('nouns', key, nouns)
+            yield nouns
+
+    def stream_rankings(self):
+        """
+        Generator chaining the html parsing, tokenizing, tagging and noun selection of every
+        paragraph with its ranking, the lecture graph is built along the way. Only the nouns
+        and rankings are kept, the tokens and tags of a paragraph are dropped once used.
+        """
+        transcript = TranscriptStream(self.path, engine=self.settings.html_extractor)
+        texts = iter(transcript)
+        if self.settings.skip_boilerplate:
+            texts = (text for text in texts if text_hash(text) not in self.settings.boilerplate)
+        rankings = []
+        previous_word = None
+        batch_start = 0  # first paragraph waiting to be ranked
+        for paragraph_nouns in self.stream_nouns(texts):
+            self.paragraph_nouns.append(paragraph_nouns)
+            if self.settings.graph_builder == 'networkx':
+                previous_word = words_to_graph(self.graph, paragraph_nouns, previous_word)
+            if self.settings.warm_start:
+                continue  # the paragraphs start from the lecture ranks
+            if len(self.paragraph_nouns) - batch_start == self.settings.paragraph_batch_size:
+                batch_rankings = self.score_paragraph_batch(batch_start, len(self.paragraph_nouns))
+                rankings.extend(batch_rankings)
+                batch_start = len(self.paragraph_nouns)
+                yield from batch_rankings
+        if not self.settings.warm_start and batch_start < len(self.paragraph_nouns):
+            batch_rankings = self.score_paragraph_batch(batch_start, len(self.paragraph_nouns))
+            rankings.extend(batch_rankings)
+            yield from batch_rankings
+        if self.graph.has_node("."):
+            self.graph.remove_node(".")
+        self.lecture_title = transcript.title
+        self.stage_cache.put('nouns', self.stage_keys['nouns'], (self.paragraph_nouns, self.lecture_title)) # pylint: disable=line-too-long
+        if self.settings.graph_builder == 'networkx':
+            self.graph = self.cached('graph', lambda: self.graph)
+        else:
+            self.graph = self.cached('graph', self.build_graph)
+        self.rank_lecture()
+        if self.settings.warm_start:
+            yield from self.cached('paragraph_scores', self.rank_paragraphs)
+        else:
+            self.cached('paragraph_scores', lambda: rankings)
+
+    def rank_paragraphs(self):
+        '''Returns the pagerank of the nouns of every paragraph of the lecture, ranked in batches.'''
+        rankings = []
+        batch_size = self.settings.paragraph_batch_size
+        for start in range(0, len(self.paragraph_nouns), batch_size):
+            rankings.extend(self.score_paragraph_batch(start, min(start + batch_size, len(self.paragraph_nouns)))) # pylint: disable=line-too-long
+        return rankings
+
+    def score_paragraph_batch(self, start, stop):
+        '''
+        Returns the pagerank of the nouns of the paragraphs from start to stop, with the
+        paragraph memo the nouns ranked before are not ranked again.
+        '''
+        indexes = range(start, stop)
+        if not self.settings.paragraph_memo or self.settings.warm_start:
+            # warm started ranks depend on the lecture, not only on the nouns
+            return self.score_paragraphs(indexes)
+        memo = shared_paragraph_memo()
+        memo_config = {'ranker': self.settings.ranker, 'builder': self.settings.graph_builder, 'window': self.settings.cooccurrence_window, 'tol': self.settings.pagerank_tol, 'max_iter': self.settings.pagerank_max_iter} # pylint: disable=line-too-long
+        keys = [memo.scores_key(self.paragraph_nouns.paragraph(index), memo_config) for index in indexes] # pylint: disable=line-too-long
+        scores = {}
+        missing = {}  # key to the first paragraph of the batch with it
+        for index, key in zip(indexes, keys):
+            if key in scores or key in missing:
+                continue
+            ranked_words = memo.get('scores', key)
+            if ranked_words is None:
+                missing[key] = index
             else:
-                # there are multiple solutions of a puzzle piece
-                # we choose the one with the highest page_rank
-                tmp = "*"
-                min = 100000
-                for node in possible_nodes:
-                    if node in k and k.index(node) < min:
-                        min = k.index(node)
-                        tmp = node
-                return tmp
-
-        def create_puzzle(self):
-            '''Function used to create puzzle file from all of the pieces.'''
-            self.puzzle = [["*" for i in range(self.puzzle_dimension)] for j in range(self.puzzle_dimension)] # pylint: disable=line-too-long
-            # get all the paragraphs together in one text
-            tmp_vector, self.lecture_title = self.nlp_pipeline()
-            list_of_words = []
-            for i in tmp_vector:
-                list_of_words.extend(i)
-            self.text_to_graph(list_of_words)  # the graph of words
-            road = self.snail_road()  # the snail road inside the matrix
-            page = nx.pagerank(self.graph)
-            keywords = sorted(page, key=page.get, reverse=True)
-            added_keywords = []  # keywords already added in the puzzle
-            for location in road:
-                line = int(list(location.keys())[0])
-                column = int(list(location.values())[0])
-                name = self.check(keywords, added_keywords, line, column)
-                if name != "*":
-                    keywords.remove(name)
-                    added_keywords.extend(name)
-                self.puzzle[line][column] = name
-
-        def write_to_file(self, file_path):
-            '''Function that writes puzzle to a file.'''
-            file = open(file_path, "a")
-            file.write(self.lecture_title + '-' + str(self.puzzle_dimension) + ":\n")
-            for i in range(self.puzzle_dimension):
-                for j in range(self.puzzle_dimension):
-                    text = self.puzzle[i][j]
-                    specification = []
-                    # west
-                    if j > 0:
-                        if self.puzzle[i][j - 1] != "*":
-                            if self.graph.has_edge(self.puzzle[i][j], self.puzzle[i][j - 1]):
-                                if self.graph.has_edge(self.puzzle[i][j - 1], self.puzzle[i][j]):
-                                    self.graph.remove_edge(self.puzzle[i][j - 1], self.puzzle[i][j])
-                                specification.append("up")
-                            else:
-                                specification.append("down")
-                        else:
-                            specification.append("up")
-                    else:
-                        specification.append("")
-                    # south
-                    if i < self.puzzle_dimension - 1:
-                        if self.puzzle[i + 1][j] != "*":
-                            if self.graph.has_edge(self.puzzle[i][j], self.puzzle[i + 1][j]):
-                                if self.graph.has_edge(self.puzzle[i + 1][j], self.puzzle[i][j]):
-                                    self.graph.remove_edge(self.puzzle[i + 1][j], self.puzzle[i][j])
-                                specification.append("up")
-                            else:
-                                specification.append("down")
-                        else:
-                            specification.append("up")
-                    else:
-                        specification.append("")
-                    # east
-                    if j < self.puzzle_dimension - 1:
-                        if self.puzzle[i][j + 1] != "*":
-                            if self.graph.has_edge(self.puzzle[i][j], self.puzzle[i][j + 1]):
-                                if self.graph.has_edge(self.puzzle[i][j + 1], self.puzzle[i][j]):
-                                    self.graph.remove_edge(self.puzzle[i][j + 1], self.puzzle[i][j])
-                                specification.append("up")
-                            else:
-                                specification.append("down")
-                        else:
-                            specification.append("up")
-                    else:
-                        specification.append("")
-                    # north
-                    if i > 0:
-                        if self.puzzle[i - 1][j] != "*":
-                            if self.graph.has_edge(self.puzzle[i][j], self.puzzle[i - 1][j]):
-                                if self.graph.has_edge(self.puzzle[i - 1][j], self.puzzle[i][j]):
-                                    self.graph.remove_edge(self.puzzle[i - 1][j], self.puzzle[i][j])
-                                specification.append("up")
-                            else:
-                                specification.append("down")
-                        else:
-                            specification.append("up")
-                    else:
-                        specification.append("")
-                    file.write(str(text.encode('utf-8', errors='ignore')) + "#")
-                    for spec in specification:
-                        file.write(spec + "#")
-                    file.write(" ")
-                file.write("\n")
+                scores[key] = ranked_words
+        for key, ranked_words in zip(missing, self.score_paragraphs(list(missing.values()))):
+            memo.put('scores', key, ranked_words)
+            scores[key] = ranked_words
+        return [scores[key] for key in keys]
+
+    def score_paragraphs(self, indexes):
+        '''
+        Returns the pagerank of the nouns of the given paragraphs with the graph builder and
+        ranker of the settings, the weighted builder works on the ids of the nouns. With
+        warm_start every paragraph starts from the ranks of its words in the lecture.
+        '''
+        pagerank_options = {
+            'nstarts': [self.lecture_scores] * len(indexes) if self.settings.warm_start else None,
+            'tol': self.settings.pagerank_tol,
+            'max_iter': self.settings.pagerank_max_iter,
+            'iterations': self.iterations['paragraph'],
+        }
+        if self.settings.graph_builder == 'weighted':
+            vocabulary = self.paragraph_nouns.vocabulary
+            separator_id = vocabulary.get(SEPARATOR)
+            graphs = [build_id_graph(self.paragraph_nouns.paragraph_ids(index), vocabulary.words, self.settings.cooccurrence_window, separator_id) for index in indexes] # pylint: disable=line-too-long
+            return pagerank_batch(graphs, self.settings.ranker, **pagerank_options)
+        paragraphs_nouns = [self.paragraph_nouns.paragraph(index) for index in indexes]
+        return score_paragraph_batch(paragraphs_nouns, self.settings.ranker, self.settings.graph_builder, self.settings.cooccurrence_window, **pagerank_options) # pylint: disable=line-too-long
+
+    def build_graph(self):
+        '''Builds and returns the co-occurrence graph of the whole lecture.'''
+        if self.settings.graph_builder == 'weighted':
+            vocabulary = self.paragraph_nouns.vocabulary
+            return build_id_graph(self.paragraph_nouns.word_ids(), vocabulary.words, self.settings.cooccurrence_window, vocabulary.get(SEPARATOR)).to_networkx() # pylint: disable=line-too-long
+        self.text_to_graph(self.paragraph_nouns.words())
+        return self.graph
+
+    def rank_lecture(self):
+        '''Ranks the words of the lecture graph.'''
+        self.lecture_scores = self.cached('ranks', lambda: pagerank(self.graph, self.settings.ranker, tol=self.settings.pagerank_tol, max_iter=self.settings.pagerank_max_iter, iterations=self.iterations['lecture'])) # pylint: disable=line-too-long
+        self.lecture_keywords = top_words(self.lecture_scores)
+        if self.settings.noun_extractor == 'lexicon':
+            self.keyword_overlap = self.tagger_keyword_overlap()
+        if self.settings.ranker in APPROXIMATE_RANKERS:
+            self.ranking_overlap = self.exact_ranking_overlap()
+
+
+class TreeOfKnowledge(Lecture):
+    '''Class used to create the Tree of Knowledge.'''
+    def __init__(self, paragraph_dimension, lecture_dimension, lecture):
+        self.name = lecture.name
+        self.path = lecture.path
+        self.lecture = lecture
+        self.lecture_title = lecture.lecture_title
+        self.ranker = lecture.settings.ranker
+        self.paragraph_dimension = paragraph_dimension
+        self.lecture_dimension = lecture_dimension
+        self.lecture_keywords = []
+        self.lecture_keywords_per_paragraph = {}
+        self.lecture_scores = {}  # the pagerank of every word of the lecture
+        self.paragraph_scores = []  # the pagerank of every word of every paragraph
+        self.graph = nx.DiGraph()
+
+    def add_lecture_keywords(self, keywords):
+        '''Function to add lecture keywords to Tree of Knowledge.'''
+        self.lecture_keywords.extend(keywords)
+
+    def add_lecture_keywords_per_paragraph(self, paragraph, keywords):
+        '''Function to add paragraph keywords to Tree of Knowledge.'''
+        self.lecture_keywords_per_paragraph[paragraph] = keywords
+
+    def analysis(self):
+        '''Function used to analyze text and then create the Tree of Knowledge.'''
+        # every paragraph is added as soon as it is ranked, the full rankings are cached so a
+        # different paragraph_dimension needs no ranking
+        paragraph_counter = 0
+        for ranked_words in self.lecture.paragraph_rankings():
+            paragraph_counter += 1
+            self.paragraph_scores.append(ranked_words)
+            paragraph_keywords = top_words(ranked_words, self.paragraph_dimension)
+            self.add_lecture_keywords_per_paragraph(paragraph_counter, paragraph_keywords)
+        # the title is known and the lecture ranked once every paragraph is read, the lecture
+        # graph and ranking are shared with the Puzzle of Knowledge
+        self.lecture_title = self.lecture.lecture_title
+        self.lecture_scores = self.lecture.lecture_scores
+        self.add_lecture_keywords(self.lecture.lecture_keywords[:self.lecture_dimension])
+
+    def write_artifact(self, file_path, stop_words):
+        '''
+        Function writes the Tree of Knowledge as a structured artifact, the keywords of the
+        lecture and of every paragraph with their pagerank, cleaned of stop words so the
+        website loads it as it is. The Trees of an approximate ranker are marked provisional.
+        '''
+        lecture = [(word, self.lecture_scores.get(word)) for word in self.lecture_keywords]
+        paragraphs = [
+            [(word, self.paragraph_scores[paragraph - 1].get(word)) for word in keywords]
+            for paragraph, keywords in sorted(self.lecture_keywords_per_paragraph.items())
+        ]
+        write_tree_artifact(file_path, tree_artifact(self.lecture_title, lecture, paragraphs, stop_words, self.ranker, self.ranker in APPROXIMATE_RANKERS)) # pylint: disable=line-too-long
+
+    def write_rankings(self, file_path):
+        '''
+        Function writes the complete ranking of the lecture and of every paragraph, every word
+        with its pagerank from the highest to the lowest, so any number of keywords can be read
+        back without processing the lecture again, with the ranker that ranked them.
+        '''
+        rankings = {
+            'title': self.lecture_title,
+            'ranker': self.ranker,
+            'provisional': self.ranker in APPROXIMATE_RANKERS,
+            'lecture': [[word, self.lecture_scores[word]] for word in top_words(self.lecture_scores)], # pylint: disable=line-too-long
+            'paragraphs': [[[word, ranked_words[word]] for word in top_words(ranked_words)] for ranked_words in self.paragraph_scores], # pylint: disable=line-too-long
+        }
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(rankings, file)
+
+
+class PuzzleOfKnowledge(Lecture):
+    '''Class used to create the Puzzle of Knowledge.'''
+    def __init__(self, lecture, puzzle_dimension):
+        self.name = lecture.name
+        self.path = lecture.path
+        self.lecture = lecture
+        self.lecture_title = lecture.lecture_title
+        self.puzzle_dimension = puzzle_dimension
+        self.puzzle = []  # the word of every piece
+        self.tabs = []  # the tabs of every piece, see PuzzleEngine.tabs
+
+    def create_puzzle(self, engine=None):
+        '''
+        Function used to create puzzle file from all of the pieces, with the engine of the
+        lecture if given so the puzzles of several dimensions share it.
+        '''
+        engine = engine or PuzzleEngine(self.lecture.graph, self.lecture.lecture_keywords)
+        self.puzzle = engine.fill(self.puzzle_dimension)
+        self.tabs = engine.tabs(self.puzzle)
+
+
+def write_puzzles(file_path, puzzles):
+    '''
+    Function writes the structured artifact of the puzzles of a lecture, the grid of words and
+    the grid of tabs of every dimension, loaded directly by the website.
+    '''
+    title = puzzles[0].lecture_title if puzzles else ''
+    write_puzzle_artifact(file_path, title, [(puzzle.puzzle, puzzle.tabs) for puzzle in puzzles])
+
+
+class LectureResult:
+    '''
+    Class used to send the Tree and Puzzles of Knowledge of a lecture back from a worker process
+    with the stage cache hits and misses, the lemmas and tag counts it learned, the paragraphs
+    it memoized with the memo hits and misses, the vocabulary of the lecture with the number of
+    times every word is used, the pagerank iterations, with the noun lexicon the keyword
+    overlap with the tagger and with an approximate ranker the keyword overlap with pagerank.
+    '''
+    def __init__(self, tree, puzzles, stage_cache, lecture):
+        self.tree = tree
+        self.puzzles = puzzles
+        self.stage_hits = stage_cache.hits
+        self.stage_misses = stage_cache.misses
+        self.new_lemmas = shared_lemma_cache().take_new_entries()
+        self.new_tag_counts = shared_noun_lexicon().take_new_entries()
+        self.new_paragraphs = shared_paragraph_memo().take_new_entries()
+        self.paragraph_hits, self.paragraph_misses = shared_paragraph_memo().take_counts()
+        self.vocabulary = lecture.paragraph_nouns.vocabulary
+        self.word_counts = lecture.paragraph_nouns.word_counts()
+        self.keyword_overlap = lecture.keyword_overlap
+        self.iterations = lecture.iterations
+        self.ranking_overlap = lecture.ranking_overlap
+
+
+def init_worker(settings):
+    '''
+    Function run once by every worker process so the NLTK tokenizer and lemmatizer data, the
+    shared perceptron tagger, the saved lemmas, the noun lexicon and the paragraph memo are
+    loaded before the first lecture and kept for every lecture of the worker.
+    '''
+    paragraph_tokens = [tokenize_paragraph('Warm up the lecture tokenizer.', settings.tokenizer)]
+    shared_tagger().tag(paragraph_tokens[0])  # the tagger every lecture of the worker uses
+    lemma_cache = shared_lemma_cache()
+    lemma_cache.lemmatizer.lemmatize('lectures')
+    if settings.use_cache:
+        lemma_cache.load(settings.lemma_cache_file)
+        shared_noun_lexicon().load(settings.noun_lexicon_file)
+        if settings.paragraph_memo:
+            shared_paragraph_memo().load(settings.paragraph_memo_file)
+
+
+def create_puzzles(lecture, dimensions):
+    '''
+    Function returns the Puzzle of Knowledge of an analysed lecture for every dimension, all
+    filled by one puzzle engine from the graph and ranking of the lecture.
+    '''
+    engine = PuzzleEngine(lecture.graph, lecture.lecture_keywords)
+    puzzles = []
+    for dimension in dimensions:
+        puzzle = PuzzleOfKnowledge(lecture, dimension)
+        puzzle.create_puzzle(engine)
+        puzzles.append(puzzle)
+    return puzzles
+
+
+def process_lecture(transcript, transcript_name, settings):
+    '''
+    Function used to build the Tree and Puzzle of Knowledge of a lecture. It can run in a worker
+    process, so it returns a LectureResult for the main process to write and merge in lecture
+    order.
+    '''
+    stage_cache = StageCache(settings.cache_dir, enabled=settings.use_cache)
+    # parse the lecture once for both the tree and the puzzle
+    lecture = LectureAnalysis(transcript, transcript_name, settings, stage_cache)
+
+    tree = TreeOfKnowledge(settings.keywords_paragraph, settings.keywords_lecture, lecture)
+    tree.analysis()
+
+    puzzles = create_puzzles(lecture, settings.puzzle_dimensions)
+
+    # the analysis is not needed to write the files, no need to send it back to the main process
+    tree.lecture = None
+    for puzzle in puzzles:
+        puzzle.lecture = None
+    return LectureResult(tree, puzzles, stage_cache, lecture)
+
+
+def process_lectures(lectures, settings, workers=1):
+    '''
+    Function takes (transcript, transcript_name) pairs and yields the result of process_lecture
+    for each of them in the same order. With more than one worker the lectures are processed by
+    a pool of worker processes.
+    '''
+    if workers <= 1:
+        for transcript, transcript_name in lectures:
+            yield process_lecture(transcript, transcript_name, settings)
+        return
+    transcripts = [transcript for transcript, _ in lectures]
+    transcript_names = [transcript_name for _, transcript_name in lectures]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(settings,)) as executor: # pylint: disable=line-too-long
+        yield from executor.map(
+            process_lecture, transcripts, transcript_names, repeat(settings, len(lectures))
+        )
+
+
+def schedule_lectures(lectures):
+    '''
+    Function takes lectures whose first item is the transcript path and returns them longest
+    job first, i.e. largest transcript first, so a pool of workers does not end up waiting
+    on a single huge lecture started last.
+    '''
+    return sorted(lectures, key=lambda lecture: os.path.getsize(lecture[0]), reverse=True)
+
+
+def course_processor(link, keywords_paragraph, keywords_lecture, puzz_dim, transcript=None,
+                     workers=1, cache_dir=None, **options):
+    '''
+    Function used that processes courses to create the files that contain the Tree and
+    Puzzle of Knowledge of every lecture. puzz_dim is a dimension, a level ('easy', 'medium'
+    or 'hard') or a list or range of them, the puzzles of every dimension are filled from the
+    same analysis of the lecture. transcript picks a single lecture, all of them by default.
+    With more than one worker the lectures are processed in parallel by a pool of worker
+    processes. The stage artifacts are cached in cache_dir, utils/cache by default. The other
+    options are the ones of ProcessorSettings.
+    '''
+    batch_course_processor(
+        [link], keywords_paragraph, keywords_lecture, puzz_dim, transcript=transcript,
+        workers=workers, cache_dir=cache_dir, **options
+    )
 
 
+def batch_course_processor(links, keywords_paragraph, keywords_lecture, puzz_dim, transcript=None,
+                           workers=1, cache_dir=None, **options):
+    '''
+    Function used to process several courses in one run, takes the same options as the
+    course_processor but a list of course links. Every course is downloaded first, then the
+    lectures of all the courses are spread over a single pool of workers, longest first. A
+    course that can not be downloaded is skipped. Returns the names of the courses processed.
+    '''
+
     DEBUG = True
     input_dir_name = "in"
     output_dir_name = "out"
     log_file_name = "CourseInterpreter.log"
     wrk_dir = os.getcwd() + '\\edunet\\utils'
-    print(wrk_dir)
     input_dir = os.path.join(wrk_dir, input_dir_name)
     output_dir = os.path.join(wrk_dir, output_dir_name)
+    cache_dir = cache_dir or os.path.join(wrk_dir, "cache")
+    settings = ProcessorSettings(keywords_paragraph, keywords_lecture, puzz_dim, cache_dir, **options) # pylint: disable=line-too-long
+    stage_cache = StageCache(settings.cache_dir, enabled=settings.use_cache)
+    lemma_cache = shared_lemma_cache()
+    noun_lexicon = shared_noun_lexicon()
+    memo = shared_paragraph_memo()
     log_file = os.path.join(wrk_dir, log_file_name)
 
 
@@ -396,14 +800,14 @@ def course_processor(link, keywords_paragraph, keywords_lecture, puzz_dim, trans
         return True
 
 
-    def get_course():
+    def get_course(link):
         global COURSE_DIR
 
         #check the url to be from yale
         link_splitted = link.split("/")
         if "openmedia.yale.edu" not in link:
-            log("Only courses from openmedia.yale.edu are supported, exiting", log_file)
-            return False
+            log("Only courses from openmedia.yale.edu are supported, skipping {}".format(link), log_file) # pylint: disable=line-too-long
+            return False, None
 
         course_name = link_splitted[-3]
         course_zip_name = link_splitted[-1]
@@ -422,10 +826,10 @@ def course_processor(link, keywords_paragraph, keywords_lecture, puzz_dim, trans
                 log("Downloaded the course at link: {}, at {}".format(link, downloaded_file), log_file) # pylint: disable=line-too-long
             else:
                 log("Can NOT download the course at link: {}".format(link), log_file)
-                return False
+                return False, None
         except:
             log("Can NOT download the course at link: {}".format(link), log_file)
-            return False
+            return False, None
 
         # unzip file and create course directory
         COURSE_DIR = os.path.join(input_dir, course_name)
@@ -485,12 +889,9 @@ def course_processor(link, keywords_paragraph, keywords_lecture, puzz_dim, trans
         return non_duplicate_transcripts
 
 
-    def process_transcripts(transcripts, course_name):
-        for transcript in transcripts:
-            # transcript_name = transcript.split("/")[-1][:-5] # for mac
-            transcript_name = transcript.split("\\")[-1][:-5] # for windows
-            log("Processing lecture {}".format(transcript_name), log_file)
-
+    def process_transcripts(course_transcripts):
+        lectures = []
+        for course_name, transcripts in course_transcripts:
             course_output_path = os.path.join(output_dir, course_name)
             if os.path.exists(course_output_path) is False:
                 try:
@@ -499,31 +900,99 @@ def course_processor(link, keywords_paragraph, keywords_lecture, puzz_dim, trans
                     log("Can not create lecture output directory {}".format(course_output_path), log_file) # pylint: disable=line-too-long
                     return False
 
-            tree_name = "Tree#" + transcript_name + ".txt"
+            for transcript in transcripts:
+                # transcript_name = transcript.split("/")[-1][:-5] # for mac
+                transcript_name = transcript.split("\\")[-1][:-5] # for windows
+                lectures.append((transcript, transcript_name, course_output_path))
+
+        if settings.skip_boilerplate:
+            # known before any lecture is processed so every lecture leaves out the same paragraphs
+            settings.boilerplate = boilerplate_paragraphs([transcript for transcript, _, _ in lectures], settings.boilerplate_lectures, settings.html_extractor) # pylint: disable=line-too-long
+            log("Skipping {} boilerplate paragraphs found in at least {} lectures".format(len(settings.boilerplate), settings.boilerplate_lectures), log_file) # pylint: disable=line-too-long
+        lectures = schedule_lectures(lectures)
+        log("Processing {} lectures of {} courses with {} workers".format(len(lectures), len(course_transcripts), workers), log_file) # pylint: disable=line-too-long
+
+        # results come back in the scheduled order, each lecture writes its own files
+        results = process_lectures(
+            [(transcript, transcript_name) for transcript, transcript_name, _ in lectures],
+            settings, workers=workers,
+        )
+        course_vocabularies = {}  # the words of every course interned as ids with their counts
+        iteration_profile = IterationProfile()
+        for (_, transcript_name, course_output_path), result in zip(lectures, results):
+            log("Processed lecture {}".format(os.path.join(course_output_path, transcript_name)), log_file) # pylint: disable=line-too-long
+            stage_cache.add_counts(result.stage_hits, result.stage_misses)
+            course_vocabulary = course_vocabularies.setdefault(course_output_path, Vocabulary())
+            course_vocabulary.update(result.vocabulary, result.word_counts)
+            for kind, iterations in result.iterations.items():
+                iteration_profile.record(kind, iterations)
+            lemma_cache.update(result.new_lemmas)
+            if workers > 1 and settings.learn_lexicon:
+                # in a single process the lectures already taught the shared noun lexicon
+                noun_lexicon.update(result.new_tag_counts)
+            # in a single process the entries are already there, only the counts are given back
+            memo.update(result.new_paragraphs, result.paragraph_hits, result.paragraph_misses) # pylint: disable=line-too-long
+            if settings.noun_extractor == 'lexicon':
+                if result.keyword_overlap is None:
+                    log("Keyword overlap with the tagger not available, no full run of {} is cached".format(transcript_name), log_file) # pylint: disable=line-too-long
+                else:
+                    log("Keyword overlap with the tagger {}/{}".format(*result.keyword_overlap), log_file) # pylint: disable=line-too-long
+            if result.ranking_overlap is not None:
+                log("Keyword overlap of the {} ranker with pagerank {}/{}, the Tree is provisional until an exact run replaces it".format(settings.ranker, *result.ranking_overlap), log_file) # pylint: disable=line-too-long
+
+            tree_name = "Tree#" + transcript_name + ".json"
             tree_output_path = os.path.join(course_output_path, tree_name)
-            lz = TreeOfKnowledge(keywords_paragraph, keywords_lecture, transcript_name, transcript)
-            lz.analysis()
-            lz.write_to_file(tree_output_path)
+            result.tree.write_artifact(tree_output_path, english_stop_words())
 
-            puzzle_name = "Puzzle#" + transcript_name + ".txt"
-            puzzle_output_path = os.path.join(course_output_path, puzzle_name)
-            lz = PuzzleOfKnowledge(transcript_name, transcript, puzz_dim)
-            lz.create_puzzle()
-            lz.write_to_file(puzzle_output_path)
+            rankings_name = "Rankings#" + transcript_name + ".json"
+            rankings_output_path = os.path.join(course_output_path, rankings_name)
+            result.tree.write_rankings(rankings_output_path)
+
+            write_puzzles(os.path.join(course_output_path, "Puzzle#" + transcript_name + ".json"), result.puzzles) # pylint: disable=line-too-long
+
+        for course_output_path, course_vocabulary in course_vocabularies.items():
+            course_vocabulary.save(os.path.join(course_output_path, "Vocabulary.json"))
+            log("Vocabulary of {}: {} words".format(course_output_path, len(course_vocabulary)), log_file) # pylint: disable=line-too-long
+        log("Pagerank iterations {}".format(iteration_profile.summary() or "none"), log_file) # pylint: disable=line-too-long
 
         return True
 
 
+    processed_courses = []
     if initial_operations():
         log("Initial operations finished with success", log_file)
-        course_acquired, course_name = get_course()
-        if course_acquired is True:
+        if settings.use_cache and lemma_cache.load(settings.lemma_cache_file):
+            log("Loaded lemma cache {}".format(settings.lemma_cache_file), log_file)
+        if settings.use_cache and noun_lexicon.load(settings.noun_lexicon_file):
+            log("Loaded noun lexicon {}".format(settings.noun_lexicon_file), log_file)
+        if settings.use_cache and settings.paragraph_memo and memo.load(settings.paragraph_memo_file):
+            log("Loaded paragraph memo {}".format(settings.paragraph_memo_file), log_file)
+        course_transcripts = []
+        for link in links:
+            course_acquired, course_name = get_course(link)
+            if course_acquired is not True:
+                log("Skipping the course at link: {}".format(link), log_file)
+                continue
             transcripts = get_transcript_file(course_name)
             if len(transcripts) > 0:
-                processing_success = process_transcripts(transcripts, course_name)
-                if processing_success is True:
-                    log("Processing successful", log_file)
-                else:
-                    log("Processing NOT successful", log_file)
+                course_transcripts.append((course_name, transcripts))
+        if len(course_transcripts) > 0:
+            processing_success = process_transcripts(course_transcripts)
+            if settings.use_cache:
+                log("Stage cache {}".format(stage_cache.summary()), log_file)
+                lemma_cache.save(settings.lemma_cache_file)
+                if settings.learn_lexicon:
+                    noun_lexicon.save(settings.noun_lexicon_file)
+                if settings.paragraph_memo:
+                    memo.save(settings.paragraph_memo_file)
+            log("Lemma cache {}".format(lemma_cache.summary()), log_file)
+            if settings.paragraph_memo:
+                log("Paragraph memo {}".format(memo.summary()), log_file)
+            if processing_success is True:
+                log("Processing successful", log_file)
+                processed_courses = [course_name for course_name, _ in course_transcripts]
+            else:
+                log("Processing NOT successful", log_file)
     else:
         log("Initial operations could not be done, exiting.", log_file)
+    return processed_courses
@@ -0,0 +1,217 @@
+'''
+Contains the engines used by the course_processor to pull the paragraphs and the title out of
+a transcript.
+
+The 'soup' engine builds a full BeautifulSoup tree of the transcript. The 'stream' engine walks
+through the transcript once with the standard library html parser, keeping only the text of the
+open paragraphs and of the first h3 tag, so no tree is ever built. Both engines return the same
+paragraphs and title for the Yale transcripts. The stream engine can also read a transcript file
+a chunk at a time and hand out every paragraph as soon as it is closed.
+
+Classes:
+    TranscriptStream
+        iterates over the paragraphs of a transcript file while it is read
+
+Functions:
+    extract_paragraphs(html, engine)
+        returns the text of the paragraphs of a transcript and its title
+    soup_extract(html)
+        returns the text of every paragraph and of the first h3 tag using BeautifulSoup
+    stream_extract(html)
+        returns the text of every paragraph and of the first h3 tag using a streaming parser
+    clean_lecture_title(raw_title)
+        returns the lecture title from the text of the first h3 tag
+'''
+__author__ = 'boutin'
+
+from collections import deque
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+ENGINES = ('soup', 'stream')
+
+# tags that never contain text and are never closed
+VOID_TAGS = {
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr',
+    'image', 'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid',
+    'param', 'source', 'spacer', 'track', 'wbr',
+}
+
+# tags whose text BeautifulSoup leaves out of getText
+SKIPPED_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+# tags inside which BeautifulSoup keeps whitespace as is
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+
+ASCII_SPACES = ' \n\t\x0c\r'
+
+
+class _TranscriptParser(HTMLParser):
+    '''
+    Class used to stream through a transcript and collect the text of its paragraphs and of
+    its first h3 tag. The stack of open tags is kept so end tags close the same elements as
+    in the BeautifulSoup tree, and text is flushed at the same points BeautifulSoup flushes it
+    so whitespace is collapsed the same way.
+    '''
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []  # open tags as (name, text buffer or None)
+        self.paragraphs = deque()  # text buffers of the paragraphs in document order
+        self.title = None  # text buffer of the first h3 tag
+        self.buffers = []  # text buffers of the open paragraphs and h3 tag
+        self.pending = []  # text seen since the last tag
+
+    def flush(self):
+        '''Adds the text seen since the last tag to the open paragraphs and h3 tag.'''
+        if not self.pending:
+            return
+        data = ''.join(self.pending)
+        self.pending = []
+        if not self.buffers or (self.stack and self.stack[-1][0] in SKIPPED_TEXT_TAGS):
+            return
+        if not data.strip(ASCII_SPACES) and not any(tag in PRESERVE_WHITESPACE_TAGS for tag, _ in self.stack): # pylint: disable=line-too-long
+            # BeautifulSoup turns strings made only of spaces into a single space or newline
+            data = '\n' if '\n' in data else ' '
+        for buffer in self.buffers:
+            buffer.append(data)
+
+    def closed_paragraphs(self):
+        '''Removes and returns the text of the leading paragraphs that are closed already.'''
+        closed = []
+        while self.paragraphs and all(buffer is not self.paragraphs[0] for buffer in self.buffers): # pylint: disable=line-too-long
+            closed.append(''.join(self.paragraphs.popleft()))
+        return closed
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        if tag in VOID_TAGS:
+            return
+        buffer = None
+        if tag == 'p':
+            buffer = []
+            self.paragraphs.append(buffer)
+        elif tag == 'h3' and self.title is None:
+            buffer = []
+            self.title = buffer
+        if buffer is not None:
+            self.buffers.append(buffer)
+        self.stack.append((tag, buffer))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self.flush()
+        # like BeautifulSoup, pop up to the most recent open tag with that name if there is one
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                closed = [id(buffer) for _, buffer in self.stack[i:] if buffer is not None]
+                self.buffers = [buffer for buffer in self.buffers if id(buffer) not in closed]
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data):
+        self.pending.append(data)
+
+    def handle_comment(self, data):
+        self.flush()
+
+    def handle_decl(self, decl):
+        self.flush()
+
+    def handle_pi(self, data):
+        self.flush()
+
+    def unknown_decl(self, data):
+        self.flush()
+
+    def close(self):
+        super().close()
+        self.flush()
+
+
+def clean_lecture_title(raw_title):
+    '''Function takes the text of the first h3 tag and returns the lecture title.'''
+    if raw_title is None:
+        # not all transcripts have titles
+        return ''
+    lecture_title_list = raw_title.split('-', 1)
+    lecture_title = lecture_title_list[1].split('[')[0]
+    return lecture_title.strip()
+
+
+def soup_extract(html):
+    '''Function takes transcript html and returns the text of every paragraph and of the first h3.''' # pylint: disable=line-too-long
+    soup = BeautifulSoup(html, "html.parser")  # parse html
+    paragraphs = [paragraph.getText() for paragraph in soup.find_all('p')]
+    soup_title = soup.find('h3')  # assuming first and only h3 tag is the title
+    raw_title = soup_title.getText() if soup_title is not None else None
+    return paragraphs, raw_title
+
+
+def stream_extract(html):
+    '''Function takes transcript html and returns the text of every paragraph and of the first h3.''' # pylint: disable=line-too-long
+    parser = _TranscriptParser()
+    parser.feed(html)
+    parser.close()
+    paragraphs = [''.join(buffer) for buffer in parser.paragraphs]
+    raw_title = ''.join(parser.title) if parser.title is not None else None
+    return paragraphs, raw_title
+
+
+class TranscriptStream:
+    '''
+    Class used to iterate over the paragraphs of a transcript file while it is read, every
+    paragraph is handed out as soon as it is closed and the title is set once the whole file
+    is read. Like extract_paragraphs the last three paragraphs are left out. The soup engine
+    needs the whole transcript, it is read at once.
+    '''
+    def __init__(self, path, engine='stream', chunk_size=65536):
+        if engine not in ENGINES:
+            raise ValueError('Unknown html extractor engine {}, use one of {}'.format(engine, ENGINES))
+        self.path = path
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.title = None
+
+    def paragraphs(self):
+        '''Generator yielding the text of every paragraph of the transcript.'''
+        with open(self.path, encoding='utf-8') as file:
+            if self.engine == 'soup':
+                paragraphs, raw_title = soup_extract(file.read())
+                self.title = clean_lecture_title(raw_title)
+                yield from paragraphs
+                return
+            parser = _TranscriptParser()
+            for chunk in iter(lambda: file.read(self.chunk_size), ''):
+                parser.feed(chunk)
+                yield from parser.closed_paragraphs()
+            parser.close()
+            yield from (''.join(buffer) for buffer in parser.paragraphs)
+            self.title = clean_lecture_title(''.join(parser.title) if parser.title is not None else None) # pylint: disable=line-too-long
+
+    def __iter__(self):
+        # hold back three paragraphs so the null respective [end,of,transcript] ones are dropped
+        held_back = deque()
+        for paragraph in self.paragraphs():
+            held_back.append(paragraph)
+            if len(held_back) > 3:
+                yield held_back.popleft()
+
+
+def extract_paragraphs(html, engine='stream'):
+    '''
+    Function takes transcript html and the name of an extractor engine and returns the text
+    of the paragraphs and the lecture title. The last three paragraphs are left out because
+    they are null respective [end,of,transcript].
+    '''
+    if engine == 'soup':
+        paragraphs, raw_title = soup_extract(html)
+    elif engine == 'stream':
+        paragraphs, raw_title = stream_extract(html)
+    else:
+        raise ValueError('Unknown html extractor engine {}, use one of {}'.format(engine, ENGINES))
+    return paragraphs[:-3], clean_lecture_title(raw_title)
@@ -0,0 +1,124 @@
+'''
+Contains the bounded on-disk cache of the puzzle images rendered on demand by the website.
+
+Every image is stored under the key of its input, the puzzle of the lecture and the rendering
+options, so a new puzzle gets a new image and the old one ages out. The cache is bounded in
+bytes and evicts the least recently used images first, the modification time of an image is
+its last use. Requests for an image that is being rendered wait for that render instead of
+starting their own, and images are written atomically so another process never reads half of
+one.
+
+Classes:
+    ImageCache
+        stores rendered images on disk with least recently used eviction
+
+Functions:
+    shared_image_cache()
+        returns the image cache shared by every request of the process
+'''
+__author__ = 'boutin'
+
+import os
+import threading
+
+from .persistent_store import atomic_write, shared_instance
+
+IMAGE_EXTENSION = '.jpg'
+
+
+class ImageCache:
+    '''Class used to keep rendered images on disk, bounded in bytes with least recently used eviction.''' # pylint: disable=line-too-long
+    def __init__(self, cache_dir=None, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.path.join('edunet', 'utils', 'cache', 'puzzle_images')
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # guards the render locks and the counters
+        self.render_locks = {}  # key -> [lock, number of requests waiting on it]
+
+    def path(self, key):
+        '''Function returns the path of the image of a key.'''
+        return os.path.join(self.cache_dir, key + IMAGE_EXTENSION)
+
+    def lookup(self, key):
+        '''Function returns the path of the image of a key and marks it used, None if it is not cached.''' # pylint: disable=line-too-long
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def get(self, key, render):
+        '''
+        Function returns the path of the image of a key, rendering it with render(), which
+        returns the bytes of the image or None if there is nothing to render, on a miss. A
+        request for a key being rendered waits for that render. Returns None if render does.
+        '''
+        path = self.lookup(key)
+        if path is not None:
+            with self.lock:
+                self.hits += 1
+            return path
+        with self.lock:
+            entry = self.render_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                # the image may have been rendered while this request was waiting
+                path = self.lookup(key)
+                if path is not None:
+                    with self.lock:
+                        self.hits += 1
+                    return path
+                with self.lock:
+                    self.misses += 1
+                data = render()
+                if data is None:
+                    return None
+                return self.put(key, data)
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self.render_locks[key]
+
+    def put(self, key, data):
+        '''Function stores the bytes of the image of a key, evicts old images and returns its path.''' # pylint: disable=line-too-long
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        with atomic_write(path, binary=True) as file:
+            file.write(data)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        '''Function removes the least recently used images until the cache fits in max_bytes.'''
+        images = []
+        total = 0
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(IMAGE_EXTENSION):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # removed by another process
+                images.append((stat.st_mtime, entry.path, stat.st_size))
+                total += stat.st_size
+        images.sort()
+        for _, path, size in images:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def shared_image_cache():
+    '''Function returns the image cache shared by every request served by this process.'''
+    return shared_instance(ImageCache)
@@ -0,0 +1,64 @@
+'''
+Contains the memoized lemmatizer shared by every lecture processed by the course_processor.
+
+The same few thousand nouns repeat across every lecture of a course, so the lemmas are kept in a
+bounded least recently used cache in front of the WordNet lemmatizer and can be saved to disk
+between runs.
+
+Classes:
+    LemmaCache
+        memoizes the WordNet lemmatizer and counts its hits and misses
+
+Functions:
+    shared_lemma_cache()
+        returns the lemma cache shared by every lecture of the process
+'''
+__author__ = 'boutin'
+
+import nltk as nl
+
+from .persistent_store import LRUStore, shared_instance
+
+
+class LemmaCache(LRUStore):
+    '''Class used to memoize the WordNet lemmatizer with a bounded least recently used cache.'''
+    TABLES = ('lemmas',)
+
+    def __init__(self, max_size=100000, lemmatizer=None):
+        super().__init__(max_size)
+        self.lemmatizer = lemmatizer or nl.WordNetLemmatizer()
+        self.lemmas = self.tables['lemmas']
+        self.hits = 0
+        self.misses = 0
+
+    def lemmatize(self, word):
+        '''Function returns the lemma of a word, the word itself if it cannot be lemmatized.'''
+        try:
+            lemma = self.lookup('lemmas', word)
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            return lemma
+        try:
+            lemma = self.lemmatizer.lemmatize(word)
+        except Exception: # pylint: disable=broad-except
+            lemma = word
+        self.store('lemmas', word, lemma)
+        return lemma
+
+    def hit_rate(self):
+        '''Function returns the fraction of lookups that were answered from the cache.'''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        '''Function returns a readable summary of the cache usage.'''
+        return '{} lemmas, {} hits, {} misses, {:.1%} hit rate'.format(
+            len(self.lemmas), self.hits, self.misses, self.hit_rate()
+        )
+
+
+def shared_lemma_cache():
+    '''Function returns the lemma cache shared by every lecture processed in this process.'''
+    return shared_instance(LemmaCache)
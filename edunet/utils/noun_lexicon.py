@@ -0,0 +1,117 @@
+'''
+Contains the noun lexicon used by the course_processor to pick the nouns of a lecture without
+running the part of speech tagger.
+
+A token is a noun when the tagger tagged it as a noun most of the times it saw it in earlier
+full runs. Tokens the tagger never saw are looked up in WordNet, and capitalized tokens WordNet
+does not know are taken as proper nouns. The decision for every token is cached and the tag
+counts can be saved to disk between runs. The lexicon only learns when a run asks for it, and
+the hash of its tag counts keys the nouns it picked so they are picked again once it learned.
+
+Classes:
+    NounLexicon
+        decides which tokens are nouns from the tags of earlier runs and WordNet
+
+Functions:
+    shared_noun_lexicon()
+        returns the noun lexicon shared by every lecture of the process
+'''
+__author__ = 'boutin'
+
+import json
+import hashlib
+
+from nltk.corpus import wordnet
+
+from .persistent_store import LRUStore, shared_instance
+
+NOUN_EXTRACTORS = ('tagger', 'lexicon')
+
+
+class NounLexicon(LRUStore):
+    '''Class used to tell the nouns from the other tokens without a part of speech tagger.'''
+    TABLES = ('tag_counts',)
+
+    def __init__(self, use_wordnet=True):
+        super().__init__()  # unbounded, a token forgotten would change the decisions
+        self.use_wordnet = use_wordnet
+        self.tag_counts = self.tables['tag_counts']  # token to [times tagged as a noun, times tagged otherwise] # pylint: disable=line-too-long
+        self.decisions = {}  # token to whether it is a noun
+        self.tag_counts_hash = None  # hash of the tag counts, reset whenever they change
+
+    def state_hash(self):
+        '''Function returns the hash of the tag counts, which changes whenever the lexicon learns.''' # pylint: disable=line-too-long
+        if self.tag_counts_hash is None:
+            tag_counts = json.dumps(self.tag_counts, sort_keys=True).encode('utf-8')
+            self.tag_counts_hash = hashlib.sha256(tag_counts).hexdigest()
+        return self.tag_counts_hash
+
+    def learn(self, paragraph_tags):
+        '''Function takes the tagged tokens of every paragraph of a lecture and counts their tags.''' # pylint: disable=line-too-long
+        for tagged_tokens in paragraph_tags:
+            for token, tag in tagged_tokens:
+                is_noun = 0 if tag[0:2] == "NN" else 1
+                for tag_counts in (self.tag_counts, self.new_entries['tag_counts']):
+                    counts = tag_counts.setdefault(token, [0, 0])
+                    counts[is_noun] += 1
+                self.decisions.pop(token, None)
+        self.tag_counts_hash = None
+
+    def update(self, new_entries):
+        '''Function adds the tag counts learned by another lexicon, see take_new_entries.'''
+        for token, (nouns, others) in new_entries.get('tag_counts', {}).items():
+            counts = self.tag_counts.setdefault(token, [0, 0])
+            counts[0] += nouns
+            counts[1] += others
+            self.decisions.pop(token, None)
+        self.tag_counts_hash = None
+
+    def wordnet_noun(self, token):
+        '''
+        Function returns whether WordNet mostly knows a token as a noun, None if WordNet does
+        not know the token or its data is not installed.
+        '''
+        if not self.use_wordnet:
+            return None
+        try:
+            synsets = wordnet.synsets(token.lower())
+        except LookupError:
+            self.use_wordnet = False
+            return None
+        if not synsets:
+            return None
+        nouns = sum(1 for synset in synsets if synset.pos() == wordnet.NOUN)
+        return nouns * 2 >= len(synsets)
+
+    def is_noun(self, token):
+        '''Function returns whether a token is a noun.'''
+        try:
+            return self.decisions[token]
+        except KeyError:
+            pass
+        counts = self.tag_counts.get(token)
+        if counts is not None:
+            decision = counts[0] >= counts[1]
+        else:
+            decision = self.wordnet_noun(token)
+            if decision is None:
+                decision = token[:1].isupper()
+        self.decisions[token] = decision
+        return decision
+
+    def filter_nouns(self, tokens):
+        '''Function takes the tokens of a paragraph and returns the nouns and separators.'''
+        return [token for token in tokens if token == "." or self.is_noun(token)]
+
+    def load(self, path):
+        '''Function loads tag counts saved by a previous run, returns False if there are none.'''
+        if not super().load(path):
+            return False
+        self.decisions = {}
+        self.tag_counts_hash = None
+        return True
+
+
+def shared_noun_lexicon():
+    '''Function returns the noun lexicon shared by every lecture processed in this process.'''
+    return shared_instance(NounLexicon)
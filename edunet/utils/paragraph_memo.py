@@ -0,0 +1,117 @@
+'''
+Contains the paragraph memo shared by every lecture processed by the course_processor.
+
+The Yale transcripts share boilerplate paragraphs, like the speaker turns and the end of
+transcript markers, so the nouns of a paragraph are memoized under the hash of its text and the
+pagerank of its nouns under the hash of the nouns. An identical paragraph is then never tagged
+or ranked twice, in any lecture of any course, and the memo can be saved to disk between runs.
+Paragraphs found in many lectures can also be left out of the analysis as boilerplate.
+
+Classes:
+    ParagraphMemo
+        memoizes the nouns and rankings of paragraphs and counts its hits and misses
+
+Functions:
+    text_hash(text)
+        returns the hash of the text of a paragraph
+    boilerplate_paragraphs(transcripts, min_lectures, engine)
+        returns the hashes of the paragraphs found in at least min_lectures transcripts
+    shared_paragraph_memo()
+        returns the paragraph memo shared by every lecture of the process
+'''
+__author__ = 'boutin'
+
+import hashlib
+
+from .stage_cache import file_hash
+from .persistent_store import LRUStore, shared_instance
+from .html_extractor import TranscriptStream
+
+MEMO_TABLES = ('nouns', 'scores')
+
+
+def text_hash(text):
+    '''Function takes the text of a paragraph and returns its sha256 hash.'''
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def boilerplate_paragraphs(transcripts, min_lectures=5, engine='stream'):
+    '''
+    Function takes the paths of several transcripts and returns the hashes of the paragraphs
+    found in at least min_lectures of them, copies of the same transcript count once.
+    '''
+    lectures = {}  # paragraph hash to the number of distinct transcripts it is found in
+    seen_transcripts = set()
+    for transcript in transcripts:
+        transcript_hash = file_hash(transcript)
+        if transcript_hash in seen_transcripts:
+            continue
+        seen_transcripts.add(transcript_hash)
+        for key in {text_hash(text) for text in TranscriptStream(transcript, engine=engine)}:
+            lectures[key] = lectures.get(key, 0) + 1
+    return frozenset(key for key, count in lectures.items() if count >= min_lectures)
+
+
+class ParagraphMemo(LRUStore):
+    '''
+    Class used to memoize the nouns and the pagerank of paragraphs in bounded least recently
+    used tables, the nouns table is keyed by the text of a paragraph and the scores table by
+    its nouns, both with the configuration that produced them.
+    '''
+    TABLES = MEMO_TABLES
+
+    def __init__(self, max_size=50000):
+        super().__init__(max_size)
+        self.hits = {table: 0 for table in MEMO_TABLES}
+        self.misses = {table: 0 for table in MEMO_TABLES}
+
+    @staticmethod
+    def nouns_key(text, config):
+        '''Function returns the key of the nouns of a paragraph with the given configuration.'''
+        return hashlib.sha256((repr(sorted(config.items())) + '\x00' + text).encode('utf-8')).hexdigest() # pylint: disable=line-too-long
+
+    @staticmethod
+    def scores_key(nouns, config):
+        '''Function returns the key of the pagerank of a list of nouns with the given configuration.''' # pylint: disable=line-too-long
+        return hashlib.sha256((repr(sorted(config.items())) + '\x00' + '\x1f'.join(nouns)).encode('utf-8')).hexdigest() # pylint: disable=line-too-long
+
+    def get(self, table, key):
+        '''Function returns the memoized value of a key or None, counting the hit or miss.'''
+        try:
+            value = self.lookup(table, key)
+        except KeyError:
+            self.misses[table] += 1
+            return None
+        self.hits[table] += 1
+        return value
+
+    def put(self, table, key, value):
+        '''Function memoizes the value of a key.'''
+        self.store(table, key, value)
+
+    def take_counts(self):
+        '''Function returns the hits and misses counted since the last call and resets them.'''
+        counts = self.hits, self.misses
+        self.hits = {table: 0 for table in MEMO_TABLES}
+        self.misses = {table: 0 for table in MEMO_TABLES}
+        return counts
+
+    def update(self, new_entries, hits=None, misses=None):
+        '''Function adds the entries and the hits and misses of another memo.'''
+        super().update(new_entries)
+        for table, count in (hits or {}).items():
+            self.hits[table] += count
+        for table, count in (misses or {}).items():
+            self.misses[table] += count
+
+    def summary(self):
+        '''Function returns a readable summary of the memo usage.'''
+        return ', '.join(
+            '{}: {} entries {} hits {} misses'.format(table, len(self.tables[table]), self.hits[table], self.misses[table]) # pylint: disable=line-too-long
+            for table in MEMO_TABLES
+        )
+
+
+def shared_paragraph_memo():
+    '''Function returns the paragraph memo shared by every lecture processed in this process.'''
+    return shared_instance(ParagraphMemo)
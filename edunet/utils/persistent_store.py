@@ -0,0 +1,127 @@
+'''
+Contains the helpers shared by the caches and artifacts the course_processor and the website keep
+on disk.
+
+Every file is written to a temporary file first and moved in place, so an interrupted run or a
+concurrent reader never sees half of it. The caches shared by every lecture of a process are
+created once per process and the in-memory ones keep bounded least recently used tables that
+worker processes hand back to the main process, which saves them between runs.
+
+Classes:
+    LRUStore
+        base of the in-memory caches saved between runs, keeps least recently used tables
+
+Functions:
+    atomic_write(path, binary)
+        opens a temporary file that replaces path once it is written
+    shared_instance(cls)
+        returns the instance of a class shared by every caller in the process
+'''
+__author__ = 'boutin'
+
+import os
+import json
+import threading
+import contextlib
+
+from collections import OrderedDict
+
+_SHARED_INSTANCES = {}  # class to the instance shared by the process
+
+
+@contextlib.contextmanager
+def atomic_write(path, binary=False):
+    '''
+    Function opens a temporary file next to path and moves it over path once the block writing
+    it ends, the temporary file is removed instead if the block fails.
+    '''
+    tmp_path = path + '.tmp' + str(os.getpid()) + '_' + str(threading.get_ident())
+    try:
+        with open(tmp_path, 'wb' if binary else 'w', encoding=None if binary else 'utf-8') as file:
+            yield file
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def shared_instance(cls):
+    '''Function returns the instance of a class shared by every caller in this process, created on first use.''' # pylint: disable=line-too-long
+    try:
+        return _SHARED_INSTANCES[cls]
+    except KeyError:
+        return _SHARED_INSTANCES.setdefault(cls, cls())
+
+
+class LRUStore:
+    '''
+    Class used as the base of the caches shared by every lecture of a process. Keeps the tables
+    named in TABLES in least recently used order, bounded to max_size entries each unless it is
+    None, and the entries stored since the last take_new_entries.
+    '''
+    TABLES = ()
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self.tables = {table: OrderedDict() for table in self.TABLES}
+        self.new_entries = self.empty_tables()
+
+    def empty_tables(self):
+        '''Function returns an empty dictionary for every table.'''
+        return {table: {} for table in self.TABLES}
+
+    def lookup(self, table, key):
+        '''Function returns the value of a key and marks it used, raises KeyError if it is not stored.''' # pylint: disable=line-too-long
+        entries = self.tables[table]
+        value = entries[key]
+        entries.move_to_end(key)
+        return value
+
+    def store(self, table, key, value, new=True):
+        '''Function stores the value of a key, as a new entry unless new is False, and evicts the least recently used entries.''' # pylint: disable=line-too-long
+        entries = self.tables[table]
+        entries[key] = value
+        entries.move_to_end(key)
+        if new:
+            self.new_entries[table][key] = value
+        if self.max_size is not None:
+            while len(entries) > self.max_size:
+                entries.popitem(last=False)
+
+    def take_new_entries(self):
+        '''
+        Function returns the entries stored since the last call, worker processes send them to
+        the main process which adds them with update.
+        '''
+        new_entries = self.new_entries
+        self.new_entries = self.empty_tables()
+        return new_entries
+
+    def update(self, new_entries):
+        '''Function adds the entries taken from another store of the same class.'''
+        for table, entries in new_entries.items():
+            for key, value in entries.items():
+                self.store(table, key, value, new=False)
+
+    def load(self, path):
+        '''Function loads the entries saved by a previous run, returns False if there are none.'''
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                tables = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(tables, dict) or not set(self.TABLES) & set(tables):
+            return False  # saved by an older version
+        for table in self.TABLES:
+            for key, value in tables.get(table, []):
+                self.store(table, key, value, new=False)
+        return True
+
+    def save(self, path):
+        '''Function saves the entries in least recently used order so a reload keeps the order.'''
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with atomic_write(path) as file:
+            json.dump({table: list(entries.items()) for table, entries in self.tables.items()}, file) # pylint: disable=line-too-long
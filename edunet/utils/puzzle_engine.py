@@ -0,0 +1,283 @@
+'''
+Contains the puzzle engine used by the course_processor to lay the keywords of a lecture out
+on the grid of the Puzzle of Knowledge.
+
+The undirected neighbours of every word of the lecture graph are indexed once as sets and the
+rank of every keyword is kept in a dictionary, so a piece of the puzzle is picked with a set
+intersection of the neighbours of the pieces around it instead of copying the graph and
+scanning lists for every cell. Only the adjacency views of networkx are used, they work the same
+on every networkx version.
+
+One engine fills puzzles of any number of dimensions from the same graph and ranking, like the
+easy, medium and hard levels of the website, and the snail path of every dimension is only
+computed once per process.
+
+The tabs of every piece, up or down towards each of its four sides, are worked out in one pass
+over the links of the pieces without touching the graph, and a puzzle is saved as a JSON
+artifact holding its grid of words and its grid of tabs. The legacy Puzzle#transcriptNN.txt
+files are only read, when a lecture has no artifact.
+
+Classes:
+    PuzzleEngine
+        fills the grid of a puzzle with the best ranked keywords linked to their neighbours
+
+Functions:
+    adjacency_index(graph)
+        returns the set of undirected neighbours of every word of a graph
+    snail_road(dimension)
+        returns the cells of a puzzle from its center to its border
+    puzzle_dimensions(puzz_dim)
+        returns the dimensions of the puzzles asked for as numbers, level names or ranges
+    puzzle_artifact(title, puzzles)
+        returns the structured artifact of the puzzles of a lecture
+    write_puzzle_artifact(file_path, title, puzzles)
+        writes the structured artifact of the puzzles of a lecture
+    load_puzzle_artifact(file_path)
+        returns the structured artifact of the puzzles of a lecture saved in a file
+    parse_puzzle_lines(puzzle_list)
+        returns the lecture title and the grid of words of every puzzle of a legacy puzzle file
+    load_puzzle(puzzle_path)
+        returns the puzzles of a lecture from its artifact or else from its legacy puzzle file
+'''
+__author__ = 'boutin'
+
+import ast
+import json
+
+from functools import lru_cache
+
+from .persistent_store import atomic_write
+
+PUZZLE_ARTIFACT_VERSION = 1
+EMPTY_PIECE = '*'
+TAB_UP = 1
+TAB_DOWN = -1
+TAB_NONE = 0  # on the border of the puzzle
+SIDES = ((0, -1), (1, 0), (0, 1), (-1, 0))  # west, south, east and north as (line, column) steps
+PUZZLE_LEVELS = {'easy': 3, 'medium': 4, 'hard': 5}  # the levels of the website puzzle
+
+
+def adjacency_index(graph):
+    '''
+    Function takes a word graph and returns a dictionary of the set of words linked to every
+    word in either direction, like the neighbours of the undirected graph.
+    '''
+    neighbours = {word: set(successors) for word, successors in graph.adj.items()}
+    if graph.is_directed():
+        for word, predecessors in graph.pred.items():
+            neighbours[word].update(predecessors)
+    return neighbours
+
+
+@lru_cache(maxsize=None)
+def snail_road(dimension):
+    '''
+    Function takes the dimension of a puzzle and returns its cells as (line, column) pairs along
+    the snail path from the center to the border, so the best keywords are in the middle. The
+    path of every dimension is computed once.
+    '''
+    lines = dimension
+    stop = lines / 2
+    snail = []
+    tmp = 0
+    while lines > stop:
+        x = range(tmp, lines - 1)
+        for i in x:
+            snail.append((tmp, i))
+        for i in x:
+            snail.append((i, lines - 1))
+        x = reversed(range(tmp + 1, lines))
+        for i in x:
+            snail.append((lines - 1, i))
+        for i in x:
+            snail.append((i, tmp))
+        lines -= 1
+        tmp = tmp + 1
+    if dimension % 2 == 1:
+        snail.append((int(stop), int(stop)))
+    snail.reverse()
+    return tuple(snail)
+
+
+def puzzle_dimensions(puzz_dim):
+    '''
+    Function takes a puzzle dimension, a level name of PUZZLE_LEVELS or a list or range of them
+    and returns the dimensions of the puzzles, without duplicates and in the order given.
+    '''
+    if isinstance(puzz_dim, (int, str)):
+        puzz_dim = [puzz_dim]
+    dimensions = []
+    for dimension in puzz_dim:
+        if isinstance(dimension, str) and not dimension.isdigit():
+            if dimension not in PUZZLE_LEVELS:
+                raise ValueError('Unknown puzzle level {}, use one of {}'.format(dimension, tuple(PUZZLE_LEVELS))) # pylint: disable=line-too-long
+            dimension = PUZZLE_LEVELS[dimension]
+        dimension = int(dimension)
+        if dimension not in dimensions:
+            dimensions.append(dimension)
+    return tuple(dimensions)
+
+
+def puzzle_artifact(title, puzzles):
+    '''
+    Function takes the title of a lecture and a list of (words, tabs) grids of its puzzles and
+    returns the structured artifact of the puzzles, ready to be saved as JSON.
+    '''
+    return {
+        'version': PUZZLE_ARTIFACT_VERSION,
+        'title': title,
+        'puzzles': [{'dimension': len(words), 'words': words, 'tabs': tabs} for words, tabs in puzzles], # pylint: disable=line-too-long
+    }
+
+
+def write_puzzle_artifact(file_path, title, puzzles):
+    '''Function writes the structured artifact of the puzzles of a lecture, see puzzle_artifact.'''
+    with atomic_write(file_path) as file:
+        json.dump(puzzle_artifact(title, puzzles), file, separators=(',', ':'))
+
+
+def load_puzzle_artifact(file_path):
+    '''
+    Function returns the structured artifact of the puzzles of a lecture saved in a file, None
+    if there is none or it was written by another version.
+    '''
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            artifact = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(artifact, dict) or artifact.get('version') != PUZZLE_ARTIFACT_VERSION:
+        return None
+    return artifact
+
+
+def parse_puzzle_lines(puzzle_list):
+    '''
+    Function takes the lines of a legacy puzzle file and returns the lecture title and the grid
+    of words of every puzzle in it, the pieces are read field by field.
+    '''
+    lecture_title = ''
+    grids = []
+    for line in puzzle_list:
+        line = line.rstrip('\n')
+        if '#' not in line:
+            # a header line holds the lecture title and the dimension of the puzzle that follows
+            if line:
+                lecture_title = line.rsplit('-', 1)[0]
+                grids.append([])
+            continue
+        if not grids:
+            grids.append([])
+        # every piece is the bytes repr of its word followed by its four tabs
+        row = [ast.literal_eval(piece.split('#', 1)[0]).decode('utf-8') for piece in line.split(' ') if piece] # pylint: disable=line-too-long
+        grids[-1].append(row)
+    return lecture_title, grids
+
+
+def load_puzzle(puzzle_path):
+    '''
+    Function takes the path of the puzzles of a lecture without extension and returns their
+    artifact, read from the legacy text file, without tabs, if there is no artifact. Returns
+    None if there is neither.
+    '''
+    artifact = load_puzzle_artifact(puzzle_path + '.json')
+    if artifact is not None:
+        return artifact
+    try:
+        with open(puzzle_path + '.txt', 'r', encoding='utf-8') as file:
+            lecture_title, grids = parse_puzzle_lines(file.readlines())
+    except OSError:
+        return None
+    return puzzle_artifact(lecture_title, [(words, None) for words in grids if words])
+
+
+class PuzzleEngine:
+    '''
+    Class used to fill the grid of a Puzzle of Knowledge from the graph and the keywords of a
+    lecture, ordered from the highest to the lowest pagerank. The links and neighbours of every
+    word and the rank of every keyword are indexed once per lecture.
+    '''
+    def __init__(self, graph, keywords):
+        self.keywords = list(keywords)
+        self.ranks = {word: rank for rank, word in enumerate(self.keywords)}
+        self.successors = {word: set(successors) for word, successors in graph.adj.items()}
+        self.neighbours = adjacency_index(graph)
+
+    def fill(self, dimension):
+        '''Function returns the grid of a puzzle of the given dimension, empty pieces are '*'.'''
+        grid = [[EMPTY_PIECE for i in range(dimension)] for j in range(dimension)]
+        placed = set()  # keywords already in the puzzle
+        next_rank = 0  # the best ranked keyword not in the puzzle, for pieces without neighbours
+        for line, column in snail_road(dimension):
+            while next_rank < len(self.keywords) and self.keywords[next_rank] in placed:
+                next_rank += 1
+            piece = self.best_piece(grid, line, column, placed, next_rank)
+            if piece != EMPTY_PIECE:
+                placed.add(piece)
+            grid[line][column] = piece
+        return grid
+
+    def best_piece(self, grid, line, column, placed, next_rank=0):
+        '''
+        Function returns the best ranked keyword not placed yet that is linked to every piece
+        around the cell, the best ranked keyword left if there is no piece around and '*' if
+        no keyword fits.
+        '''
+        dimension = len(grid)
+        around = []
+        # east, west, north and south
+        if column < dimension - 1:
+            around.append(grid[line][column + 1])
+        if column > 0:
+            around.append(grid[line][column - 1])
+        if line > 0:
+            around.append(grid[line - 1][column])
+        if line < dimension - 1:
+            around.append(grid[line + 1][column])
+        around = [self.neighbours.get(piece, set()) for piece in around if piece != EMPTY_PIECE]
+        if not around:
+            # there are no pieces of puzzle around
+            return self.keywords[next_rank] if next_rank < len(self.keywords) else EMPTY_PIECE
+        # the smallest set first keeps the intersection near the degree of the pieces
+        around.sort(key=len)
+        candidates = around[0].intersection(*around[1:])
+        best_rank = None
+        for word in candidates:
+            rank = self.ranks.get(word)
+            if rank is not None and word not in placed and (best_rank is None or rank < best_rank):
+                best_rank = rank
+        return EMPTY_PIECE if best_rank is None else self.keywords[best_rank]
+
+    def tabs(self, grid):
+        '''
+        Function returns the tabs of every piece of a grid towards its west, south, east and
+        north sides: TAB_NONE on the border, TAB_UP towards an empty piece and, between two
+        pieces, TAB_UP for the first piece in reading order if it links to the second one and
+        for the second piece if only it links to the first one, TAB_DOWN otherwise.
+        '''
+        dimension = len(grid)
+        tabs = []
+        for line, row in enumerate(grid):
+            tab_row = []
+            for column, piece in enumerate(row):
+                piece_tabs = []
+                links = self.successors.get(piece, ())
+                for line_step, column_step in SIDES:
+                    other_line = line + line_step
+                    other_column = column + column_step
+                    if not (0 <= other_line < dimension and 0 <= other_column < dimension):
+                        piece_tabs.append(TAB_NONE)
+                        continue
+                    other = grid[other_line][other_column]
+                    if other == EMPTY_PIECE:
+                        piece_tabs.append(TAB_UP)
+                    elif other not in links:
+                        piece_tabs.append(TAB_DOWN)
+                    elif (other_line, other_column) > (line, column) or piece not in self.successors.get(other, ()): # pylint: disable=line-too-long
+                        piece_tabs.append(TAB_UP)
+                    else:
+                        # both pieces link to each other, the first one in reading order has the tab
+                        piece_tabs.append(TAB_DOWN)
+                tab_row.append(piece_tabs)
+            tabs.append(tab_row)
+        return tabs
@@ -0,0 +1,354 @@
+'''
+Contains the batch renderer of the Puzzle of Knowledge images shown on the website.
+
+Every row of a puzzle is drawn as a line of text on a square image that the website cuts into
+pieces. The font scale and the wrapping of the rows are picked by measuring the text, so long
+words are never cut off, and the images are written as optimized JPEGs. The lectures of one or
+more courses are rendered by a pool of worker processes and a manifest of the input of every
+image is kept next to the images, so re-rendering a course only draws the lectures whose puzzle
+or rendering options changed.
+
+For every level of the website puzzle the image can also be cut into its pieces on a sprite
+sheet, one row of square pieces of a whole number of pixels in reading order, with a manifest
+giving the position of every piece on the sheet and in the puzzle, so the browser only has to
+place the pieces instead of scaling and slicing the image for every game. The website cuts the
+sheets on demand into its image cache, the batch renderer only draws the images.
+
+Run from the project directory:
+    python -m edunet.utils.puzzle_renderer [-c COURSE ...] [-d DIMENSION] [-w WORKERS] [--force]
+
+Classes:
+    RenderSettings
+        holds the options of a rendering run, shared with worker processes
+
+Functions:
+    puzzle_rows(artifact, dimension)
+        returns the rows of text of the puzzle of a lecture
+    wrap_text(text, max_width, scale, thickness)
+        returns the lines of a text wrapped to a width at a font scale
+    fit_text(rows, width, height, settings)
+        returns the font scale and the lines of every row that fit on an image
+    draw_puzzle(rows, settings)
+        returns the image of the rows of a puzzle
+    sprite_sheet(image, grid)
+        returns the pieces of a puzzle image cut for a grid, side by side on one image
+    piece_manifest(grid, settings)
+        returns the size of the pieces of a grid and their positions on the sprite sheet
+    encode_puzzle(puzzle_path, settings, grid)
+        returns the JPEG image, or sprite sheet for a grid, of the puzzle of a lecture
+    render_puzzle(puzzle_path, image_path, settings)
+        renders the image of the puzzle of a lecture
+    puzzle_input_key(puzzle_path, settings)
+        returns the key of the input of the image of the puzzle of a lecture
+    render_courses(course_numbers, settings, workers, force)
+        renders the puzzle images of every lecture of several courses, incrementally
+'''
+__author__ = 'boutin'
+
+import os
+import json
+import glob
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import cv2
+
+from .stage_cache import file_hash, stage_key
+from .persistent_store import atomic_write
+from .puzzle_engine import EMPTY_PIECE, load_puzzle
+
+RENDERER_VERSION = 1  # changes the input of every image, so every image is drawn again
+MANIFEST_NAME = 'render_manifest.json'
+FONT = cv2.FONT_HERSHEY_SIMPLEX # pylint: disable=no-member
+BORDER_COLOR = (255, 0, 0)  # first and last rows, BGR
+TEXT_COLOR = (0, 0, 0)
+
+
+class RenderSettings:
+    '''Class used to hold the options of a rendering run, shared with worker processes.'''
+    def __init__(self, out_dir=None, image_dir=None, dimension=None, size=400, margin=10,
+                 max_scale=1.0, min_scale=0.3, thickness=2, quality=85):
+        self.out_dir = out_dir or os.path.join('edunet', 'utils', 'out')
+        self.image_dir = image_dir or os.path.join('edunet', 'static', 'edunet', 'images')
+        self.dimension = dimension  # the first puzzle of every lecture if None
+        self.size = size
+        self.margin = margin
+        self.max_scale = max_scale
+        self.min_scale = min_scale
+        self.thickness = thickness
+        self.quality = quality
+
+    def config(self):
+        '''Function returns the options that change the images, for the manifest.'''
+        return {
+            'version': RENDERER_VERSION, 'dimension': self.dimension, 'size': self.size,
+            'margin': self.margin, 'max_scale': self.max_scale, 'min_scale': self.min_scale,
+            'thickness': self.thickness, 'quality': self.quality,
+        }
+
+
+def puzzle_rows(artifact, dimension=None):
+    '''
+    Function takes the artifact of the puzzles of a lecture and returns the rows of the puzzle
+    of the given dimension, or of the first puzzle, as text with '...' for the empty pieces.
+    None if the lecture has no such puzzle.
+    '''
+    for puzzle in artifact['puzzles']:
+        if dimension is None or puzzle['dimension'] == dimension:
+            return [' '.join('...' if word == EMPTY_PIECE else word for word in row) for row in puzzle['words']] # pylint: disable=line-too-long
+    return None
+
+
+def text_width(text, scale, thickness):
+    '''Function returns the width in pixels of a text drawn at a font scale.'''
+    (width, _), _ = cv2.getTextSize(text, FONT, scale, thickness) # pylint: disable=no-member
+    return width
+
+
+def wrap_text(text, max_width, scale, thickness):
+    '''
+    Function takes a text and returns it as lines no wider than max_width at the font scale,
+    the words are packed greedily and a word too long for a line on its own is broken.
+    '''
+    lines = []
+    line = ''
+    for word in text.split():
+        candidate = line + ' ' + word if line else word
+        if text_width(candidate, scale, thickness) <= max_width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        # break the word if it does not fit on a line of its own
+        while text_width(word, scale, thickness) > max_width and len(word) > 1:
+            cut = len(word) - 1
+            while cut > 1 and text_width(word[:cut], scale, thickness) > max_width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+        line = word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def fit_text(rows, width, height, settings):
+    '''
+    Function takes the rows of text of a puzzle and returns the largest font scale, down to
+    the minimum scale, at which the wrapped rows fit on the image, the lines of every row and
+    the height of a line.
+    '''
+    scale = settings.max_scale
+    while True:
+        (_, text_height), baseline = cv2.getTextSize('Ag', FONT, scale, settings.thickness) # pylint: disable=no-member
+        line_height = int(np.ceil((text_height + baseline) * 1.3))
+        lines = [wrap_text(row, width, scale, settings.thickness) for row in rows]
+        total_height = line_height * sum(max(len(row_lines), 1) for row_lines in lines)
+        if total_height <= height or scale <= settings.min_scale:
+            return scale, lines, line_height
+        scale = max(settings.min_scale, scale * 0.9)
+
+
+def draw_puzzle(rows, settings):
+    '''
+    Function takes the rows of text of a puzzle and returns its image: every row on its own
+    lines, the first and last rows in the border color, centered vertically.
+    '''
+    image = np.full((settings.size, settings.size, 3), 255, dtype=np.uint8)
+    inner = settings.size - 2 * settings.margin
+    scale, lines, line_height = fit_text(rows, inner, inner, settings)
+    total_height = line_height * sum(max(len(row_lines), 1) for row_lines in lines)
+    y_pos = settings.margin + max(0, (inner - total_height) // 2)
+    for i, row_lines in enumerate(lines):
+        color = BORDER_COLOR if i in (0, len(lines) - 1) else TEXT_COLOR
+        for line in row_lines or ['']:
+            y_pos += line_height
+            cv2.putText(image, line, org=(settings.margin, y_pos - line_height // 4), # pylint: disable=no-member
+                        fontFace=FONT, fontScale=scale, color=color,
+                        thickness=settings.thickness, lineType=cv2.LINE_AA) # pylint: disable=no-member
+    return image
+
+
+def sprite_sheet(image, grid):
+    '''
+    Function takes the image of a puzzle and a grid size and returns the sprite sheet of its
+    pieces: the image scaled so a piece is a whole number of pixels, cut into grid by grid
+    pieces laid side by side in reading order.
+    '''
+    piece = image.shape[0] // grid
+    scaled = cv2.resize(image, (piece * grid, piece * grid), interpolation=cv2.INTER_AREA) # pylint: disable=no-member
+    pieces = [scaled[row * piece:(row + 1) * piece, column * piece:(column + 1) * piece]
+              for row in range(grid) for column in range(grid)]
+    return np.hstack(pieces)
+
+
+def piece_manifest(grid, settings):
+    '''
+    Function takes a grid size and returns the manifest of the sprite sheet of its pieces: the
+    size of a piece and of the sheet, and for every piece its position on the sheet and its
+    row and column in the puzzle.
+    '''
+    piece = settings.size // grid
+    return {
+        'grid': grid,
+        'piece_size': piece,
+        'width': piece * grid * grid,
+        'height': piece,
+        'pieces': [{'id': i, 'row': i // grid, 'column': i % grid, 'x': i * piece, 'y': 0}
+                   for i in range(grid * grid)],
+    }
+
+
+def encode_image(image, settings):
+    '''Function returns the bytes of an image as an optimized JPEG, None if it cannot be encoded.'''
+    params = [cv2.IMWRITE_JPEG_QUALITY, settings.quality, cv2.IMWRITE_JPEG_OPTIMIZE, 1] # pylint: disable=no-member
+    ok, buffer = cv2.imencode('.jpg', image, params) # pylint: disable=no-member
+    return buffer.tobytes() if ok else None
+
+
+def draw_lecture_puzzle(puzzle_path, settings):
+    '''
+    Function returns the image of the puzzle saved at puzzle_path, without extension, None if
+    the lecture has no puzzle of the dimension of the settings.
+    '''
+    artifact = load_puzzle(puzzle_path)
+    rows = puzzle_rows(artifact, settings.dimension) if artifact is not None else None
+    return None if rows is None else draw_puzzle(rows, settings)
+
+
+def encode_puzzle(puzzle_path, settings, grid=None):
+    '''
+    Function returns the bytes of the optimized JPEG image of the puzzle saved at puzzle_path,
+    without extension, or of its sprite sheet for a grid size. None if the lecture has no
+    puzzle of the dimension of the settings.
+    '''
+    image = draw_lecture_puzzle(puzzle_path, settings)
+    if image is None:
+        return None
+    return encode_image(image if grid is None else sprite_sheet(image, grid), settings)
+
+
+def write_image(data, image_path):
+    '''Function writes the bytes of an image so a reader never sees half of it.'''
+    with atomic_write(image_path, binary=True) as file:
+        file.write(data)
+
+
+def render_puzzle(puzzle_path, image_path, settings):
+    '''
+    Function renders the image of the puzzle saved at puzzle_path, without extension, to
+    image_path. Returns False if the lecture has no puzzle of the dimension of the settings.
+    '''
+    data = encode_puzzle(puzzle_path, settings)
+    if data is None:
+        return False
+    write_image(data, image_path)
+    return True
+
+
+def puzzle_input_key(puzzle_path, settings):
+    '''
+    Function returns the key of the input of the image of a lecture: its puzzle artifact, or
+    legacy puzzle file, and the rendering options. None if the lecture has no puzzle.
+    '''
+    for extension in ('.json', '.txt'):
+        if os.path.isfile(puzzle_path + extension):
+            return stage_key(file_hash(puzzle_path + extension), 'puzzle_image', settings.config())
+    return None
+
+
+def load_manifest(image_dir):
+    '''Function returns the input key of every image of a course rendered before.'''
+    try:
+        with open(os.path.join(image_dir, MANIFEST_NAME), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(image_dir, manifest):
+    '''Function saves the input key of every image of a course.'''
+    with atomic_write(os.path.join(image_dir, MANIFEST_NAME)) as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+
+
+def course_puzzles(course_number, settings):
+    '''
+    Function returns the path, without extension, of the puzzles of every lecture of a course
+    and the image directory of the course.
+    '''
+    names = set()
+    for path in glob.glob(os.path.join(settings.out_dir, course_number, 'Puzzle#*.*')):
+        name, extension = os.path.splitext(os.path.basename(path))
+        if extension in ('.json', '.txt'):
+            names.add(name)
+    image_dir = os.path.join(settings.image_dir, 'puzzle_' + course_number)
+    return [os.path.join(settings.out_dir, course_number, name) for name in sorted(names)], image_dir # pylint: disable=line-too-long
+
+
+def render_courses(course_numbers, settings=None, workers=None, force=False):
+    '''
+    Function renders the puzzle image of every lecture of the courses, given by their number
+    in link format like afam162, and returns how many images were rendered, skipped because
+    their input did not change since they were rendered and missing a puzzle. The lectures of
+    all the courses are rendered by one pool of workers, with force every image is rendered.
+    '''
+    settings = settings or RenderSettings()
+    workers = workers or os.cpu_count() or 1
+    jobs = []  # (puzzle path, image path, input key, image directory)
+    manifests = {}
+    skipped = 0
+    for course_number in course_numbers:
+        puzzle_paths, image_dir = course_puzzles(course_number, settings)
+        os.makedirs(image_dir, exist_ok=True)
+        manifest = manifests.setdefault(image_dir, load_manifest(image_dir))
+        for puzzle_path in puzzle_paths:
+            image_name = os.path.basename(puzzle_path) + '.jpg'
+            image_path = os.path.join(image_dir, image_name)
+            key = puzzle_input_key(puzzle_path, settings)
+            if not force and key is not None and manifest.get(image_name) == key and os.path.isfile(image_path): # pylint: disable=line-too-long
+                skipped += 1
+                continue
+            jobs.append((puzzle_path, image_path, key, image_dir))
+
+    puzzle_paths = [job[0] for job in jobs]
+    image_paths = [job[1] for job in jobs]
+    if workers <= 1 or len(jobs) <= 1:
+        results = map(render_puzzle, puzzle_paths, image_paths, repeat(settings, len(jobs)))
+        results = list(results)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            results = list(executor.map(render_puzzle, puzzle_paths, image_paths, repeat(settings, len(jobs)), chunksize=4)) # pylint: disable=line-too-long
+
+    rendered = 0
+    missing = 0
+    for (_, image_path, key, image_dir), result in zip(jobs, results):
+        if result:
+            rendered += 1
+            manifests[image_dir][os.path.basename(image_path)] = key
+        else:
+            missing += 1
+    for image_dir, manifest in manifests.items():
+        save_manifest(image_dir, manifest)
+    return {'rendered': rendered, 'skipped': skipped, 'missing': missing}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("Script to render the puzzle images of the processed courses")
+    parser.add_argument("-c", "--courses", required=False, nargs='+', type=str,
+                        help="Course numbers in link format, like afam162, every processed course by default")
+    parser.add_argument("-d", "--dimension", required=False, type=int,
+                        help="Dimension of the puzzle rendered, the first puzzle of every lecture by default")
+    parser.add_argument("-w", "--workers", required=False, type=int, help="Number of worker processes")
+    parser.add_argument("--force", action='store_true', help="Render every image even if its input did not change")
+    args = parser.parse_args()
+
+    render_settings = RenderSettings(dimension=args.dimension)
+    courses = args.courses or sorted(
+        name for name in os.listdir(render_settings.out_dir)
+        if os.path.isdir(os.path.join(render_settings.out_dir, name))
+    )
+    print(render_courses(courses, render_settings, workers=args.workers, force=args.force))
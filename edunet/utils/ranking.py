@@ -0,0 +1,293 @@
+'''
+Contains the ranking engines used by the course_processor to rank the words of a graph.
+
+The 'pagerank' ranker is networkx.pagerank. The 'numpy' ranker turns the word graph into integer
+indexed compressed sparse row arrays once and runs the same power iteration, with the same
+damping factor, tolerance and handling of dangling words, as vectorized numpy operations instead
+of Python loops over dictionaries.
+
+Several graphs, like the paragraphs of a lecture, can be stacked into one block diagonal matrix
+and ranked together by a single power iteration where every block converges on its own.
+
+Both rankers take a starting vector, the tolerance and the maximum number of iterations. The
+numpy ranker records the number of iterations every graph needed, for profiling.
+
+The approximate rankers trade exactness for latency, for previews: 'degree' ranks the words by
+the weight of the links to them and 'power' stops the numpy power iteration after a fixed small
+number of iterations instead of waiting for convergence.
+
+Classes:
+    CSRGraph
+        holds the transition matrix of word graphs as compressed sparse row arrays
+    IterationProfile
+        sums up the power iterations needed to rank the graphs of a run
+
+Functions:
+    graph_arrays(graph)
+        returns the words and the edges of a graph as arrays
+    block_pagerank(matrix, alpha, max_iter, tol, x, strict)
+        returns the pagerank vector of every block of a block diagonal matrix and the number
+        of iterations of every block
+    numpy_pagerank(graph, alpha, max_iter, tol, nstart, iterations)
+        returns the pagerank of every word of a graph using numpy
+    batch_pagerank(graphs, alpha, max_iter, tol, nstarts, iterations, strict)
+        returns the pagerank of every word of several graphs ranked together
+    degree_batch(graphs)
+        returns the share of the weighted in-degree of every word of several graphs
+    pagerank(graph, ranker, nstart, tol, max_iter, iterations)
+        returns the pagerank of every word of a graph with the given ranker
+    pagerank_batch(graphs, ranker, nstarts, tol, max_iter, iterations)
+        returns the pagerank of every word of several graphs with the given ranker
+    top_words(ranked_words, k)
+        returns the k words with the highest pagerank, all the words if k is None
+    rank_words(graph, ranker)
+        returns the words of a graph from the highest to the lowest pagerank
+'''
+__author__ = 'boutin'
+
+import heapq
+
+import numpy as np
+import networkx as nx
+
+RANKERS = ('pagerank', 'numpy')
+APPROXIMATE_RANKERS = ('degree', 'power')
+POWER_ITERATIONS = 3  # iterations of the 'power' ranker
+
+
+def graph_arrays(graph):
+    '''
+    Function takes a networkx graph or a WordGraph and returns its words and the word ids and
+    weight of every edge as arrays.
+    '''
+    if not isinstance(graph, nx.Graph):
+        return graph.nodes, graph.sources, graph.targets, graph.weights
+    nodes = list(graph)
+    index = {node: i for i, node in enumerate(nodes)}
+    sources = []
+    targets = []
+    weights = []
+    # adj works the same on every networkx version
+    for source, neighbours in graph.adj.items():
+        for target, attributes in neighbours.items():
+            sources.append(index[source])
+            targets.append(index[target])
+            weights.append(attributes.get('weight', 1))
+    return (nodes, np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64),
+            np.array(weights, dtype=np.float64))
+
+
+class CSRGraph:
+    '''
+    Class used to hold the transposed transition matrix of one or more word graphs as
+    compressed sparse row arrays: the row of a word lists the words linking to it with the
+    weight of the link divided by the total weight of the links leaving the linking word.
+    Several graphs, networkx graphs or WordGraphs, are stacked into one block diagonal matrix,
+    blocks holds the graph of every word.
+    '''
+    def __init__(self, graphs):
+        self.nodes = []
+        self.block_sizes = np.array([len(graph) for graph in graphs], dtype=np.float64)
+        all_sources = []
+        all_targets = []
+        all_weights = []
+        for graph in graphs:
+            nodes, sources, targets, weights = graph_arrays(graph)
+            all_sources.append(sources + len(self.nodes))
+            all_targets.append(targets + len(self.nodes))
+            all_weights.append(weights)
+            self.nodes.extend(nodes)
+        size = len(self.nodes)
+        self.blocks = np.repeat(np.arange(len(graphs)), self.block_sizes.astype(np.int64))
+        sources = np.concatenate(all_sources) if graphs else np.zeros(0, dtype=np.int64)
+        targets = np.concatenate(all_targets) if graphs else np.zeros(0, dtype=np.int64)
+        weights = np.concatenate(all_weights) if graphs else np.zeros(0)
+        out_weights = np.bincount(sources, weights=weights, minlength=size)
+        order = np.argsort(targets, kind='stable')
+        self.indices = sources[order]
+        self.data = weights[order] / out_weights[self.indices]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(targets, minlength=size))))
+        # the row of every stored value, so a product is a single bincount
+        self.rows = targets[order]
+        self.dangling = out_weights == 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def dot(self, x):
+        '''Function returns the product of the transposed transition matrix and a vector.'''
+        return np.bincount(self.rows, weights=self.data * x[self.indices], minlength=len(self))
+
+    def block_sum(self, x, mask=None):
+        '''Function returns the sum of a vector over every block, only where mask is set if given.''' # pylint: disable=line-too-long
+        if mask is None:
+            return np.bincount(self.blocks, weights=x, minlength=len(self.block_sizes))
+        return np.bincount(self.blocks[mask], weights=x[mask], minlength=len(self.block_sizes))
+
+
+class IterationProfile:
+    '''Class used to sum up, for every kind of graph, how many power iterations the graphs needed.''' # pylint: disable=line-too-long
+    def __init__(self):
+        self.graphs = {}
+        self.iterations = {}
+        self.max_iterations = {}
+
+    def record(self, kind, iterations):
+        '''Function adds the number of iterations of every graph of a kind.'''
+        for count in iterations:
+            self.graphs[kind] = self.graphs.get(kind, 0) + 1
+            self.iterations[kind] = self.iterations.get(kind, 0) + count
+            self.max_iterations[kind] = max(self.max_iterations.get(kind, 0), count)
+
+    def summary(self):
+        '''Function returns a readable summary of the iterations of every kind of graph.'''
+        return ', '.join(
+            '{}: {} graphs {:.1f} iterations on average {} at most'.format(kind, self.graphs[kind], self.iterations[kind] / self.graphs[kind], self.max_iterations[kind]) # pylint: disable=line-too-long
+            for kind in sorted(self.graphs)
+        )
+
+
+def block_pagerank(matrix, alpha=0.85, max_iter=100, tol=1.0e-6, x=None, strict=True):
+    '''
+    Function takes a CSRGraph of one or more non empty graphs and returns the pagerank vector
+    of all their words and the number of iterations of every block. Every block runs the power
+    iteration of networkx.pagerank from the starting vector x, uniform if None, and is masked
+    out as soon as it converges on its own, so a graph gets the same ranks whether it is ranked
+    alone or with others. Unless strict, the vector after max_iter iterations is returned
+    instead of failing to converge.
+    '''
+    sizes = matrix.block_sizes
+    if x is None:
+        x = (1.0 / sizes)[matrix.blocks]
+    else:
+        # like networkx the starting vector of every block is normalized
+        x = x / matrix.block_sum(x)[matrix.blocks]
+    active = np.ones(len(sizes), dtype=bool)
+    iterations = np.zeros(len(sizes), dtype=np.int64)
+    for iteration in range(1, max_iter + 1):
+        x_last = x
+        dangling_sum = matrix.block_sum(x_last, matrix.dangling)
+        x = alpha * matrix.dot(x_last) + ((alpha * dangling_sum + 1.0 - alpha) / sizes)[matrix.blocks] # pylint: disable=line-too-long
+        # check convergence of every block, l1 norm
+        converged = matrix.block_sum(np.abs(x - x_last)) < sizes * tol
+        # converged blocks keep the vector they converged to
+        x = np.where(active[matrix.blocks], x, x_last)
+        iterations[active] = iteration
+        active &= ~converged
+        if not active.any():
+            return x, iterations
+    if not strict:
+        return x, iterations
+    raise nx.NetworkXError('pagerank: power iteration failed to converge in {} iterations.'.format(max_iter)) # pylint: disable=line-too-long
+
+
+def numpy_pagerank(graph, alpha=0.85, max_iter=100, tol=1.0e-6, nstart=None, iterations=None):
+    '''
+    Function takes a word graph and returns a dictionary of the pagerank of every word, computed
+    like networkx.pagerank with uniform personalization and dangling weights. nstart is the
+    starting pagerank of the words, the number of iterations is added to iterations if given.
+    '''
+    if len(graph) == 0:
+        return {}
+    return batch_pagerank([graph], alpha, max_iter, tol, None if nstart is None else [nstart], iterations)[0] # pylint: disable=line-too-long
+
+
+def batch_pagerank(graphs, alpha=0.85, max_iter=100, tol=1.0e-6, nstarts=None, iterations=None,
+                   strict=True):
+    '''
+    Function takes a list of word graphs and returns the pagerank dictionary of every graph,
+    computed for all the graphs at once on their block diagonal matrix. nstarts is the starting
+    pagerank of the words of every graph, a graph without a start or whose words all start at
+    zero starts uniform. The number of iterations of every non empty graph is added to
+    iterations if given, see block_pagerank for strict.
+    '''
+    non_empty = [i for i, graph in enumerate(graphs) if len(graph) > 0]
+    ranks = []
+    if non_empty:
+        matrix = CSRGraph([graphs[i] for i in non_empty])
+        x = None
+        if nstarts is not None:
+            block_nstarts = [nstarts[i] or {} for i in non_empty]
+            x = np.array([block_nstarts[block].get(node, 0.0) for block, node in zip(matrix.blocks.tolist(), matrix.nodes)], dtype=np.float64) # pylint: disable=line-too-long
+            uniform = matrix.block_sum(x) <= 0
+            x[uniform[matrix.blocks]] = 1.0
+        x, block_iterations = block_pagerank(matrix, alpha, max_iter, tol, x, strict)
+        if iterations is not None:
+            iterations.extend(block_iterations.tolist())
+        x = x.tolist()
+        non_empty = [graphs[i] for i in non_empty]
+        start = 0
+        for graph in non_empty:
+            ranks.append(dict(zip(matrix.nodes[start:start + len(graph)], x[start:start + len(graph)]))) # pylint: disable=line-too-long
+            start += len(graph)
+    ranks.reverse()
+    return [ranks.pop() if len(graph) > 0 else {} for graph in graphs]
+
+
+def degree_batch(graphs):
+    '''
+    Function takes a list of word graphs and returns, for every graph, the share of the weight
+    of the links of the graph that goes to every word. The words of a graph without links get
+    the same share.
+    '''
+    ranks = []
+    for graph in graphs:
+        nodes, _, targets, weights = graph_arrays(graph)
+        in_weights = np.bincount(targets, weights=weights, minlength=len(nodes))
+        total = in_weights.sum()
+        shares = in_weights / total if total > 0 else np.full(len(nodes), 1.0 / max(len(nodes), 1)) # pylint: disable=line-too-long
+        ranks.append(dict(zip(nodes, shares.tolist())))
+    return ranks
+
+
+def pagerank(graph, ranker='pagerank', nstart=None, tol=1.0e-6, max_iter=100, iterations=None):
+    '''
+    Function takes a word graph and a ranker and returns the pagerank of every word, starting
+    from nstart if given. The numpy and power rankers add their number of iterations to
+    iterations if given, the approximate rankers ignore tol and max_iter.
+    '''
+    if ranker in ('numpy',) + APPROXIMATE_RANKERS:
+        return pagerank_batch([graph], ranker, None if nstart is None else [nstart], tol, max_iter, iterations)[0] # pylint: disable=line-too-long
+    if ranker == 'pagerank':
+        if not isinstance(graph, nx.Graph):
+            graph = graph.to_networkx()
+        if nstart is not None and sum(nstart.get(node, 0.0) for node in graph) <= 0:
+            nstart = None
+        if nstart is not None:
+            nstart = {node: nstart.get(node, 0.0) for node in graph}
+        return nx.pagerank(graph, nstart=nstart, tol=tol, max_iter=max_iter)
+    raise ValueError('Unknown ranker {}, use one of {}'.format(ranker, RANKERS + APPROXIMATE_RANKERS)) # pylint: disable=line-too-long
+
+
+def pagerank_batch(graphs, ranker='pagerank', nstarts=None, tol=1.0e-6, max_iter=100, iterations=None): # pylint: disable=line-too-long
+    '''
+    Function takes a list of word graphs and a ranker and returns the pagerank dictionary of
+    every graph, starting from nstarts if given, the numpy and power rankers rank all the
+    graphs at once.
+    '''
+    if ranker == 'numpy':
+        return batch_pagerank(graphs, max_iter=max_iter, tol=tol, nstarts=nstarts, iterations=iterations) # pylint: disable=line-too-long
+    if ranker == 'power':
+        # tol 0 never stops a graph before its POWER_ITERATIONS iterations
+        return batch_pagerank(graphs, max_iter=POWER_ITERATIONS, tol=0.0, nstarts=nstarts, iterations=iterations, strict=False) # pylint: disable=line-too-long
+    if ranker == 'degree':
+        return degree_batch(graphs)
+    nstarts = nstarts or [None] * len(graphs)
+    return [pagerank(graph, ranker, nstart, tol, max_iter) for graph, nstart in zip(graphs, nstarts)] # pylint: disable=line-too-long
+
+
+def top_words(ranked_words, k=None):
+    '''
+    Function takes a dictionary of the pagerank of every word and returns the k words with the
+    highest pagerank in order, words with the same pagerank keep their order. Only the top k
+    are selected and sorted, every word is sorted if k is None.
+    '''
+    if k is None or k >= len(ranked_words):
+        return sorted(ranked_words, key=ranked_words.get, reverse=True)
+    return heapq.nlargest(k, ranked_words, key=ranked_words.get)
+
+
+def rank_words(graph, ranker='pagerank'):
+    '''Function takes a word graph and a ranker and returns the words from the highest to the lowest pagerank.''' # pylint: disable=line-too-long
+    return top_words(pagerank(graph, ranker))
+
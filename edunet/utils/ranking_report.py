@@ -0,0 +1,118 @@
+'''
+Script used to compare the rankers of the course_processor with networkx.pagerank over every
+transcript in utils/in and report how often they give the same top keywords, how many of the
+top keywords they share with pagerank on average and how long each one takes. The approximate
+rankers, for previews, are compared too.
+
+The paragraph and lecture graphs are built from the nouns of every lecture like the
+course_processor builds them.
+
+Run from the project directory:
+    python -m edunet.utils.ranking_report [-i INPUT_DIR] [-k TOP_K] [-r RANKER ...] [-o REPORT_FILE]
+
+Functions:
+    load_graphs(input_dir)
+        returns the paragraph graphs and the lecture graphs of every transcript
+    compare_rankers(graphs, top_k, rankers)
+        returns the top keyword agreement and timing of the rankers
+    format_report(results)
+        returns a readable report of the results
+'''
+__author__ = 'boutin'
+
+import argparse
+import glob
+import os
+import time
+
+import networkx as nx
+
+from .course_processor import ProcessorSettings, Lecture, words_to_graph
+from .ranking import RANKERS, APPROXIMATE_RANKERS, rank_words
+
+
+def load_graphs(input_dir):
+    '''
+    Function takes a directory and returns the co-occurrence graph of every paragraph and
+    of every lecture of the transcripts under it.
+    '''
+    settings = ProcessorSettings(10, 10, 6, os.path.join(input_dir, 'cache'))
+    paragraph_graphs = []
+    lecture_graphs = []
+    pattern = os.path.join(input_dir, '**', 'transcripts', '*.html')
+    for transcript in sorted(glob.glob(pattern, recursive=True)):
+        paragraph_nouns, _ = Lecture(transcript, transcript, settings).nlp_pipeline()
+        lecture_graph = nx.DiGraph()
+        previous_word = None
+        for nouns in paragraph_nouns:
+            paragraph_graph = nx.DiGraph()
+            words_to_graph(paragraph_graph, nouns)
+            previous_word = words_to_graph(lecture_graph, nouns, previous_word)
+            paragraph_graphs.append(paragraph_graph)
+        lecture_graphs.append(lecture_graph)
+    for graph in paragraph_graphs + lecture_graphs:
+        if graph.has_node("."):
+            graph.remove_node(".")
+    return {'paragraph': paragraph_graphs, 'lecture': lecture_graphs}
+
+
+def compare_rankers(graphs, top_k=10, rankers=RANKERS + APPROXIMATE_RANKERS):
+    '''
+    Function takes the graphs returned by load_graphs and returns, for every kind of graph and
+    every ranker, the seconds it took, for how many graphs its top_k keywords are the same as
+    the ones of pagerank and how many of them it shares with pagerank.
+    '''
+    rankers = ('pagerank',) + tuple(ranker for ranker in rankers if ranker != 'pagerank')
+    results = {'top_k': top_k, 'graphs': []}
+    for kind, kind_graphs in graphs.items():
+        rankings = {}
+        for ranker in rankers:
+            start = time.perf_counter()
+            rankings[ranker] = [rank_words(graph, ranker) for graph in kind_graphs]
+            seconds = time.perf_counter() - start
+            identical = 0
+            overlap = 0
+            for reference, ranking in zip(rankings['pagerank'], rankings[ranker]):
+                identical += reference[:top_k] == ranking[:top_k]
+                overlap += len(set(reference[:top_k]) & set(ranking[:top_k]))
+            results['graphs'].append({
+                'kind': kind,
+                'ranker': ranker,
+                'count': len(kind_graphs),
+                'identical_top_k': identical,
+                'overlap_top_k': overlap,
+                'seconds': seconds,
+            })
+    return results
+
+
+def format_report(results):
+    '''Function takes the results of compare_rankers and returns a readable report.'''
+    lines = ['{:<12}{:<10}{:>10}{:>20}{:>20}{:>10}'.format(
+        'graphs', 'ranker', 'count', 'identical top {}'.format(results['top_k']),
+        'overlap top {}'.format(results['top_k']), 'seconds')]
+    for graphs in results['graphs']:
+        lines.append('{:<12}{:<10}{:>10}{:>20.2%}{:>20.2f}{:>10.2f}'.format(
+            graphs['kind'], graphs['ranker'], graphs['count'],
+            graphs['identical_top_k'] / max(graphs['count'], 1),
+            graphs['overlap_top_k'] / max(graphs['count'], 1), graphs['seconds'],
+        ))
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("Script to compare the course processor rankers")
+    parser.add_argument("-i", "--input_dir", required=False, type=str,
+                        default=os.path.join('edunet', 'utils', 'in'), help="Directory of the courses")
+    parser.add_argument("-k", "--top_k", required=False, type=int, default=10,
+                        help="Number of top keywords compared")
+    parser.add_argument("-r", "--rankers", required=False, nargs='+', choices=RANKERS + APPROXIMATE_RANKERS,
+                        default=list(RANKERS + APPROXIMATE_RANKERS), help="Rankers compared with pagerank")
+    parser.add_argument("-o", "--output", required=False, type=str, help="File to write the report to")
+    args = parser.parse_args()
+
+    report = format_report(compare_rankers(load_graphs(args.input_dir), args.top_k, args.rankers))
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(report)
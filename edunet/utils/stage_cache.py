@@ -0,0 +1,124 @@
+'''
+Contains the on-disk cache used to keep the artifacts of every course processing stage.
+
+Every artifact is stored under a content address built from the hash of the transcript and the
+configuration of the stage and of every stage before it, so a rerun only recomputes the stages
+whose inputs changed.
+
+Classes:
+    StageCache
+        stores and retrieves pickled stage artifacts
+
+Functions:
+    file_hash(path)
+        returns the sha256 hash of the contents of a file
+    stage_key(parent_key, stage, config)
+        returns the content address of a stage given the address of the stage before it
+'''
+__author__ = 'boutin'
+
+import os
+import hashlib
+import pickle
+
+from .persistent_store import atomic_write
+
+
+def file_hash(path):
+    '''Function takes a path and returns the sha256 hash of the contents of the file.'''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(parent_key, stage, config=None):
+    '''
+    Function takes the key of the previous stage, the name of a stage and its configuration
+    and returns the key of the stage.
+    '''
+    digest = hashlib.sha256()
+    digest.update(parent_key.encode('utf-8'))
+    digest.update(stage.encode('utf-8'))
+    digest.update(repr(sorted((config or {}).items())).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class StageCache:
+    '''Class used to store the artifacts of the course processing stages on disk.'''
+    def __init__(self, cache_dir, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.hits = {}
+        self.misses = {}
+
+    def path(self, stage, key):
+        '''Function returns the path of the artifact of a stage.'''
+        return os.path.join(self.cache_dir, stage, key + '.pickle')
+
+    def get(self, stage, key):
+        '''
+        Function returns the artifact of a stage or None if it has not been cached. An
+        artifact that can not be loaded, like one pickled by older code, is removed and
+        treated as not cached.
+        '''
+        if not self.enabled:
+            return None
+        path = self.path(stage, key)
+        try:
+            with open(path, 'rb') as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception: # pylint: disable=broad-except
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def put(self, stage, key, value):
+        '''Function stores the artifact of a stage.'''
+        if not self.enabled:
+            return
+        stage_dir = os.path.join(self.cache_dir, stage)
+        os.makedirs(stage_dir, exist_ok=True)
+        with atomic_write(self.path(stage, key), binary=True) as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def lookup(self, stage, key):
+        '''Function returns the artifact of a stage or None, counting the hit or miss.'''
+        value = self.get(stage, key)
+        if value is not None:
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+        else:
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+        return value
+
+    def cached(self, stage, key, compute):
+        '''
+        Function returns the cached artifact of a stage, computing and storing it
+        with compute() when it is not cached yet.
+        '''
+        value = self.lookup(stage, key)
+        if value is not None:
+            return value
+        value = compute()
+        self.put(stage, key, value)
+        return value
+
+    def add_counts(self, hits, misses):
+        '''Function adds the hits and misses counted by another cache, i.e. in a worker process.'''
+        for stage, count in hits.items():
+            self.hits[stage] = self.hits.get(stage, 0) + count
+        for stage, count in misses.items():
+            self.misses[stage] = self.misses.get(stage, 0) + count
+
+    def summary(self):
+        '''Function returns a readable summary of the hits and misses of every stage.'''
+        stages = sorted(set(self.hits) | set(self.misses))
+        return ', '.join(
+            '{}: {} hits {} misses'.format(stage, self.hits.get(stage, 0), self.misses.get(stage, 0)) # pylint: disable=line-too-long
+            for stage in stages
+        )
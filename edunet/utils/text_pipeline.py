@@ -0,0 +1,122 @@
+'''
+Contains the natural language processing steps used by the course_processor.
+
+The 'word_tokenize' tokenizer is the NLTK word tokenizer followed by the original removal of
+the non alphabetic tokens. The 'fast' tokenizer walks through the paragraph once with precompiled
+patterns and returns the alphabetic tokens and a '.' at the end of every sentence.
+
+Functions:
+    tokenize_paragraph(text, tokenizer)
+        returns the alphabetic tokens of a paragraph with the given tokenizer
+    word_tokenize_paragraph(text)
+        returns the alphabetic tokens of a paragraph using the NLTK word tokenizer
+    fast_tokenize_paragraph(text)
+        returns the alphabetic tokens and sentence separators of a paragraph in a single pass
+    tag_paragraphs(paragraph_tokens, batched)
+        returns the part of speech tagged tokens of every paragraph
+    shared_tagger()
+        returns the perceptron tagger shared by every lecture of the process
+    filter_nouns(tagged_tokens)
+        returns the nouns and sentence separators of a tagged paragraph
+'''
+__author__ = 'boutin'
+
+import re
+
+import nltk as nl
+
+from .persistent_store import shared_instance
+
+TOKENIZERS = ('word_tokenize', 'fast')
+
+# a chunk of a paragraph between whitespace, dashes and the punctuation the NLTK tokenizer always
+# splits off, or a run of question and exclamation marks
+TOKEN_PATTERN = re.compile(
+    r'(?P<chunk>(?:[^\s\-;@#$%&?!\[\](){}<>"\u201c\u201d\u2018\u2019]|(?<!-)-(?!-))+)|(?P<end>[?!]+)'
+)
+# a word made of letters only, optionally followed by a contraction the NLTK tokenizer splits off
+WORD_PATTERN = re.compile(r"([^\W\d_]+?)(n't|'(?:s|m|d|ll|re|ve))?", re.IGNORECASE)
+# words the NLTK tokenizer splits in two
+SPLIT_WORD_PATTERN = re.compile(r'(can)(not)|(gim|lem)(me)|(gon|wan)(na)|(got)(ta)', re.IGNORECASE)
+OPENING_PUNCTUATION = "'`"
+CLOSING_PUNCTUATION = "',:"
+# abbreviations the NLTK tokenizer keeps together with their period, so they end no sentence
+ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'prof', 'st', 'vs'}
+
+
+def tokenize_paragraph(text, tokenizer='word_tokenize'):
+    '''Function takes the text of a paragraph and a tokenizer and returns its alphabetic tokens.'''
+    if tokenizer == 'word_tokenize':
+        return word_tokenize_paragraph(text)
+    if tokenizer == 'fast':
+        return fast_tokenize_paragraph(text)
+    raise ValueError('Unknown tokenizer {}, use one of {}'.format(tokenizer, TOKENIZERS))
+
+
+def word_tokenize_paragraph(text):
+    '''Function takes the text of a paragraph and returns its alphabetic tokens.'''
+    tokens = nl.word_tokenize(text, language="english")
+    # removing while iterating skips the token that follows each removed one,
+    # kept as is so the trees and puzzles do not change
+    for token in tokens:
+        if token.isalpha() == 0:
+            tokens.remove(token)
+    return tokens
+
+
+def fast_tokenize_paragraph(text):
+    '''
+    Function takes the text of a paragraph and returns its alphabetic tokens with a '.' after
+    every sentence in one pass. Punctuation around a word and the contractions the NLTK
+    tokenizer splits off are stripped and words like cannot are split in two, chunks with
+    digits, hyphens or inner periods are dropped as the NLTK tokens they would give are not
+    alphabetic.
+    '''
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        chunk = match.group('chunk')
+        if chunk is None:
+            if tokens and tokens[-1] != '.':
+                tokens.append('.')  # question or exclamation mark
+            continue
+        chunk = chunk.lstrip(OPENING_PUNCTUATION).rstrip(CLOSING_PUNCTUATION)
+        word = chunk.rstrip('.')
+        sentence_end = len(word) < len(chunk)
+        word = word.rstrip(CLOSING_PUNCTUATION)
+        if sentence_end and ('.' in word or len(word) == 1 or word.lower() in ABBREVIATIONS):
+            continue  # U.S., Mr. and initials are a single non alphabetic token
+        split_match = SPLIT_WORD_PATTERN.fullmatch(word)
+        if split_match is not None:
+            tokens.extend(part for part in split_match.groups() if part is not None)
+        else:
+            word_match = WORD_PATTERN.fullmatch(word)
+            if word_match is not None:
+                tokens.append(word_match.group(1))
+        if sentence_end and tokens and tokens[-1] != '.':
+            tokens.append('.')
+    return tokens
+
+
+def tag_paragraphs(paragraph_tokens, batched=True):
+    '''
+    Function takes a list of token lists (one per paragraph) and returns the part of speech
+    tags of every paragraph. When batched, all the paragraphs are tagged with the tagger shared
+    by the process instead of loading the perceptron tagger again for every paragraph.
+    '''
+    if batched:
+        tagger = shared_tagger()
+        return [tagger.tag(tokens) for tokens in paragraph_tokens]
+    return [nl.pos_tag(tokens) for tokens in paragraph_tokens]
+
+
+def shared_tagger():
+    '''
+    Function returns the perceptron tagger shared by every lecture processed in this process,
+    its model is only loaded from disk the first time.
+    '''
+    return shared_instance(nl.tag.PerceptronTagger)
+
+
+def filter_nouns(tagged_tokens):
+    '''Function takes the tagged tokens of a paragraph and returns the nouns and separators.'''
+    return [token for token, tag in tagged_tokens if tag[0:2] == "NN" or token == "."]
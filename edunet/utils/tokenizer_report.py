@@ -0,0 +1,129 @@
+'''
+Script used to compare the 'fast' tokenizer of the course_processor with the NLTK word tokenizer
+over every transcript in utils/in and report how often they agree and how long each one takes.
+
+The reference is the alphabetic tokens of nl.word_tokenize, the sentence separators of the
+fast tokenizer are left out of the comparison. The original 'word_tokenize' path, which skips
+the token after every removed one, is timed and compared as well.
+
+Run from the project directory:
+    python -m edunet.utils.tokenizer_report [-i INPUT_DIR] [-o REPORT_FILE]
+
+Functions:
+    load_paragraphs(input_dir)
+        returns the paragraphs of every transcript under the input directory
+    compare_tokenizers(paragraphs)
+        returns the agreement and timing of every tokenizer against the reference
+    format_report(results)
+        returns a readable report of the results
+'''
+__author__ = 'boutin'
+
+import argparse
+import glob
+import os
+import time
+
+from collections import Counter
+
+import nltk as nl
+
+from .html_extractor import extract_paragraphs
+from .text_pipeline import word_tokenize_paragraph, fast_tokenize_paragraph
+
+
+def load_paragraphs(input_dir):
+    '''Function takes a directory and returns the paragraphs of every transcript under it.'''
+    paragraphs = []
+    pattern = os.path.join(input_dir, '**', 'transcripts', '*.html')
+    for transcript in sorted(glob.glob(pattern, recursive=True)):
+        with open(transcript, encoding='utf-8') as file:
+            paragraphs.extend(extract_paragraphs(file.read())[0])
+    return paragraphs
+
+
+def timed(tokenizer, paragraphs):
+    '''Function returns the tokens of every paragraph and the seconds it took to get them.'''
+    start = time.perf_counter()
+    tokens = [tokenizer(text) for text in paragraphs]
+    return tokens, time.perf_counter() - start
+
+
+def agreement(reference, tokens):
+    '''
+    Function takes the reference tokens and the tokens of a tokenizer for every paragraph and
+    returns the number of identical paragraphs and of reference tokens found by the tokenizer.
+    '''
+    identical = 0
+    common = 0
+    for reference_tokens, paragraph_tokens in zip(reference, tokens):
+        if reference_tokens == paragraph_tokens:
+            identical += 1
+        common += sum((Counter(reference_tokens) & Counter(paragraph_tokens)).values())
+    return identical, common
+
+
+def compare_tokenizers(paragraphs):
+    '''
+    Function takes a list of paragraphs and returns a dictionary with the number of paragraphs
+    and reference tokens and, for every tokenizer, its time and agreement with the reference.
+    '''
+    def reference_tokenizer(text):
+        return [token for token in nl.word_tokenize(text, language="english") if token.isalpha()]
+
+    def fast_tokenizer(text):
+        return [token for token in fast_tokenize_paragraph(text) if token != '.']
+
+    reference, reference_time = timed(reference_tokenizer, paragraphs)
+    results = {
+        'paragraphs': len(paragraphs),
+        'tokens': sum(len(tokens) for tokens in reference),
+        'tokenizers': [],
+    }
+    for name, tokenizer in [('reference', None), ('word_tokenize', word_tokenize_paragraph),
+                            ('fast', fast_tokenizer)]:
+        if tokenizer is None:
+            tokens, seconds = reference, reference_time
+        else:
+            tokens, seconds = timed(tokenizer, paragraphs)
+        identical, common = agreement(reference, tokens)
+        results['tokenizers'].append({
+            'name': name,
+            'seconds': seconds,
+            'identical_paragraphs': identical,
+            'common_tokens': common,
+            'tokens': sum(len(paragraph_tokens) for paragraph_tokens in tokens),
+        })
+    return results
+
+
+def format_report(results):
+    '''Function takes the results of compare_tokenizers and returns a readable report.'''
+    lines = [
+        'Paragraphs: {}'.format(results['paragraphs']),
+        'Reference tokens (alphabetic tokens of nl.word_tokenize): {}'.format(results['tokens']),
+        '',
+        '{:<15}{:>10}{:>14}{:>22}{:>18}'.format(
+            'tokenizer', 'seconds', 'tokens', 'identical paragraphs', 'tokens recall'),
+    ]
+    for tokenizer in results['tokenizers']:
+        lines.append('{:<15}{:>10.2f}{:>14}{:>22.2%}{:>18.2%}'.format(
+            tokenizer['name'], tokenizer['seconds'], tokenizer['tokens'],
+            tokenizer['identical_paragraphs'] / max(results['paragraphs'], 1),
+            tokenizer['common_tokens'] / max(results['tokens'], 1),
+        ))
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("Script to compare the course processor tokenizers")
+    parser.add_argument("-i", "--input_dir", required=False, type=str,
+                        default=os.path.join('edunet', 'utils', 'in'), help="Directory of the courses")
+    parser.add_argument("-o", "--output", required=False, type=str, help="File to write the report to")
+    args = parser.parse_args()
+
+    report = format_report(compare_tokenizers(load_paragraphs(args.input_dir)))
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(report)
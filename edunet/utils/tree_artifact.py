@@ -0,0 +1,196 @@
+'''
+Contains the structured artifact of the Tree of Knowledge of a lecture saved by the
+course_processor and loaded by the website.
+
+The artifact holds the title of the lecture, its ranked keywords and the ranked keywords of
+every paragraph with their pagerank, already cleaned of stop words when the lecture is
+processed, so showing a Tree of Knowledge is a plain JSON load without any tokenization. The
+artifact records the ranker of the run, the Trees of an approximate ranker are provisional
+until an exact run replaces them. The legacy Tree#transcriptNN.txt files can be converted to
+artifacts once.
+
+Run from the project directory to convert the legacy files:
+    python -m edunet.utils.tree_artifact [-c COURSE ...] [--force]
+
+Functions:
+    english_stop_words()
+        returns the english stop words of nltk, loaded once per process
+    clean_keywords(keywords, stop_words, paragraph)
+        returns the keywords shown on the Tree of Knowledge
+    tree_artifact(title, lecture, paragraphs, stop_words, ranker, provisional)
+        returns the structured artifact of the Tree of Knowledge of a lecture
+    write_tree_artifact(file_path, artifact)
+        writes the structured artifact of the Tree of Knowledge of a lecture
+    load_tree_artifact(file_path)
+        returns the structured artifact of the Tree of Knowledge of a lecture saved in a file
+    tree_dict(artifact)
+        returns the dictionary of the Tree of Knowledge shown by the website
+    legacy_keyword(word)
+        returns a keyword of a legacy Tree of Knowledge file
+    parse_tree_lines(tree_list)
+        returns the title and keywords of a legacy Tree of Knowledge file
+    convert_tree_file(tree_path, stop_words)
+        converts a legacy Tree of Knowledge file to an artifact
+'''
+__author__ = 'boutin'
+
+import os
+import ast
+import glob
+import json
+import argparse
+
+from functools import lru_cache
+
+from nltk.corpus import stopwords
+
+from .persistent_store import atomic_write
+
+TREE_ARTIFACT_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def english_stop_words():
+    '''Function returns the english stop words of nltk as a frozenset, loaded once.'''
+    return frozenset(stopwords.words('english'))
+
+
+def clean_keywords(keywords, stop_words, paragraph=False):
+    '''
+    Function takes a list of (keyword, pagerank) pairs and returns the pairs shown on the Tree
+    of Knowledge: no stop words and, for a paragraph, only alphabetic words of more than one
+    letter.
+    '''
+    cleaned = []
+    for word, score in keywords:
+        if word in stop_words:
+            continue
+        if paragraph and (len(word) == 1 or not word.isalpha()):
+            continue
+        cleaned.append([word, score])
+    return cleaned
+
+
+def tree_artifact(title, lecture, paragraphs, stop_words, ranker='pagerank', provisional=False):
+    '''
+    Function takes the title of a lecture, its keywords and the keywords of every paragraph
+    as lists of (keyword, pagerank) pairs from the highest to the lowest rank and returns the
+    structured artifact of its Tree of Knowledge, ready to be saved as JSON. The artifact
+    records the ranker of the keywords and whether they are a provisional preview.
+    '''
+    return {
+        'version': TREE_ARTIFACT_VERSION,
+        'title': title,
+        'ranker': ranker,
+        'provisional': provisional,
+        'lecture': clean_keywords(lecture, stop_words),
+        'paragraphs': [clean_keywords(keywords, stop_words, paragraph=True) for keywords in paragraphs], # pylint: disable=line-too-long
+    }
+
+
+def write_tree_artifact(file_path, artifact):
+    '''Function writes the structured artifact of the Tree of Knowledge of a lecture.'''
+    with atomic_write(file_path) as file:
+        json.dump(artifact, file, separators=(',', ':'))
+
+
+def load_tree_artifact(file_path):
+    '''
+    Function returns the structured artifact of the Tree of Knowledge of a lecture saved in a
+    file, None if there is none or it was written by another version.
+    '''
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            artifact = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(artifact, dict) or artifact.get('version') != TREE_ARTIFACT_VERSION:
+        return None
+    return artifact
+
+
+def tree_dict(artifact):
+    '''
+    Function takes the artifact of a Tree of Knowledge and returns the dictionary shown by the
+    website, the same as the one read from a legacy file by utils.get_tree_dict.
+    '''
+    paragraphs = {}
+    for i, keywords in enumerate(artifact['paragraphs'], 1):
+        paragraphs['Paragraph ' + str(i) + ' Keywords'] = [word for word, _ in keywords]
+    return {
+        'Lecture Title': artifact['title'],
+        'Lecture Keywords': [word for word, _ in artifact['lecture']],
+        'Paragraphs': paragraphs,
+    }
+
+
+def legacy_keyword(word):
+    '''Function returns a keyword of a legacy file, written as the bytes repr of the word or as is.'''
+    if word[:2] in ("b'", 'b"'):
+        return ast.literal_eval(word).decode('utf-8')
+    return word
+
+
+def parse_tree_lines(tree_list):
+    '''
+    Function takes the lines of a legacy Tree of Knowledge file and returns the lecture title,
+    the lecture keywords and the keywords of every paragraph, read keyword by keyword. The
+    oldest files have no title and their lecture keywords follow the transcript name.
+    '''
+    title = ''
+    lecture = []
+    paragraphs = []
+    for line_num, line in enumerate(tree_list):
+        line = line.rstrip('\n')
+        if line_num == 0:
+            continue  # the file starts with an empty line
+        if line_num == 1:
+            head, keywords = line.split(':', 1)
+            if '-' in head:
+                # the header is the transcript name and the lecture title
+                title = line.split('-', 1)[1].rsplit(':', 1)[0]
+            else:
+                lecture = [legacy_keyword(word) for word in keywords.split()]
+            continue
+        head, keywords = line.split(': ', 1)
+        keywords = [legacy_keyword(word) for word in keywords.split()]
+        if head == '--------Lecture':
+            lecture = keywords
+        else:
+            paragraphs.append(keywords)
+    return title, lecture, paragraphs
+
+
+def convert_tree_file(tree_path, stop_words):
+    '''
+    Function converts the legacy Tree of Knowledge file at tree_path to an artifact saved next
+    to it with the .json extension and returns its path. The legacy files hold no pagerank so
+    the scores of the artifact are None.
+    '''
+    with open(tree_path, 'r', encoding='utf-8') as file:
+        title, lecture, paragraphs = parse_tree_lines(file.readlines())
+    artifact = tree_artifact(
+        title, [(word, None) for word in lecture],
+        [[(word, None) for word in keywords] for keywords in paragraphs], stop_words
+    )
+    artifact_path = os.path.splitext(tree_path)[0] + '.json'
+    write_tree_artifact(artifact_path, artifact)
+    return artifact_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser("Script to convert the legacy Tree of Knowledge files to artifacts")
+    parser.add_argument("-o", "--out", required=False, type=str, default=os.path.join('edunet', 'utils', 'out'),
+                        help="Directory of the processed courses")
+    parser.add_argument("-c", "--courses", required=False, nargs='+', type=str,
+                        help="Course numbers in link format, like afam162, every processed course by default")
+    parser.add_argument("--force", action='store_true', help="Convert the files that already have an artifact")
+    args = parser.parse_args()
+
+    converted = 0
+    for course in args.courses or sorted(os.listdir(args.out)):
+        for path in sorted(glob.glob(os.path.join(args.out, course, 'Tree#*.txt'))):
+            if args.force or load_tree_artifact(os.path.splitext(path)[0] + '.json') is None:
+                convert_tree_file(path, english_stop_words())
+                converted += 1
+    print('Converted {} Tree of Knowledge files'.format(converted))
@@ -7,9 +7,9 @@ Functions:
     get_course_number_link_format(course)
         returns course number in a format to be used for links
     get_tree_dict(tree_list):
-        returns tree of knowledge dictionary
-    get_puzzle_dict(puzzle_list):
-        returns puzzle of knowledge dictionary
+        returns tree of knowledge dictionary from a legacy tree file
+    get_puzzle_dict(puzzle, dimension):
+        returns puzzle of knowledge dictionary from a puzzle artifact or a legacy puzzle file
     get_tree_of_knowledge(course, transcript)
         returns tree of knowledge for a particular course transcript
     get_puzzle_of_knowledge(course, transcript)
@@ -24,22 +24,47 @@ Functions:
     validate_transcript_num(value, course):
         doesn't allow a user to enter a transcript that doesn't exist in the retrieve tree of
         knowledge form
+    get_keyword_rankings(course, transcript):
+        returns the complete keyword rankings of a course transcript, None if the transcript
+        was processed before the rankings were saved
+    top_keywords(ranking, k, stop_words, paragraph):
+        returns the first k keywords of a ranking that the Tree of Knowledge keeps
     retrieve_tree_of_knowledge(kpp, kpl, transcript, course):
         retrives a tree of knowledge based on user inputted keywords per paragraph,
         keywords per lecture, transcript number, and course
     process_courses(course):
         processes every lecture in a course with 10 keywords per lecture and paragraph, and a puzzle
         dimension of 6x6
+    process_course_batch(courses, workers):
+        processes and saves every lecture of several courses in one run, the lectures of all the
+        courses share one pool of workers and the longest lectures are processed first
     get_lecture_titles(course):
         gets all the lecture titles of the given course and returns them
     create_dict_from_two_list(list1, list2):
         creates a dictionary where list1 is the key set and list2 is the value set.
         Returns the dictionary
+    get_tree_artifact(course, transcript):
+        returns the structured tree of knowledge of a course transcript, None if the transcript
+        was processed before the tree artifacts were saved
+    get_puzzle_artifact(course, transcript):
+        returns the structured puzzles of a course transcript, None if the transcript was
+        processed before the puzzle artifacts were saved
     get_puzzle_title(course, transcipt):
         gets the transcripts title for the puzzle when given a specific course and transcript
+    get_puzzle_image_source(course, transcript, dimension):
+        returns the puzzle file, rendering options, cache key and modification time of the
+        image of a course transcript, None if the transcript has no such puzzle
+    get_puzzle_image(source):
+        returns the path of the image of a puzzle, rendered on the first request and cached
+    get_puzzle_sprite(source, grid):
+        returns the path of the sprite sheet of the pieces of a puzzle for a grid, rendered on
+        the first request and cached
+    get_puzzle_levels(source, sprite_url):
+        returns the piece manifest of every level of a puzzle with the URL of its sprite sheet
 '''
 import os
 import glob
+import json
 
 '''
 import textwrap
@@ -47,14 +72,19 @@ import cv2
 import numpy as np
 '''
 
-from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 
+from .puzzle_engine import EMPTY_PIECE, PUZZLE_LEVELS, load_puzzle_artifact, parse_puzzle_lines
+from .stage_cache import stage_key
+from .tree_artifact import english_stop_words, load_tree_artifact, tree_dict
+
 '''
 from ..models import TreeOfKnowledge, PuzzleOfKnowledge
 from .course_processor import course_processor
 '''
 
+SPRITE_VERSION_LENGTH = 16  # characters of the puzzle image key in the URL of a sprite sheet
+
 def get_course_number_link_format(course):
     '''Function takes course and returns the course number in a format suitable for a link.'''
     # Handle exception for Chemistry I
@@ -90,7 +120,7 @@ def get_tree_dict(tree_list):
     '''Gets a list and returns a dictionary specifically adapted for the Tree of Knowledge.'''
     tree_dict = {'Lecture Title': '', 'Lecture Keywords': [], 'Paragraphs': {}}
     line_num = 1
-    stop_words = set(stopwords.words('english'))
+    stop_words = english_stop_words()  # loaded once per process
     while line_num < len(tree_list):
         branch = tree_list[line_num]
         if line_num == 1:
@@ -127,8 +157,12 @@ def get_tree_dict(tree_list):
 def get_tree_of_knowledge(course, transcript):
     '''
     Function takes course and transcript number and returns
-    a list containing the Tree of Knowledge.
+    a dictionary containing the Tree of Knowledge, loaded from its artifact.
     '''
+    artifact = get_tree_artifact(course, transcript)
+    if artifact is not None:
+        return tree_dict(artifact)
+    # transcripts processed before the tree artifacts, see python -m edunet.utils.tree_artifact
     course_number = get_course_number_link_format(course)
     if transcript < 10:
         transcipt_num = '0' + str(transcript)
@@ -138,32 +172,29 @@ def get_tree_of_knowledge(course, transcript):
 
     with open(tree_file, 'r') as file:
         tree = file.readlines()
-    tree_dict = get_tree_dict(tree)
+    tree_dict_legacy = get_tree_dict(tree)
 
-    return tree_dict
+    return tree_dict_legacy
 
 
-def get_puzzle_dict(puzzle_list):
-    '''Gets a list and returns a dictionary specifically adapted for the Puzzle of Knowledge.'''
-    puzzle_dict = {'Lecture Title': '', 'Puzzle': {}}
-    row_num = 0
-    while row_num < len(puzzle_list):
+def get_puzzle_dict(puzzle, dimension=None):
+    '''
+    Gets the structured puzzle artifact of a lecture, or the lines of its legacy puzzle file,
+    and returns a dictionary specifically adapted for the Puzzle of Knowledge, for the puzzle
+    of the given dimension or the first one.
+    '''
+    if isinstance(puzzle, dict):
+        lecture_title = puzzle['title']
+        grids = [grid['words'] for grid in puzzle['puzzles']]
+    else:
+        lecture_title, grids = parse_puzzle_lines(puzzle)
+    puzzle_dict = {'Lecture Title': lecture_title, 'Puzzle': {}}
+    grids = [grid for grid in grids if dimension is None or len(grid) == dimension]
+    if grids:
         # key holds keyword info and value holds row number
-        if row_num == 0:
-            # Update lecture title
-            lecture_title_list = puzzle_list[row_num].split('-', 1)
-            lecture_title = lecture_title_list[0]
-            puzzle_dict.update({'Lecture Title': lecture_title})
-        else:
-            piece = puzzle_list[row_num].replace('*', '...')
-            piece = piece.replace('#', '')
-            piece = piece.replace("b'", '')
-            piece = piece.replace("'", '')
-            piece = piece.replace('up', '')
-            piece = piece.replace('down', '')
-            piece = piece.replace('\n', '')
+        for row_num, row in enumerate(grids[0], 1):
+            piece = ''.join(('...' if word == EMPTY_PIECE else word) + ' ' for word in row)
             puzzle_dict['Puzzle'].update({piece: row_num})
-        row_num += 1
     return puzzle_dict
 
 
@@ -186,16 +217,61 @@ def validate_transcript_num(value, course):
     return 0 < value < transcript_num
 
 
+def get_keyword_rankings(course, transcript):
+    '''
+    Function takes course and transcript number and returns the complete ranking of the lecture
+    and of every paragraph, None if the transcript was processed before rankings were saved.
+    '''
+    course_number = get_course_number_link_format(course)
+    if transcript < 10:
+        transcipt_num = '0' + str(transcript)
+    else:
+        transcipt_num = str(transcript)
+    rankings_file = 'edunet/utils/out/' + course_number + "/Rankings#transcript" + transcipt_num + '.json' # pylint: disable=line-too-long
+    if not os.path.isfile(rankings_file):
+        return None
+    with open(rankings_file, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def top_keywords(ranking, k, stop_words, paragraph=False):
+    '''
+    Takes a ranking of [word, pagerank] pairs and returns its first k words that are not stop
+    words, paragraph keywords must also be words of more than one letter like in get_tree_dict.
+    '''
+    keywords = []
+    for word, _ in ranking:
+        if len(keywords) >= k:
+            break
+        if word in stop_words:
+            continue
+        if paragraph and (len(word) == 1 or not word.isalpha()):
+            continue
+        keywords.append(word)
+    return keywords
+
+
 def retrieve_tree_of_knowledge(kpp, kpl, transcript, course):
     '''
     Takes keywords for a paragraph, keywords for a lecture, and a transcript number and
-    returns that tree of knowledge to the user.
+    returns that tree of knowledge to the user. Any number of keywords is sliced from the
+    saved rankings, transcripts processed before the rankings were saved are limited to the
+    keywords of their Tree of Knowledge.
     '''
+    rankings = get_keyword_rankings(course, transcript)
+    if rankings is not None:
+        stop_words = english_stop_words()
+        new_tok = {'Lecture Title': rankings['title'], 'Lecture Keywords': [], 'Paragraphs': {}}
+        new_tok['Lecture Keywords'] = top_keywords(rankings['lecture'], kpl, stop_words)
+        for i, ranking in enumerate(rankings['paragraphs']):
+            new_tok['Paragraphs'].update({'Paragraph ' + str(i + 1) + ' Keywords': top_keywords(ranking, kpp, stop_words, paragraph=True)}) # pylint: disable=line-too-long
+        return new_tok
+
     tok = get_tree_of_knowledge(course, transcript)
     new_tok = {'Lecture Title': '', 'Lecture Keywords':[], 'Paragraphs': {}}
     new_tok['Lecture Title'] = tok['Lecture Title']
     i = 0
-    while i < kpl:
+    while i < kpl and i < len(tok['Lecture Keywords']):
         new_tok['Lecture Keywords'].append(tok['Lecture Keywords'][i])
         i += 1
     i = 0
@@ -278,8 +354,10 @@ def get_puzzle_of_knowledge(course, transcipt):
         transcipt_num = str(transcipt)
     puzzle_file = 'edunet/utils/out/' + course_number + "/Puzzle#transcript" + transcipt_num + '.txt' # pylint: disable=line-too-long
 
-    with open(puzzle_file, 'r') as file:
-        puzzle = file.readlines()
+    puzzle = get_puzzle_artifact(course, transcipt)
+    if puzzle is None:
+        with open(puzzle_file, 'r') as file:
+            puzzle = file.readlines()
     puzzle_dict = get_puzzle_dict(puzzle)
     # Generate image and save to static files
     puzzle = generate_puzzle(puzzle_dict)
@@ -324,8 +402,43 @@ def process_courses(course):
         print("Saving lecture " + str(i))
         save_data_to_database(course, i)
         i += 1
+
 """
 
+def process_course_batch(courses, workers=None):
+    '''
+    Takes several courses and processes and saves all their lectures, the lectures of every
+    course are processed together by one pool of workers, longest first. The courses that
+    could not be processed are not saved.
+    '''
+    # the models and the nlp pipeline are only loaded to process courses
+    from ..models import TreeOfKnowledge, PuzzleOfKnowledge
+    from .course_processor import batch_course_processor
+
+    links = [get_course_link(course) for course in courses]
+    kpl = 10
+    kpp = 10
+    puzz_dim = 6
+    processed_courses = batch_course_processor(links, kpl, kpp, puzz_dim, workers=workers or os.cpu_count()) # pylint: disable=line-too-long
+
+    for course in courses:
+        if get_course_number_link_format(course) not in processed_courses:
+            print(course.course_number + ' was not processed')
+            continue
+        transcipt_num = get_transcript_num(course)
+        # Handle exception for HSAR
+        if course.course_number == 'HSAR 252':
+            transcipt_num = 23
+        print(course.course_number + ' total transcripts: ' + str(transcipt_num))
+        i = 1
+        while i <= transcipt_num:
+            tok = get_tree_of_knowledge(course, i)
+            pok = get_puzzle_dict(get_puzzle_artifact(course, i))
+            TreeOfKnowledge(course=course, transcript_num=i, tree_of_knowledge=tok).save()
+            PuzzleOfKnowledge(course=course, transcript_num=i, puzzle_of_knowledge=pok).save()
+            i += 1
+
+
 def get_lecture_titles(course):
     '''
     Function takes course and returns
@@ -339,11 +452,15 @@ def get_lecture_titles(course):
             transcipt_num = '0' + str(transcript)
         else:
             transcipt_num = str(transcript)
-        tree_file = 'edunet/utils/out/' + course_number + "/Tree#transcript" + transcipt_num + '.txt' # pylint: disable=line-too-long
-        with open(tree_file, 'r') as file:
-            lines = file.readlines()
-        lecture_title_list = lines[1].split('-', 1) # second line contains the titles
-        lecture_title = lecture_title_list[1].split(':')[0]
+        artifact = get_tree_artifact(course, transcript)
+        if artifact is not None:
+            lecture_title = artifact['title']
+        else:
+            tree_file = 'edunet/utils/out/' + course_number + "/Tree#transcript" + transcipt_num + '.txt' # pylint: disable=line-too-long
+            with open(tree_file, 'r') as file:
+                lines = file.readlines()
+            lecture_title_list = lines[1].split('-', 1) # second line contains the titles
+            lecture_title = lecture_title_list[1].split(':')[0]
         titles.append(lecture_title)
         transcript += 1
     return titles
@@ -368,12 +485,43 @@ def create_dict_from_two_list(list1, list2):
     return dictionary
 
 
+def get_tree_artifact(course, transcript):
+    '''
+    Function takes course and transcript number and returns the structured Tree of Knowledge
+    of the lecture, None if the transcript was processed before the tree artifacts were saved.
+    '''
+    course_number = get_course_number_link_format(course)
+    transcript = int(transcript)
+    if transcript < 10:
+        transcipt_num = '0' + str(transcript)
+    else:
+        transcipt_num = str(transcript)
+    return load_tree_artifact('edunet/utils/out/' + course_number + "/Tree#transcript" + transcipt_num + '.json') # pylint: disable=line-too-long
+
+
+def get_puzzle_artifact(course, transcript):
+    '''
+    Function takes course and transcript number and returns the grid of words and the grid of
+    tabs of every puzzle of the lecture, None if the transcript was processed before the puzzle
+    artifacts were saved.
+    '''
+    course_number = get_course_number_link_format(course)
+    transcript = int(transcript)
+    if transcript < 10:
+        transcipt_num = '0' + str(transcript)
+    else:
+        transcipt_num = str(transcript)
+    return load_puzzle_artifact('edunet/utils/out/' + course_number + "/Puzzle#transcript" + transcipt_num + '.json') # pylint: disable=line-too-long
+
+
 def get_puzzle_title(course, transcipt):
     '''
     Function takes course and transcript number and returns
-    an dictionary containing the Puzzle of Knowledge and saves
-    an image containing the puzzle of knowledge.
+    the title of the lecture of the Puzzle of Knowledge.
     '''
+    artifact = get_puzzle_artifact(course, transcipt)
+    if artifact is not None:
+        return artifact['title']
     course_number = get_course_number_link_format(course)
     transcipt = int(transcipt)
     if transcipt < 10:
@@ -384,4 +532,76 @@ def get_puzzle_title(course, transcipt):
 
     with open(puzzle_file, 'r') as file:
         puzzle = file.readline()
-    return puzzle.split('-')[0]
+    # the header is the lecture title, which can hold dashes, then the dimension
+    return puzzle.rsplit('-', 1)[0]
+
+
+def get_puzzle_image_source(course, transcript, dimension=None):
+    '''
+    Function takes course, transcript number and puzzle dimension, the first puzzle of the
+    lecture if None, and returns a dictionary with the path of the puzzle without extension,
+    the rendering options, the cache key and the modification time of the input of the image.
+    None if the transcript was not processed.
+    '''
+    # the puzzle renderer needs cv2 and numpy, only loaded by the puzzle views
+    from .puzzle_renderer import RenderSettings, puzzle_input_key
+    course_number = get_course_number_link_format(course)
+    transcript = int(transcript)
+    if transcript < 10:
+        transcipt_num = '0' + str(transcript)
+    else:
+        transcipt_num = str(transcript)
+    puzzle_path = 'edunet/utils/out/' + course_number + "/Puzzle#transcript" + transcipt_num
+    settings = RenderSettings(dimension=dimension)
+    key = puzzle_input_key(puzzle_path, settings)
+    if key is None:
+        return None
+    extension = '.json' if os.path.isfile(puzzle_path + '.json') else '.txt'
+    return {
+        'puzzle_path': puzzle_path,
+        'settings': settings,
+        'key': key,
+        'last_modified': os.path.getmtime(puzzle_path + extension),
+    }
+
+
+def get_puzzle_image(source):
+    '''
+    Function takes the source of a puzzle image from get_puzzle_image_source and returns the
+    path of the image in the shared image cache, rendered on the first request. None if the
+    lecture has no puzzle of the dimension asked for.
+    '''
+    from .puzzle_renderer import encode_puzzle
+    from .image_cache import shared_image_cache
+    return shared_image_cache().get(
+        source['key'], lambda: encode_puzzle(source['puzzle_path'], source['settings'])
+    )
+
+
+def get_puzzle_sprite(source, grid):
+    '''
+    Function takes the source of a puzzle image from get_puzzle_image_source and a grid size
+    and returns the path of the sprite sheet of the pieces of the puzzle in the shared image
+    cache, rendered on the first request. None if the lecture has no such puzzle.
+    '''
+    from .puzzle_renderer import encode_puzzle
+    from .image_cache import shared_image_cache
+    return shared_image_cache().get(
+        stage_key(source['key'], 'puzzle_sprite', {'grid': grid}),
+        lambda: encode_puzzle(source['puzzle_path'], source['settings'], grid)
+    )
+
+
+def get_puzzle_levels(source, sprite_url):
+    '''
+    Function takes the source of a puzzle image from get_puzzle_image_source and a function
+    returning the URL of a sprite sheet from a grid size and the version of the puzzle, and
+    returns the piece manifest of every level of PUZZLE_LEVELS by grid size.
+    '''
+    from .puzzle_renderer import piece_manifest
+    levels = {}
+    for grid in PUZZLE_LEVELS.values():
+        manifest = piece_manifest(grid, source['settings'])
+        manifest['sprite'] = sprite_url(grid, source['key'][:SPRITE_VERSION_LENGTH])
+        levels[grid] = manifest
+    return levels
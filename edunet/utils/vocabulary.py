@@ -0,0 +1,136 @@
+'''
+Contains the vocabulary used by the course_processor to intern the lemmas of a lecture or of a
+course as dense integer ids.
+
+The nouns of a lecture are held as a single int32 buffer of ids with the offset of every
+paragraph instead of lists of strings, the words are only decoded when a graph or an output
+needs them. Lectures processed in worker processes have their own vocabulary, merged into the
+vocabulary of their course with the number of times every word was used.
+
+Classes:
+    Vocabulary
+        maps words to dense integer ids and counts how often they are used
+    EncodedParagraphs
+        holds the words of every paragraph of a lecture as an int32 buffer of ids
+'''
+__author__ = 'boutin'
+
+import json
+
+from array import array
+
+import numpy as np
+
+
+class Vocabulary:
+    '''Class used to map words to dense integer ids, in order of first appearance.'''
+    def __init__(self, words=()):
+        self.words = []
+        self.ids = {}
+        self.counts = np.zeros(0, dtype=np.int64)  # times every word was used, see update
+        for word in words:
+            self.intern(word)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.ids
+
+    def __getstate__(self):
+        # the ids are rebuilt from the words, no need to pickle them
+        return self.words, self.counts
+
+    def __setstate__(self, state):
+        words, self.counts = state
+        self.words = list(words)
+        self.ids = {word: i for i, word in enumerate(self.words)}
+
+    def intern(self, word):
+        '''Function returns the id of a word, adding the word if it is new.'''
+        try:
+            return self.ids[word]
+        except KeyError:
+            self.ids[word] = len(self.words)
+            self.words.append(word)
+            return self.ids[word]
+
+    def get(self, word, default=-1):
+        '''Function returns the id of a word, default if the word is not in the vocabulary.'''
+        return self.ids.get(word, default)
+
+    def encode(self, words):
+        '''Function takes a list of words and returns their ids as an int32 array.'''
+        return np.fromiter((self.intern(word) for word in words), dtype=np.int32, count=len(words))
+
+    def decode(self, ids):
+        '''Function takes an array of ids and returns their words.'''
+        words = self.words
+        return [words[i] for i in np.asarray(ids).tolist()]
+
+    def update(self, other, counts):
+        '''
+        Function adds the words of another vocabulary with the number of times each of them
+        was used and returns the ids of its words in this vocabulary.
+        '''
+        remap = np.array([self.intern(word) for word in other.words], dtype=np.int64)
+        added = np.bincount(remap, weights=counts, minlength=len(self)).astype(np.int64)
+        added[:len(self.counts)] += self.counts
+        self.counts = added
+        return remap
+
+    def save(self, path):
+        '''Function saves the words from the most to the least used with their counts.'''
+        counts = np.zeros(len(self), dtype=np.int64)
+        counts[:len(self.counts)] = self.counts
+        order = np.argsort(-counts, kind='stable').tolist()
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump([[self.words[i], int(counts[i])] for i in order], file)
+
+
+class EncodedParagraphs:
+    '''
+    Class used to hold the words of every paragraph of a lecture as one int32 buffer of ids in
+    the lecture vocabulary, with the offset in the buffer where every paragraph starts.
+    '''
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        self.ids = array('i')
+        self.offsets = array('q', [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.paragraph(index)
+
+    def append(self, words):
+        '''Function adds the words of a paragraph.'''
+        self.ids.extend(map(self.vocabulary.intern, words))
+        self.offsets.append(len(self.ids))
+
+    def extend(self, paragraphs):
+        '''Function adds the words of several paragraphs.'''
+        for words in paragraphs:
+            self.append(words)
+
+    def paragraph_ids(self, index):
+        '''Function returns the ids of the words of a paragraph as an int32 array.'''
+        return np.frombuffer(self.ids[self.offsets[index]:self.offsets[index + 1]], dtype=np.int32)
+
+    def paragraph(self, index):
+        '''Function returns the words of a paragraph.'''
+        return self.vocabulary.decode(self.paragraph_ids(index))
+
+    def word_ids(self):
+        '''Function returns the ids of the words of every paragraph, one after the other.'''
+        return np.frombuffer(self.ids[:], dtype=np.int32)
+
+    def words(self):
+        '''Function returns the words of every paragraph, one after the other.'''
+        return self.vocabulary.decode(self.word_ids())
+
+    def word_counts(self):
+        '''Function returns how many times every word of the vocabulary is used.'''
+        return np.bincount(self.word_ids(), minlength=len(self.vocabulary))
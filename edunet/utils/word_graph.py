@@ -0,0 +1,105 @@
+'''
+Contains the weighted co-occurrence graph builder used by the course_processor.
+
+The words are mapped to integer ids once, the pairs of words co-occurring within the window are
+formed with array operations and repeated pairs are counted into the weight of their edge in
+bulk. Sentence separators break the co-occurrence window instead of being added to the graph
+and deleted afterwards.
+
+Classes:
+    WordGraph
+        holds a weighted co-occurrence graph as integer arrays
+
+Functions:
+    build_id_graph(ids, words, window, separator_id)
+        returns the weighted co-occurrence graph of an array of word ids
+    build_word_graph(words, window, separator)
+        returns the weighted co-occurrence graph of a list of words
+'''
+__author__ = 'boutin'
+
+import numpy as np
+import networkx as nx
+
+GRAPH_BUILDERS = ('networkx', 'weighted')
+SEPARATOR = '.'
+
+
+class WordGraph:
+    '''
+    Class used to hold a weighted co-occurrence graph: the words in order of first appearance
+    and, for every edge, the ids of its words and its weight.
+    '''
+    def __init__(self, nodes, sources, targets, weights):
+        self.nodes = nodes
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def to_networkx(self):
+        '''Function returns the graph as a networkx DiGraph with the weights on its edges.'''
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.nodes)
+        graph.add_weighted_edges_from(zip(
+            [self.nodes[i] for i in self.sources.tolist()],
+            [self.nodes[i] for i in self.targets.tolist()],
+            self.weights.tolist(),
+        ))
+        return graph
+
+
+def build_id_graph(ids, words, window=2, separator_id=-1):
+    '''
+    Function takes an array of the ids of some words in a vocabulary, the words of the
+    vocabulary and the id of the separator and returns the co-occurrence graph of the words
+    like build_word_graph. Only the words used are in the graph, in order of first appearance.
+    '''
+    ids = np.asarray(ids, dtype=np.int64)
+    used, first, local_ids = np.unique(ids, return_index=True, return_inverse=True)
+    # number the words used in order of first appearance, like a list of words would
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(used), dtype=np.int64)
+    rank[order] = np.arange(len(used))
+    ids = rank[local_ids.reshape(-1)]
+    vocabulary = [words[i] for i in used[order].tolist()]
+    position = np.searchsorted(used, separator_id)
+    if position < len(used) and used[position] == separator_id:
+        separator_id = int(rank[position])
+    else:
+        separator_id = -1
+    breaks = ids == separator_id
+    sentences = np.cumsum(breaks)
+
+    size = len(vocabulary)
+    keys = []
+    for distance in range(1, max(window, 2)):
+        if distance >= len(ids):
+            break
+        valid = (sentences[:-distance] == sentences[distance:]) & ~breaks[:-distance] & ~breaks[distance:] # pylint: disable=line-too-long
+        keys.append(ids[:-distance][valid] * size + ids[distance:][valid])
+    keys, weights = np.unique(np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64), return_counts=True) # pylint: disable=line-too-long
+    sources = keys // size
+    targets = keys % size
+
+    if separator_id >= 0:
+        # the separator is not a word of the graph, shift the ids of the words after it
+        del vocabulary[separator_id]
+        sources = sources - (sources > separator_id)
+        targets = targets - (targets > separator_id)
+    return WordGraph(vocabulary, sources, targets, weights.astype(np.float64))
+
+
+def build_word_graph(words, window=2, separator=SEPARATOR):
+    '''
+    Function takes a list of words and returns their co-occurrence graph, every word is linked
+    to the words following it within the window (2 links a word to the next one only) and the
+    weight of a link is the number of times the pair co-occurs. The window never goes across
+    a separator.
+    '''
+    vocabulary = list(dict.fromkeys(words))
+    index = {word: i for i, word in enumerate(vocabulary)}
+    ids = np.fromiter(map(index.__getitem__, words), dtype=np.int64, count=len(words))
+    return build_id_graph(ids, vocabulary, window, index.get(separator, -1))
@@ -22,15 +22,23 @@ FUNCTIONS:
         returns rendering of a template with tree of knowledge
     pz_view(request, department_slug, course_Slug)
         returns rendering of a template with puzzle of knowledge
+    pz_image(request, department_slug, course_slug, transcript_num, dimension)
+        returns the image of a puzzle of knowledge, rendered on the first request and cached
+    pz_sprite(request, department_slug, course_slug, transcript_num, grid, version)
+        returns the sprite sheet of the pieces of a puzzle of knowledge for a level
 
 '''
+from datetime import datetime, timezone
+
 from django.shortcuts import render
 from django.views import generic
 from django.db.models import Q
 from django.contrib.auth.forms import UserCreationForm
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.decorators import login_required
-from django.http import FileResponse, Http404
+from django.http import FileResponse, Http404, HttpResponseRedirect
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
 from hitcount.models import HitCount
 from hitcount.views import HitCountMixin
@@ -187,14 +195,95 @@ def pz_view(request, department_slug, course_slug, transcript_num):
     lecture_title = utils.get_puzzle_title(
         Course.objects.get(course_slug=course_slug), transcript_num
     )
+    source = puzzle_image_source(request, department_slug, course_slug, int(transcript_num))
+    levels = None
+    if source is not None:
+        levels = utils.get_puzzle_levels(source, lambda grid, version: reverse(
+            'edunet:pz_sprite', args=[department_slug, course_slug, int(transcript_num), grid, version] # pylint: disable=line-too-long
+        ))
     context = {
         'lecture_title': lecture_title,
         'puzzle': puzzle,
+        'transcript': int(transcript_num),
+        'levels': levels,
         'course': Course.objects.get(course_slug=course_slug),
         'department': Department.objects.get(department_slug=department_slug)
     }
     return render(request, 'edunet/pz.html', context)
 
+def puzzle_image_source(request, department_slug, course_slug, transcript_num, dimension=None): # pylint: disable=unused-argument
+    '''
+    Function returns the source of the puzzle image of a request, looked up once per request
+    for the ETag, the Last-Modified date and the view.
+    '''
+    if not hasattr(request, 'puzzle_image_source'):
+        course = Course.objects.filter(course_slug=course_slug).first()
+        request.puzzle_image_source = None if course is None else utils.get_puzzle_image_source(
+            course, transcript_num, dimension
+        )
+    return request.puzzle_image_source
+
+def puzzle_image_etag(request, *args, **kwargs):
+    '''Function returns the ETag of a puzzle image, the key of its input.'''
+    source = puzzle_image_source(request, *args, **kwargs)
+    return None if source is None else source['key']
+
+def puzzle_image_last_modified(request, *args, **kwargs):
+    '''Function returns the Last-Modified date of a puzzle image, the date of its puzzle.'''
+    source = puzzle_image_source(request, *args, **kwargs)
+    if source is None:
+        return None
+    return datetime.fromtimestamp(source['last_modified'], tz=timezone.utc)
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=puzzle_image_etag, last_modified_func=puzzle_image_last_modified)
+def pz_image(request, department_slug, course_slug, transcript_num, dimension=None):
+    '''
+    Function takes a request, department_slug, course_slug, transcript number and puzzle
+    dimension and returns the image of the Puzzle of Knowledge of the lecture. The image is
+    rendered from the puzzle on the first request and kept in a bounded cache, browsers
+    revalidate it with its ETag and Last-Modified date.
+    '''
+    source = puzzle_image_source(request, department_slug, course_slug, transcript_num, dimension) # pylint: disable=line-too-long
+    image_path = None if source is None else utils.get_puzzle_image(source)
+    if image_path is None:
+        raise Http404()
+    try:
+        return FileResponse(open(image_path, 'rb'), content_type='image/jpeg')
+    except FileNotFoundError:
+        # evicted by another process between the lookup and the read
+        raise Http404()
+
+@login_required
+def pz_sprite(request, department_slug, course_slug, transcript_num, grid, version):
+    '''
+    Function takes a request, department_slug, course_slug, transcript number, grid size of a
+    level and version of the puzzle and returns the sprite sheet of the pieces of the Puzzle of
+    Knowledge of the lecture. The URL changes with the puzzle so the sheet is cached for a
+    year, a request for an older version is redirected to the current one.
+    '''
+    if grid not in utils.PUZZLE_LEVELS.values():
+        raise Http404()
+    source = puzzle_image_source(request, department_slug, course_slug, transcript_num)
+    if source is None:
+        raise Http404()
+    current = source['key'][:utils.SPRITE_VERSION_LENGTH]
+    if version != current:
+        return HttpResponseRedirect(reverse(
+            'edunet:pz_sprite', args=[department_slug, course_slug, transcript_num, grid, current]
+        ))
+    sprite_path = utils.get_puzzle_sprite(source, grid)
+    if sprite_path is None:
+        raise Http404()
+    try:
+        response = FileResponse(open(sprite_path, 'rb'), content_type='image/jpeg')
+    except FileNotFoundError:
+        # evicted by another process between the lookup and the read
+        raise Http404()
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
 """
 @login_required
 def course_processor(request, department_slug, course_slug):